@@ -0,0 +1,39 @@
+"""
+Startup cost of a large script: lexing and parsing it against loading its
+program from `__culebracache__`.
+
+Usage: python -m benchmarks.ast_cache [factor] [repeat]
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import best_time, report, scaled_source
+from culebra.cache import ASTCache
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+
+def parse(path: Path):
+    with open(path, 'r') as f:
+        return Parser(Lexer().iter_tokens(f)).parse()
+
+
+def main(factor: int = 50, repeat: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "scaled.culebra"
+        path.write_text(scaled_source(factor))
+        cache = ASTCache(path)
+        cache.store(parse(path))
+
+        parsing = best_time(lambda: parse(path), repeat)
+        loading = best_time(cache.load, repeat)
+        report("source size", f"{path.stat().st_size:,} bytes")
+        report("cache entry size", f"{cache.path.stat().st_size:,} bytes")
+        report("lex and parse", f"{parsing * 1000:7.1f} ms")
+        report("cache load", f"{loading * 1000:7.1f} ms   ({parsing / loading:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
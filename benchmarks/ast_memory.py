@@ -0,0 +1,60 @@
+"""
+Memory held by the AST of a large program with `__slots__` nodes that keep
+only the token position, against the same tree laid out as before: nodes
+with an instance `__dict__` holding their `Token`.
+
+Usage: python -m benchmarks.ast_memory [factor]
+"""
+
+import sys
+
+from benchmarks.common import report, retained_memory, scaled_source
+from culebra import ast
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+
+class DictNode:
+    """A node with the fields of an AST node and its token in an instance `__dict__`."""
+
+
+def slot_names(node: ast.ASTNode):
+    for cls in type(node).__mro__:
+        yield from cls.__dict__.get('__slots__', ())
+
+
+def dict_tree(node):
+    if isinstance(node, list):
+        return [dict_tree(item) for item in node]
+    if not isinstance(node, ast.ASTNode):
+        return node
+    copy = DictNode()
+    for name in slot_names(node):
+        if name != 'pos':
+            setattr(copy, name, dict_tree(getattr(node, name)))
+    if isinstance(node, ast.Statement):
+        copy.token = node.token
+    return copy
+
+
+def count_nodes(node) -> int:
+    return 1 + sum(count_nodes(child) for child in node.children if child is not None)
+
+
+def main(factor: int = 50) -> None:
+    source = scaled_source(factor)
+    tokens = Lexer().tokenize(source)
+    program, slots_bytes = retained_memory(lambda: Parser(tokens).parse())
+    del tokens
+    _, dict_bytes = retained_memory(lambda: dict_tree(program))
+    nodes = count_nodes(program)
+
+    report("source size", f"{len(source):,} chars")
+    report("nodes", f"{nodes:,}")
+    report("__dict__ nodes with tokens", f"{dict_bytes:,} bytes ({dict_bytes / nodes:.0f} per node)")
+    report("__slots__ nodes with positions", f"{slots_bytes:,} bytes ({slots_bytes / nodes:.0f} per node)")
+    report("reduction", f"{dict_bytes / slots_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,48 @@
+"""
+Walking a scaled program with `culebra.ast.walk` (per-class child getters)
+against a walk that reads the `children` lists of every node and one that
+looks the child fields up by name (`culebra.arena.child_nodes`).
+
+Usage: python -m benchmarks.ast_traversal [factor] [repeat]
+"""
+
+import sys
+
+from benchmarks.common import best_time, report, scaled_source
+from culebra.arena import child_nodes
+from culebra.ast import walk
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+
+def walk_children(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(child for child in reversed(node.children) if child is not None)
+
+
+def walk_fields(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(child for child in reversed(child_nodes(node)) if child is not None)
+
+
+def count(nodes) -> int:
+    return sum(1 for _ in nodes)
+
+
+def main(factor: int = 100, repeat: int = 5) -> None:
+    program = Parser(Lexer().tokenize(scaled_source(factor))).parse()
+    report("nodes", f"{count(walk(program)):,}")
+    getters = best_time(lambda: count(walk(program)), repeat)
+    for name, walker in [("children lists", walk_children), ("fields by name", walk_fields)]:
+        other = best_time(lambda: count(walker(program)), repeat)
+        report(name, f"{other * 1000:7.1f} ms   walk {getters * 1000:7.1f} ms   ({other / getters:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,48 @@
+"""
+Running programs compiled to bytecode on the VM against walking their tree
+(and the closure engine), on recursive functions, loops and the runnable
+examples. Compilation is included in the time of the compiled engines.
+
+Usage: python -m benchmarks.bytecode_vm [fib] [repeat]
+"""
+
+import contextlib
+import io
+import sys
+
+from benchmarks.common import RUNNABLE_EXAMPLES, best_time, example_source, report
+from culebra.interpreter.interpreter import Interpreter
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+FIB = """
+def fib(n):
+    if n < 2:
+        return n
+    return fib(n - 1) + fib(n - 2)
+fib({n})
+"""
+
+ARRAY_LOOP = """
+tape = [0, 0, 0, 0, 0, 0, 0, 0]
+for i = 0; i < {iterations}; i = i + 1:
+    pointer = i - i / 8 * 8
+    tape[3] = tape[3] + len([i, i])
+"""
+
+
+def main(fib: int = 18, repeat: int = 5) -> None:
+    programs = [("fib", FIB.format(n=fib)), ("array loop", ARRAY_LOOP.format(iterations=fib * 1000))]
+    programs += [(name, example_source(name)) for name in RUNNABLE_EXAMPLES]
+    for name, source in programs:
+        program = Parser(Lexer().tokenize(source)).parse()
+        times = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for engine in ['tree', 'closure', 'vm']:
+                times[engine] = best_time(lambda: Interpreter(engine=engine).evaluate(program), repeat)
+        report(name, "   ".join(f"{engine} {time * 1000:8.2f} ms" for engine, time in times.items())
+               + f"   (vm {times['tree'] / times['vm']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,48 @@
+"""
+Running programs with the closure engine against walking their tree, on
+recursive functions and the runnable examples. Compilation is included in
+the time of the closure engine.
+
+Usage: python -m benchmarks.closure_engine [fib] [repeat]
+"""
+
+import contextlib
+import io
+import sys
+
+from benchmarks.common import RUNNABLE_EXAMPLES, best_time, example_source, report
+from culebra.interpreter.interpreter import Interpreter
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+FIB = """
+def fib(n):
+    if n < 2:
+        return n
+    return fib(n - 1) + fib(n - 2)
+fib({n})
+"""
+
+LOOP = """
+total = 0
+for i = 0; i < {iterations}; i = i + 1:
+    if i / 2 > 10:
+        total = total + i
+    else:
+        total = total - 1
+"""
+
+
+def main(fib: int = 18, repeat: int = 5) -> None:
+    programs = [("fib", FIB.format(n=fib)), ("loop", LOOP.format(iterations=fib * 2000))]
+    programs += [(name, example_source(name)) for name in RUNNABLE_EXAMPLES]
+    for name, source in programs:
+        program = Parser(Lexer().tokenize(source)).parse()
+        with contextlib.redirect_stdout(io.StringIO()):
+            tree = best_time(lambda: Interpreter().evaluate(program), repeat)
+            closure = best_time(lambda: Interpreter(engine='closure').evaluate(program), repeat)
+        report(name, f"tree {tree * 1000:8.2f} ms   closure {closure * 1000:8.2f} ms   ({tree / closure:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,58 @@
+"""Helpers shared by the benchmark scripts."""
+
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+EXAMPLES_DIR = Path(__file__).parent.parent / "examples"
+
+# Examples that run without reading from stdin or failing on purpose
+RUNNABLE_EXAMPLES = ["ackerman", "brainfuck", "fibunacci", "hello_world", "loops"]
+
+
+def example_source(name: str) -> str:
+    return (EXAMPLES_DIR / f"{name}.culebra").read_text()
+
+
+def scaled_source(factor: int) -> str:
+    """Concatenates every example program `factor` times."""
+    sources = [path.read_text().strip() + "\n" for path in sorted(EXAMPLES_DIR.glob("*.culebra"))]
+    return "\n".join(sources) * factor
+
+
+def best_time(function: Callable[[], object], repeat: int = 5) -> float:
+    """Returns the fastest wall time of `repeat` calls, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def retained_memory(function: Callable[[], object]) -> Tuple[object, int]:
+    """Calls `function` and returns its result with the bytes still allocated for it."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, after - before
+
+
+def peak_memory(function: Callable[[], object]) -> Tuple[object, int]:
+    """Calls `function` and returns its result with the peak bytes allocated while it ran."""
+    tracemalloc.start()
+    try:
+        result = function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def report(label: str, value: str) -> None:
+    print(f"{label:<40} {value}")
@@ -0,0 +1,51 @@
+"""
+Evaluation time of programs as parsed against after the optimizer pass
+(culebra.optimizer): a loop over constant expressions and arrays, and the
+runnable examples. The time of the pass itself is reported on a scaled
+program.
+
+Usage: python -m benchmarks.constant_folding [iterations] [repeat]
+"""
+
+import contextlib
+import io
+import sys
+
+from benchmarks.common import RUNNABLE_EXAMPLES, best_time, example_source, report, scaled_source
+from culebra.interpreter.interpreter import Interpreter
+from culebra.lexer import Lexer
+from culebra.optimizer import optimize
+from culebra.parser import Parser
+
+CONSTANTS = """
+total = 0
+for i = 0; i < {iterations}; i = i + 1:
+    seconds = 60 * 60 * 24 * 7
+    label = "week" + ": " + "days"
+    done = not true
+    tape = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+    total = total + seconds / (2 * 3) + len(tape)
+"""
+
+
+def parse(source: str):
+    return Parser(Lexer().tokenize(source)).parse()
+
+
+def main(iterations: int = 20000, repeat: int = 5) -> None:
+    programs = [("constants", CONSTANTS.format(iterations=iterations))]
+    programs += [(name, example_source(name)) for name in RUNNABLE_EXAMPLES]
+    for name, source in programs:
+        program, optimized = parse(source), optimize(parse(source))
+        with contextlib.redirect_stdout(io.StringIO()):
+            plain = best_time(lambda: Interpreter().evaluate(program), repeat)
+            folded = best_time(lambda: Interpreter().evaluate(optimized), repeat)
+        report(name, f"parsed {plain * 1000:8.2f} ms   optimized {folded * 1000:8.2f} ms   ({plain / folded:.2f}x)")
+
+    source = scaled_source(50)
+    passes = best_time(lambda: optimize(parse(source)), repeat) - best_time(lambda: parse(source), repeat)
+    report("optimizer pass, scaled examples", f"{passes * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
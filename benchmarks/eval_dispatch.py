@@ -0,0 +1,91 @@
+"""
+Evaluation with the node class dispatch table of `Interpreter.eval_node`
+against the chain of isinstance checks it replaced, on tight loops and the
+runnable examples.
+
+Usage: python -m benchmarks.eval_dispatch [iterations] [repeat]
+"""
+
+import contextlib
+import io
+import sys
+
+from benchmarks.common import RUNNABLE_EXAMPLES, best_time, example_source, report
+from culebra import ast
+from culebra.interpreter.interpreter import Interpreter, ReturnValue
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+NESTED_LOOPS = """
+a = 0
+for i = 0; i < {size}; i = i + 1:
+    for j = 0; j < {size}; j = j + 1:
+        a = a + 1
+"""
+
+ARRAY_LOOP = """
+tape = [0, 0, 0, 0, 0, 0, 0, 0]
+for i = 0; i < {iterations}; i = i + 1:
+    value = tape[3] + len([i, i])
+    tape[3] = value - 1
+"""
+
+
+class IsinstanceInterpreter(Interpreter):
+    """Dispatches on the node with a chain of isinstance checks."""
+
+    def eval_node(self, node, environment):
+        try:
+            if isinstance(node, ast.Identifier):
+                return self.evaluate_identifier(node, environment)
+            elif isinstance(node, ast.Assignment):
+                return self.evaluate_assignment(node, environment)
+            elif isinstance(node, ast.LiteralValue):
+                return self.evaluate_literal(node, environment)
+            elif isinstance(node, (ast.Program, ast.Block)):
+                return self.evaluate_block(node, environment)
+            elif isinstance(node, ast.BinaryOperation):
+                return self.evaluate_binary_operation(node, environment)
+            elif isinstance(node, ast.PrefixOperation):
+                return self.evaluate_prefix_operation(node, environment)
+            elif isinstance(node, ast.Conditional):
+                return self.evaluate_conditional(node, environment)
+            elif isinstance(node, ast.While):
+                return self.evaluate_while(node, environment)
+            elif isinstance(node, ast.For):
+                return self.evaluate_for(node, environment)
+            elif isinstance(node, ast.FunctionDefinition):
+                return self.evaluate_function_definition(node, environment)
+            elif isinstance(node, ast.FunctionCall):
+                return self.evaluate_function_call(node, environment)
+            elif isinstance(node, ast.ReturnStatement):
+                return self.evaluate_return(node, environment)
+            elif isinstance(node, ast.BracketAccess):
+                return self.evaluate_bracket_access(node, environment)
+            elif isinstance(node, ast.Array):
+                return self.evaluate_array(node, environment)
+            else:
+                raise TypeError(f"Unexpected AST node type: {type(node)}")
+        except ReturnValue:
+            raise
+        except Exception as e:
+            if not self.has_error:
+                self.last_error = e
+                self.last_node = node
+            raise e
+
+
+def main(iterations: int = 40000, repeat: int = 5) -> None:
+    programs = [("nested loops", NESTED_LOOPS.format(size=int(iterations ** 0.5))),
+                ("array loop", ARRAY_LOOP.format(iterations=iterations))]
+    programs += [(name, example_source(name)) for name in RUNNABLE_EXAMPLES]
+    for name, source in programs:
+        program = Parser(Lexer().tokenize(source)).parse()
+        with contextlib.redirect_stdout(io.StringIO()):
+            chain = best_time(lambda: IsinstanceInterpreter().evaluate(program), repeat)
+            table = best_time(lambda: Interpreter().evaluate(program), repeat)
+        report(name, f"isinstance {chain * 1000:8.2f} ms   table {table * 1000:8.2f} ms   ({chain / table:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
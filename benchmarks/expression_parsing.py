@@ -0,0 +1,103 @@
+"""
+Expression parsing with binding powers (`Parser._parse_expression`) against
+the recursive descent chain of one method per precedence level it replaced,
+on expression heavy code, plus the deepest parenthesized expression each
+one parses.
+
+Usage: python -m benchmarks.expression_parsing [statements]
+"""
+
+import random
+import sys
+
+from benchmarks.common import best_time, report
+from culebra.lexer import Lexer
+from culebra.parser import (ArithmeticOperators, ComparisonOperators, LogicalOperators, Parser, PrefixOperators,
+                            TermOperators)
+from culebra.token import TokenType
+
+
+class DescentParser(Parser):
+    """The expression grammar parsed with one recursive method per precedence level."""
+
+    def _parse_expression(self):
+        return self._parse_level(0)
+
+    def _parse_level(self, level):
+        if level == len(DescentLevels):
+            return self._parse_unary()
+        operators = DescentLevels[level]
+        left = self._parse_level(level + 1)
+        while left is not None and self._current_token.type in operators:
+            token = self._current_token
+            self._advance_token()
+            right = self._parse_level(level + 1)
+            if right is None:
+                return None
+            left = operators[token.type](token, left, right)
+        return left
+
+    def _parse_unary(self):
+        if self._current_token.type in PrefixOperators:
+            tokens = []
+            while self._current_token.type in PrefixOperators:
+                tokens.append(self._current_token)
+                self._advance_token()
+            expr = self._parse_expression()
+            if expr is None:
+                return None
+            for token in reversed(tokens):
+                expr = PrefixOperators[token.type](token, expr)
+            return expr
+        if self._current_token.type == TokenType.LPAREN:
+            self._advance_token()
+            expr = self._parse_expression()
+            if expr is None or not self._expect_one_of([TokenType.RPAREN]):
+                return None
+            self._advance_token()
+            return expr
+        return self._parse_elemental_expression()
+
+
+DescentLevels = [LogicalOperators, ComparisonOperators, ArithmeticOperators, TermOperators]
+
+
+def expression_source(statements: int) -> str:
+    rng = random.Random(42)
+    operators = ["+", "-", "*", "/", "<", "==", "and", "or"]
+    lines = []
+    for i in range(statements):
+        operands = [rng.choice(["a", "b[1]", "f(x, 2)", "3", "4.5", "(c - 1)", "-d", "not e"]) for _ in range(6)]
+        expression = operands[0]
+        for operand in operands[1:]:
+            expression += f" {rng.choice(operators)} {operand}"
+        lines.append(f"v{i} = {expression}")
+    return "\n".join(lines) + "\n"
+
+
+def deepest(parser_class, limit: int = 100000) -> int:
+    """Returns the deepest nesting of parentheses parsed, doubling the depth up to `limit`."""
+    depth = 1
+    while depth * 2 <= limit:
+        tokens = Lexer().tokenize("(" * depth * 2 + "1" + ")" * depth * 2)
+        try:
+            parser_class(tokens).parse()
+        except RecursionError:
+            break
+        depth *= 2
+    return depth
+
+
+def main(statements: int = 5000) -> None:
+    tokens = Lexer().tokenize(expression_source(statements))
+    pratt = best_time(lambda: Parser(tokens).parse())
+    descent = best_time(lambda: DescentParser(tokens).parse())
+    report("tokens", f"{len(tokens):,}")
+    report("recursive descent", f"{descent * 1000:7.1f} ms")
+    report("binding powers", f"{pratt * 1000:7.1f} ms ({descent / pratt:.2f}x)")
+    report("nesting depth, recursive descent", f"{deepest(DescentParser):,}")
+    report("nesting depth, binding powers", f"{deepest(Parser):,}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,59 @@
+"""
+Flat program images (culebra.arena) against the object tree: size on disk,
+load time and memory held by a scaled program, plus evaluation time of the
+runnable examples with the flat and the tree-walking interpreter.
+
+Usage: python -m benchmarks.flat_ast [factor] [repeat]
+"""
+
+import contextlib
+import io
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import RUNNABLE_EXAMPLES, best_time, example_source, report, retained_memory, scaled_source
+from culebra.arena import FlatProgram
+from culebra.interpreter.flat_interpreter import FlatInterpreter
+from culebra.interpreter.interpreter import Interpreter
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+
+def parse(source: str):
+    return Parser(Lexer().tokenize(source)).parse()
+
+
+def main(factor: int = 50, repeat: int = 5) -> None:
+    program = parse(scaled_source(factor))
+    flat = FlatProgram.from_program(program)
+    with tempfile.TemporaryDirectory() as directory:
+        tree_path, image_path = Path(directory) / "tree.pickle", Path(directory) / "program.image"
+        tree_path.write_bytes(pickle.dumps(program, pickle.HIGHEST_PROTOCOL))
+        flat.dump(image_path)
+
+        report("nodes", f"{len(flat):,}")
+        report("pickled tree", f"{tree_path.stat().st_size:,} bytes")
+        report("image", f"{image_path.stat().st_size:,} bytes")
+        unpickling = best_time(lambda: pickle.loads(tree_path.read_bytes()), repeat)
+        mapping = best_time(lambda: FlatProgram.load(image_path), repeat)
+        report("unpickle tree", f"{unpickling * 1000:7.2f} ms")
+        report("map image", f"{mapping * 1000:7.2f} ms   ({unpickling / mapping:.1f}x)")
+
+        _, tree_bytes = retained_memory(lambda: pickle.loads(tree_path.read_bytes()))
+        _, image_bytes = retained_memory(lambda: FlatProgram.load(image_path))
+        report("tree memory", f"{tree_bytes:,} bytes")
+        report("mapped image memory (private)", f"{image_bytes:,} bytes")
+
+    for name in RUNNABLE_EXAMPLES:
+        program = parse(example_source(name))
+        flat = FlatProgram.from_program(program)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tree = best_time(lambda: Interpreter().evaluate(program), repeat)
+            flat_time = best_time(lambda: FlatInterpreter().evaluate(flat), repeat)
+        report(name, f"tree {tree * 1000:8.2f} ms   flat {flat_time * 1000:8.2f} ms   ({tree / flat_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
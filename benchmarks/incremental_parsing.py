@@ -0,0 +1,37 @@
+"""
+Reparse latency of a one-line edit in a 10k line program with
+`IncrementalParser.edit`, against parsing the edited program again, for
+edits near the start, the middle and the end.
+
+Usage: python -m benchmarks.incremental_parsing [lines] [repeat]
+"""
+
+import sys
+
+from benchmarks.common import best_time, report, scaled_source
+from culebra.lexer import Lexer
+from culebra.parser import IncrementalParser, Parser
+
+
+def main(lines: int = 10000, repeat: int = 5) -> None:
+    source = scaled_source(lines // scaled_source(1).count("\n") + 1)
+    report("source size", f"{source.count(chr(10)):,} lines")
+    full = best_time(lambda: Parser(Lexer().tokenize(source)).parse(), repeat)
+    report("full parse", f"{full * 1000:8.2f} ms")
+
+    incremental = IncrementalParser(source)
+    for name, fraction in [("start", 0.01), ("middle", 0.5), ("end", 0.99)]:
+        edit_start = incremental.source.index("print(", int(len(incremental.source) * fraction))
+        # Alternate between growing and shrinking the line so every edit moves the text after it
+        edits = iter([("print", "println"), ("println", "print")] * repeat)
+
+        def edit():
+            old, new = next(edits)
+            incremental.edit(edit_start, edit_start + len(old), new)
+
+        elapsed = best_time(edit, repeat * 2)
+        report(f"edit near the {name}", f"{elapsed * 1000:8.2f} ms   ({full / elapsed:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
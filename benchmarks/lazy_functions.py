@@ -0,0 +1,51 @@
+"""
+Parsing and running a helper library of many functions of which a script
+calls a few, with the bodies parsed eagerly against parsed when first
+called (`Parser(lazy_functions=True)`).
+
+Usage: python -m benchmarks.lazy_functions [functions] [repeat]
+"""
+
+import sys
+
+from benchmarks.common import best_time, report
+from culebra.interpreter.interpreter import Interpreter
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+HELPER = """
+def helper{i}(items, n):
+    total = 0
+    for j = 0; j < n; j = j + 1:
+        if items[j] > {i}:
+            total = total + items[j] * 2
+        elif items[j] == {i}:
+            total = total - 1
+        else:
+            total = total + f(items[j], [j, {i}])
+    return total
+"""
+
+
+def library_source(functions: int, used: int) -> str:
+    helpers = "".join(HELPER.format(i=i) for i in range(functions))
+    calls = "".join(f"x{i} = helper{i}([1, 2, 3], 0)\n" for i in range(0, functions, max(functions // used, 1)))
+    return helpers + calls
+
+
+def run(tokens, lazy_functions: bool) -> None:
+    program = Parser(tokens, lazy_functions=lazy_functions).parse()
+    Interpreter().evaluate(program)
+
+
+def main(functions: int = 2000, repeat: int = 5) -> None:
+    for used in [1, 10, 100, functions]:
+        tokens = Lexer().tokenize(library_source(functions, used))
+        eager = best_time(lambda: run(tokens, False), repeat)
+        lazy = best_time(lambda: run(tokens, True), repeat)
+        report(f"{used} of {functions} functions called",
+               f"eager {eager * 1000:7.1f} ms   lazy {lazy * 1000:7.1f} ms   ({eager / lazy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,63 @@
+"""
+Per token class cost of `scan_token` (first character dispatch) against a
+single alternation of the ordered `TokenRegex` patterns, plus the whole
+lexer over a scaled program.
+
+Usage: python -m benchmarks.lexer_token_classes [repeat]
+"""
+
+import re
+import sys
+
+from benchmarks.common import best_time, report, scaled_source
+from culebra.lexer import Lexer, TokenRegex, scan_token
+from culebra.token import TokenType
+
+TokenRegexAlternation = re.compile("|".join(
+    f"(?P<{token_type.name}>{regex.pattern})" for token_type, regex in TokenRegex.items()
+))
+
+SAMPLES = {
+    "identifiers": "alpha beta_2 gamma delta epsilon ",
+    "keywords": "while return continue false and or not ",
+    "numbers": "12345 3.25 7 99 ",
+    "operators": "==!=<=>=+-*/()[],:",
+    "strings": '"hello world" """triple quoted""" ',
+    "comments": "# a comment line\n",
+}
+
+
+def scan_with_dispatch(text: str) -> None:
+    i = 0
+    while i < len(text):
+        scanned = scan_token(text, i)
+        i = i + 1 if scanned is None else scanned[1]
+
+
+def scan_with_alternation(text: str) -> None:
+    i = 0
+    while i < len(text):
+        match = TokenRegexAlternation.match(text, i)
+        if match is None:
+            i += 1
+        else:
+            TokenType[match.lastgroup]
+            i = match.end()
+
+
+def main(repeat: int = 5) -> None:
+    for name, sample in SAMPLES.items():
+        text = sample * 5000
+        dispatch = best_time(lambda: scan_with_dispatch(text), repeat)
+        alternation = best_time(lambda: scan_with_alternation(text), repeat)
+        report(name, f"dispatch {dispatch * 1000:7.1f} ms   regex alternation {alternation * 1000:7.1f} ms"
+                     f"   ({alternation / dispatch:.2f}x)")
+
+    source = scaled_source(100)
+    lexer = Lexer()
+    report("whole program", f"{best_time(lambda: lexer.tokenize(source), repeat) * 1000:7.1f} ms"
+                            f" for {len(source):,} chars")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,38 @@
+"""
+Cost of decoding literal values in the lexer, on a data file of numeric
+and string array literals, and parse time with values decoded by the
+lexer or by the parser.
+
+Usage: python -m benchmarks.literal_decoding [rows]
+"""
+
+import sys
+
+from benchmarks.common import best_time, report
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+
+def data_source(rows: int) -> str:
+    numbers = ", ".join(f"{n * 7919 % 100003}" for n in range(50))
+    floats = ", ".join(f"{n}.{n * 37 % 1000}" for n in range(25))
+    strings = ", ".join(f'"item\\t{n}"' for n in range(25))
+    return "".join(f"row_{i} = [{numbers}, {floats}, {strings}]\n" for i in range(rows))
+
+
+def main(rows: int = 2000) -> None:
+    source = data_source(rows)
+    decoding = Lexer()
+    raw = Lexer(decode_literals=False)
+    tokens = decoding.tokenize(source)
+    raw_tokens = raw.tokenize(source)
+
+    report("source size", f"{len(source):,} chars, {len(tokens):,} tokens")
+    report("tokenize, values decoded", f"{best_time(lambda: decoding.tokenize(source)) * 1000:7.1f} ms")
+    report("tokenize, literals only", f"{best_time(lambda: raw.tokenize(source)) * 1000:7.1f} ms")
+    report("parse, values from tokens", f"{best_time(lambda: Parser(tokens).parse()) * 1000:7.1f} ms")
+    report("parse, values decoded by parser", f"{best_time(lambda: Parser(raw_tokens).parse()) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,55 @@
+"""
+Peak memory and time to tokenize a large generated program with data
+embedded as array literals, reading the file as text against lexing its
+memory-mapped UTF-8 bytes. Pages of the mapping are backed by the file and
+do not show up as Python allocations.
+
+Usage: python -m benchmarks.mmap_input [megabytes]
+"""
+
+import mmap
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import peak_memory, report
+from culebra.lexer import Lexer
+
+
+def generate(path: Path, megabytes: int) -> None:
+    row = "[" + ", ".join(str(n) for n in range(100)) + "]"
+    with open(path, "w") as f:
+        index = 0
+        while f.tell() < megabytes * 1024 * 1024:
+            f.write(f'data_{index} = {row}\nlabel_{index} = "row {index}"\n')
+            index += 1
+
+
+def read_text(path: Path):
+    return Lexer().tokenize_compact(path.read_text())
+
+
+def read_mapped(path: Path):
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return Lexer().tokenize_bytes(data)
+
+
+def main(megabytes: int = 4) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "data.culebra"
+        generate(path, megabytes)
+        report("source size", f"{path.stat().st_size:,} bytes")
+        for label, function in [("text read", read_text), ("mmap", read_mapped)]:
+            start = time.perf_counter()
+            function(path)
+            elapsed = time.perf_counter() - start
+            # Tracing slows allocation down, so memory is measured on a separate run
+            tokens, peak = peak_memory(lambda: function(path))
+            report(label, f"{len(tokens):,} tokens in {elapsed:.2f} s, peak {peak:,} bytes allocated")
+            del tokens
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
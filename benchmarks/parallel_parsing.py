@@ -0,0 +1,37 @@
+"""
+Lexing and parsing a large source in a process pool (`ParallelParser`)
+against a single `Lexer` and `Parser`, checking that both build the same
+program.
+
+Usage: python -m benchmarks.parallel_parsing [factor] [workers] [repeat]
+"""
+
+import os
+import sys
+
+from benchmarks.common import best_time, report, scaled_source
+from culebra.lexer import Lexer
+from culebra.parallel import ParallelParser
+from culebra.parser import Parser, positioned_nodes
+
+
+def positions(program):
+    return [(type(node), node.pos) for statement in program.statements for node in positioned_nodes(statement)]
+
+
+def main(factor: int = 400, workers: int = 0, repeat: int = 3) -> None:
+    workers = workers or os.cpu_count() or 1
+    source = scaled_source(factor)
+    sequential = Parser(Lexer().tokenize(source)).parse()
+    parallel = ParallelParser(source, workers).parse()
+    identical = repr(sequential) == repr(parallel) and positions(sequential) == positions(parallel)
+
+    single = best_time(lambda: Parser(Lexer().tokenize(source)).parse(), repeat)
+    pooled = best_time(lambda: ParallelParser(source, workers).parse(), repeat)
+    report(f"{len(source) / 1e6:.1f} MB, {workers} workers",
+           f"single {single * 1000:8.1f} ms   pool {pooled * 1000:8.1f} ms   ({single / pooled:.2f}x)"
+           f"   identical {identical}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
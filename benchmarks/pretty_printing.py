@@ -0,0 +1,51 @@
+"""
+Printing the tree of a scaled program with the streaming printer
+(`culebra.ast.pretty_lines`) against the recursive concatenation that
+`ASTNode.pretty` used before, and as JSON lines (`culebra.ast.json_lines`).
+Time and peak memory while writing to a discarding stream.
+
+Usage: python -m benchmarks.pretty_printing [factor] [repeat]
+"""
+
+import io
+import sys
+
+from benchmarks.common import best_time, peak_memory, report, scaled_source
+from culebra.ast import json_lines, pretty_lines, write_lines
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+
+def recursive_pretty(node, level=1):
+    """`ASTNode.pretty` before the streaming printer."""
+    if len(node.children) == 0:
+        return f"{'    ' * (level - 1)}└──{repr(node)}"
+    result = "    " * (level - 1) + "├── " + node.node_name
+    for child in node.children:
+        result += "\n" + recursive_pretty(child, level + 1)
+    return result
+
+
+class NullWriter(io.TextIOBase):
+    def write(self, text):
+        return len(text)
+
+
+def main(factor: int = 200, repeat: int = 3) -> None:
+    program = Parser(Lexer().tokenize(scaled_source(factor))).parse()
+    identical = recursive_pretty(program) == program.pretty()
+    out = NullWriter()
+    printers = [
+        ("recursive", lambda: out.write(recursive_pretty(program) + "\n")),
+        ("streaming", lambda: write_lines(pretty_lines(program), out)),
+        ("json lines", lambda: write_lines(json_lines(program), out)),
+    ]
+    for name, printer in printers:
+        elapsed = best_time(printer, repeat)
+        _, peak = peak_memory(printer)
+        report(name, f"{elapsed * 1000:8.1f} ms   peak {peak / 1024:9.1f} KiB")
+    report("identical output", str(identical))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
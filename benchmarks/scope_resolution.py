@@ -0,0 +1,58 @@
+"""
+Variable access through the frame slots of culebra.resolver against the
+search by name through the chain of environments, on deeply nested
+closures, recursion and the runnable examples. Resolution is included in
+the time of the resolved interpreter.
+
+Usage: python -m benchmarks.scope_resolution [depth] [iterations] [repeat]
+"""
+
+import contextlib
+import io
+import sys
+
+from benchmarks.common import RUNNABLE_EXAMPLES, best_time, example_source, report
+from culebra.interpreter.interpreter import Interpreter
+from culebra.interpreter.resolved_interpreter import ResolvedInterpreter
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+FIB = """
+def fib(n):
+    if n < 2:
+        return n
+    return fib(n - 1) + fib(n - 2)
+fib({n})
+"""
+
+
+def nested_closures(depth: int, iterations: int) -> str:
+    """Functions nested `depth` deep, the innermost one loops over the variables of all of them."""
+    lines = []
+    for level in range(depth):
+        indent = "    " * level
+        lines += [f"{indent}def f{level}():", f"{indent}    v{level} = {level}"]
+    indent = "    " * depth
+    total = " + ".join(f"v{level}" for level in range(depth))
+    lines += [f"{indent}total = 0",
+              f"{indent}for i = 0; i < {iterations}; i = i + 1:",
+              f"{indent}    total = total + {total}",
+              f"{indent}return total"]
+    for level in reversed(range(depth - 1)):
+        lines.append(f"{'    ' * (level + 1)}return f{level + 1}()")
+    return "\n".join(lines) + "\nf0()\n"
+
+
+def main(depth: int = 8, iterations: int = 2000, repeat: int = 5) -> None:
+    programs = [(f"closures {depth} deep", nested_closures(depth, iterations)), ("fib", FIB.format(n=16))]
+    programs += [(name, example_source(name)) for name in RUNNABLE_EXAMPLES]
+    for name, source in programs:
+        program = Parser(Lexer().tokenize(source)).parse()
+        with contextlib.redirect_stdout(io.StringIO()):
+            chain = best_time(lambda: Interpreter().evaluate(program), repeat)
+            slots = best_time(lambda: ResolvedInterpreter().evaluate(program), repeat)
+        report(name, f"by name {chain * 1000:8.2f} ms   slots {slots * 1000:8.2f} ms   ({chain / slots:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
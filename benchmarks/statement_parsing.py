@@ -0,0 +1,64 @@
+"""
+Parsing identifier-led statements once (`Parser._parse_statement`) against
+parsing an assignment target first and backtracking when no `=` follows,
+on call heavy code, assignment heavy code and the example programs.
+
+Usage: python -m benchmarks.statement_parsing [statements] [repeat]
+"""
+
+import random
+import sys
+
+from benchmarks.common import best_time, report, scaled_source
+from culebra.ast import Identifier
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+from culebra.token import TokenType
+
+
+class BacktrackingParser(Parser):
+    """Parses a possible assignment target first, and the statement again when it is not one."""
+
+    def _parse_statement(self):
+        if self._current_token.type == TokenType.IDENTIFIER:
+            start_index = self.index
+            target = self._parse_assignment_target()
+            if self._current_token is not None and self._current_token.type == TokenType.ASSIGN:
+                return self._parse_assignment_statement(target)
+            self.index = start_index
+        return super()._parse_statement()
+
+    def _parse_assignment_target(self):
+        target = Identifier(self._current_token, self._current_token.literal)
+        self._advance_token()
+        while self._has_token() and self._current_token.type == TokenType.LBRACKET:
+            target = self._parse_bracket_access(target)
+            if target is None:
+                return None
+        return target
+
+
+def call_source(statements: int) -> str:
+    rng = random.Random(15)
+    calls = ["print(a, b[i], f(x, 2))", "f(g(x), h(y, z))", "log(i * 2 + 1)", "items[i]", "print(\"done\")"]
+    return "\n".join(rng.choice(calls) for _ in range(statements)) + "\n"
+
+
+def assignment_source(statements: int) -> str:
+    rng = random.Random(15)
+    assignments = ["a = b + 1", "grid[i][j] = f(x)", "x = y", "items[i] = items[i - 1] * 2"]
+    return "\n".join(rng.choice(assignments) for _ in range(statements)) + "\n"
+
+
+def main(statements: int = 20000, repeat: int = 5) -> None:
+    for name, source in [("calls", call_source(statements)), ("assignments", assignment_source(statements)),
+                         ("examples", scaled_source(50))]:
+        tokens = Lexer().tokenize(source)
+        single = best_time(lambda: Parser(tokens).parse(), repeat)
+        backtracking = best_time(lambda: BacktrackingParser(tokens).parse(), repeat)
+        report(name, f"single pass {single * 1000:7.1f} ms   backtracking {backtracking * 1000:7.1f} ms"
+                     f"   ({backtracking / single:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,42 @@
+"""
+Escape processing of a multi-megabyte triple quoted literal, against the
+character by character loop it replaced.
+
+Usage: python -m benchmarks.string_escapes [megabytes]
+"""
+
+import sys
+
+from benchmarks.common import best_time, report
+from culebra.lexer import EscapeSequences, Lexer, process_escape_sequences
+
+
+def character_loop(s: str) -> str:
+    result = ''
+    i = 0
+    while i < len(s):
+        if s[i] == '\\' and i + 1 < len(s):
+            escape_seq = s[i:i+2]
+            result += EscapeSequences.get(escape_seq, escape_seq)
+            i += 2
+        else:
+            result += s[i]
+            i += 1
+    return result
+
+
+def main(megabytes: int = 4) -> None:
+    line = 'template line with \\"quotes\\", a tab\\t and \\\\ backslashes\\n'
+    content = line * (megabytes * 1024 * 1024 // len(line))
+    source = f'blob = """{content}"""\n'
+
+    report("literal size", f"{len(content):,} chars")
+    loop = best_time(lambda: character_loop(content), 1)
+    split_replace = best_time(lambda: process_escape_sequences(content), 3)
+    report("character loop", f"{loop * 1000:7.1f} ms")
+    report("split and replace", f"{split_replace * 1000:7.1f} ms ({loop / split_replace:.1f}x)")
+    report("tokenize with decoding", f"{best_time(lambda: Lexer().tokenize(source), 3) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
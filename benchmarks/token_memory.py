@@ -0,0 +1,29 @@
+"""
+Memory held by the token stream of a large program, as a `list[Token]`
+and as a `TokenBuffer`.
+
+Usage: python -m benchmarks.token_memory [factor]
+"""
+
+import sys
+
+from benchmarks.common import report, retained_memory, scaled_source
+from culebra.lexer import Lexer
+
+
+def main(factor: int = 200) -> None:
+    source = scaled_source(factor)
+    lexer = Lexer()
+    tokens, list_bytes = retained_memory(lambda: lexer.tokenize(source))
+    del tokens
+    buffer, buffer_bytes = retained_memory(lambda: lexer.tokenize_compact(source))
+
+    report("source size", f"{len(source):,} chars")
+    report("tokens", f"{len(buffer):,}")
+    report("list[Token]", f"{list_bytes:,} bytes ({list_bytes / len(source):.1f}x source)")
+    report("TokenBuffer", f"{buffer_bytes:,} bytes ({buffer_bytes / len(source):.1f}x source)")
+    report("reduction", f"{list_bytes / buffer_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
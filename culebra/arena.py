@@ -0,0 +1,219 @@
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+from culebra import ast
+from culebra.token import Token, TokenType
+
+"""
+Flat AST
+========
+
+A program stored in a few contiguous arrays instead of a graph of node
+objects. Nodes are numbered in post-order, so the children of a node come
+before it and the Program is the last node:
+
+    x = 1 + y       index  kind           position  operands
+                    0      Identifier     0         [0]     literals[0] = 'x'
+                    1      Integer        4         [1]     literals[1] = 1
+                    2      Identifier     8         [2]     literals[2] = 'y'
+                    3      PlusOperation  6         [1, 2]
+                    4      Assignment     2         [0, 3]
+                    5      Program        -1        [4]
+
+    kinds[i]        code of the node class in NodeKinds (one byte)
+    positions[i]    source position of the node token, -1 for blocks
+    operands[offsets[i]:offsets[i + 1]]
+                    node indices of the children in the order of
+                    NodeLayouts (-1 for a missing child), or the index of
+                    the value in the literal pool for literal nodes
+    literals        pool of the distinct literal values and identifier names
+
+Image format (native byte order, 32-bit integers, sections aligned to 8 bytes):
+
+    header   magic, version, byte order mark, node, operand and literal counts
+    kinds | positions | offsets | operands | literal tags | literal offsets | literal text
+
+`FlatProgram.load` maps an image and views its arrays in place with
+memoryview, only the literal pool is decoded into Python objects. Worker
+processes that map the same file share its pages.
+"""
+
+# Concrete node classes with the type of their token, the index is the kind code
+NodeKinds: List[Tuple[type, Optional[TokenType]]] = [
+    (cls, getattr(cls, 'token_kind', None)) for cls in [
+        ast.Program, ast.Block, ast.Identifier, ast.Integer, ast.Float, ast.String, ast.Bool,
+        ast.BracketAccess, ast.Assignment,
+        ast.PlusOperation, ast.MinusOperation, ast.MultiplicationOperation, ast.DivisionOperation,
+        ast.AndOperation, ast.OrOperation, ast.GreaterOperation, ast.GreaterOrEqualOperation,
+        ast.LessOperation, ast.LessOrEqualOperation, ast.EqualOperation, ast.NotEqualOperation,
+        ast.NegativeOperation, ast.NotOperation,
+        ast.FunctionCall, ast.FunctionDefinition, ast.ReturnStatement, ast.While, ast.For, ast.Array,
+    ]
+] + [(ast.Conditional, token_type) for token_type in [TokenType.IF, TokenType.ELIF, TokenType.ELSE]]
+
+KindCodes = {kind: code for code, kind in enumerate(NodeKinds)}
+# Lazily parsed function bodies are stored as the Block they parse to, constant arrays as arrays
+KindCodes[ast.LazyBlock, None] = KindCodes[ast.Block, None]
+KindCodes[ast.ConstantArray, ast.Array.token_kind] = KindCodes[ast.Array, ast.Array.token_kind]
+
+# Children of each node class as operands: fixed fields, then the items of a list field
+NodeLayouts = {
+    node_class: (node_class.child_fields, node_class.child_list)
+    for node_class in [cls for cls, _ in NodeKinds] + [ast.LazyBlock, ast.ConstantArray]
+}
+
+ImageMagic = b'CULA'
+ImageVersion = 1
+ByteOrderMark = 0x01020304
+ImageHeader = struct.Struct('=4sHIqqqq')
+LiteralTypes = [int, float, str, bool]
+
+
+def align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def child_nodes(node: ast.ASTNode) -> List[Optional[ast.ASTNode]]:
+    fields, list_field = NodeLayouts[type(node)]
+    children = [getattr(node, field) for field in fields]
+    if list_field is not None:
+        children.extend(getattr(node, list_field))
+    return children
+
+
+class FlatProgram:
+    def __init__(self, kinds: Sequence[int], positions: Sequence[int], offsets: Sequence[int],
+                 operands: Sequence[int], literals: List[Union[int, float, str, bool]]):
+        self.kinds = kinds
+        self.positions = positions
+        self.offsets = offsets
+        self.operands = operands
+        self.literals = literals
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def root(self) -> int:
+        """Index of the Program node."""
+        return len(self.kinds) - 1
+
+    @classmethod
+    def from_program(cls, program: ast.Program) -> 'FlatProgram':
+        """Flattens a program, walking it without recursion so deep trees are supported."""
+        kinds, positions, offsets, operands = array('B'), array('i'), array('i', [0]), array('i')
+        literals, literal_index = [], {}
+        results = []
+        stack = [(program, False)]
+        while stack:
+            node, expanded = stack.pop()
+            children = child_nodes(node)
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children) if child is not None)
+                continue
+
+            if isinstance(node, ast.LiteralValue):
+                # Keyed by type too, since 1, 1.0 and true are equal
+                key = (type(node.value), node.value)
+                if key not in literal_index:
+                    literal_index[key] = len(literals)
+                    literals.append(node.value)
+                operands.append(literal_index[key])
+            else:
+                count = sum(child is not None for child in children)
+                indices = iter(results[len(results) - count:])
+                del results[len(results) - count:]
+                operands.extend(-1 if child is None else next(indices) for child in children)
+
+            kinds.append(KindCodes[type(node), getattr(node, 'token_kind', None)])
+            positions.append(getattr(node, 'pos', -1))
+            offsets.append(len(operands))
+            results.append(len(kinds) - 1)
+        return cls(kinds, positions, offsets, operands, literals)
+
+    def operands_of(self, index: int) -> Sequence[int]:
+        return self.operands[self.offsets[index]:self.offsets[index + 1]]
+
+    def token_at(self, index: int) -> Token:
+        """A token with the type and position of a node, for error reporting."""
+        _, token_type = NodeKinds[self.kinds[index]]
+        return Token(token_type, "", self.positions[index])
+
+    def to_program(self) -> ast.Program:
+        """Rebuilds the node objects of the program."""
+        nodes = []
+        for index in range(len(self.kinds)):
+            cls, token_type = NodeKinds[self.kinds[index]]
+            token = Token(token_type, "", self.positions[index])
+            operands = self.operands_of(index)
+            if issubclass(cls, ast.LiteralValue):
+                nodes.append(cls(token, self.literals[operands[0]]))
+                continue
+            fields, list_field = NodeLayouts[cls]
+            children = [None if operand == -1 else nodes[operand] for operand in operands]
+            arguments = dict(zip(fields, children))
+            if list_field is not None:
+                arguments[list_field] = children[len(fields):]
+            nodes.append(cls(**arguments) if issubclass(cls, ast.Block) else cls(token, **arguments))
+        return nodes[self.root]
+
+    def to_bytes(self) -> bytes:
+        """Serializes the program as an image, see the module notes."""
+        texts = [str(value).encode('utf-8') if type(value) is not float else repr(value).encode()
+                 for value in self.literals]
+        tags = array('B', [LiteralTypes.index(type(value)) for value in self.literals])
+        text_offsets = array('q', [0])
+        for text in texts:
+            text_offsets.append(text_offsets[-1] + len(text))
+
+        header = ImageHeader.pack(ImageMagic, ImageVersion, ByteOrderMark,
+                                  len(self.kinds), len(self.operands), len(self.literals), text_offsets[-1])
+        parts = [header]
+        size = len(header)
+        for section in [bytes(self.kinds), bytes(self.positions), bytes(self.offsets), bytes(self.operands),
+                        bytes(tags), bytes(text_offsets), b''.join(texts)]:
+            padding = align(size) - size
+            parts += [b'\0' * padding, section]
+            size += padding + len(section)
+        return b''.join(parts)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> 'FlatProgram':
+        """Views the arrays of an image in place, without copying them."""
+        view = memoryview(buffer)
+        magic, version, byte_order, nodes, operands, literals, text_size = ImageHeader.unpack_from(view)
+        if magic != ImageMagic or version != ImageVersion:
+            raise ValueError("Not a Culebra program image of this version")
+        if byte_order != ByteOrderMark:
+            raise ValueError("The program image was written with another byte order")
+
+        sections = []
+        offset = ImageHeader.size
+        for format, count in [('B', nodes), ('i', nodes), ('i', nodes + 1), ('i', operands),
+                              ('B', literals), ('q', literals + 1), ('B', text_size)]:
+            offset = align(offset)
+            size = count * struct.calcsize(format)
+            sections.append(view[offset:offset + size].cast(format))
+            offset += size
+        kinds, positions, offsets, operands, tags, text_offsets, text = sections
+
+        pool = []
+        for tag, start, end in zip(tags, text_offsets, text_offsets[1:]):
+            value = str(text[start:end], 'utf-8')
+            literal_type = LiteralTypes[tag]
+            pool.append(value == 'True' if literal_type is bool else literal_type(value))
+        return cls(kinds, positions, offsets, operands, pool)
+
+    def dump(self, path: Union[str, Path]) -> None:
+        Path(path).write_bytes(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'FlatProgram':
+        """Maps an image file, its pages are shared by every process that loads it."""
+        with open(path, 'rb') as f:
+            # The mapping stays valid after the file is closed
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(data)
@@ -1,9 +1,27 @@
+import json
 from abc import ABC, abstractmethod
+from operator import attrgetter
+from culebra.lexer import KeywordTokens, OneCharTokens, TwoCharTokens
 from culebra.token import Token, TokenType
-from typing import List, Optional, Union
+from typing import Callable, ClassVar, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+
+# Source text of the tokens that are always spelled the same, to rebuild the token of a node
+TokenSpellings = {
+    token_type: text
+    for table in [OneCharTokens, TwoCharTokens, {word: token_type for word, (token_type, _) in KeywordTokens.items()}]
+    for text, token_type in table.items()
+}
 
 
 class ASTNode(ABC):
+    __slots__ = ()
+
+    # Fields holding the child nodes, then the field holding a list of child nodes. Traversals visit them in
+    # this order, the source order but for FunctionDefinition, whose arguments come after its body (the
+    # operands of a flat program have the same layout, see culebra.arena)
+    child_fields: ClassVar[Tuple[str, ...]] = ()
+    child_list: ClassVar[Optional[str]] = None
+
     @abstractmethod
     def __repr__(self) -> str:
         pass
@@ -18,20 +36,11 @@ class ASTNode(ABC):
         return self.__class__.__name__
 
     def pretty(self, level: int = 1) -> str:
-        is_last = len(self.children) == 0
-        if is_last:
-            prefix = "    " * (level - 1)
-            return f"{prefix}└──{repr(self)}"
-
-        prefix = "    " * (level - 1) +  "├── "
-        result = prefix + self.node_name
-
-        for i, child in enumerate(self.children):
-            result += "\n" + child.pretty(level + 1)
-
-        return result
+        return "\n".join(pretty_lines(self, level))
 
 class TokenizedASTNode(ASTNode, ABC):
+    __slots__ = ()
+
     @abstractmethod
     def token_literal(self) -> str:
         pass
@@ -41,27 +50,36 @@ class TokenizedASTNode(ASTNode, ABC):
         pass
 
 class Statement(TokenizedASTNode, ABC):
-    def __init__(self, token: Token):
-        self.token = token
+    """
+    Node built from a token. Only the position of the token is kept (cold
+    data for error reporting), its type is the same for every node of a
+    class and is stored on the class as `token_kind`.
+    """
+    __slots__ = ('pos',)
 
-    def token_literal(self) -> str:
-        return self.token.literal
+    token_kind: ClassVar[Optional[TokenType]] = None
 
-    def token_type(self) -> TokenType:
-        return self.token.type
-
-class Expression(Statement, ABC):
     def __init__(self, token: Token):
-        super().__init__(token)
-        self.token = token
+        self.pos = token.pos
+
+    @property
+    def token(self) -> Token:
+        """The token of the node, rebuilt from its type and position."""
+        return Token(self.token_type(), self.token_literal(), self.pos)
 
     def token_literal(self) -> str:
-        return self.token.literal
+        return TokenSpellings.get(self.token_kind)
 
     def token_type(self) -> TokenType:
-        return self.token.type
+        return self.token_kind
+
+class Expression(Statement, ABC):
+    __slots__ = ()
 
 class Block(ASTNode):
+    __slots__ = ('statements',)
+    child_list = 'statements'
+
     def __init__(self, statements: List[Statement]):
         self.statements = statements
 
@@ -72,15 +90,56 @@ class Block(ASTNode):
     def children(self) -> List['ASTNode']:
         return self.statements
 
+class LazyBlock(Block):
+    """
+    Body of a function whose statements are parsed from its tokens the first
+    time they are used (see `Parser(lazy_functions=True)`). A body that fails
+    to parse raises its SyntaxError on every use, `token` is where it failed.
+    """
+    __slots__ = ('tokens', 'parse', 'error_token', '_statements')
+
+    def __init__(self, tokens: List[Token], parse: Callable[['LazyBlock'], List[Statement]]):
+        self.tokens = tokens
+        self.parse = parse
+        self.error_token = None
+        self._statements = None
+
+    @property
+    def statements(self) -> List[Statement]:
+        if self._statements is None:
+            self._statements = self.parse(self)
+            # The tokens are only needed once
+            self.tokens = self.parse = None
+        return self._statements
+
+    @property
+    def is_parsed(self) -> bool:
+        return self._statements is not None
+
+    @property
+    def token(self) -> Token:
+        return self.error_token or self.tokens[0]
+
+    def __reduce__(self):
+        # Pickled as the Block it parses to
+        return Block, (self.statements,)
+
 class Program(Block):
+    __slots__ = ()
+
     def __init__(self, statements: List[Statement]):
         super().__init__(statements)
 
 class LiteralValue[T](Expression, ABC):
+    __slots__ = ('value',)
+
     def __init__(self, token: Token, value: T):
         super().__init__(token)
         self.value = value
 
+    def token_literal(self) -> str:
+        return str(self.value)
+
     def __repr__(self) -> str:
         return f"{self.node_name}({self.value})"
 
@@ -89,10 +148,22 @@ class LiteralValue[T](Expression, ABC):
         return []
 
 class Identifier(LiteralValue[str]):
+    # Where the variable lives, set by culebra.resolver: `depth` frames up, at index `slot` (None for globals),
+    # or the `chain` of the places that may hold it when that depends on the order the program runs
+    __slots__ = ('depth', 'slot', 'chain')
+    token_kind = TokenType.IDENTIFIER
+
     def __init__(self, token: Token, value: str):
         super().__init__(token, value)
+        self.depth = None
+        self.slot = None
+        self.chain = None
 
 class BracketAccess(Expression):
+    __slots__ = ('target', 'index')
+    token_kind = TokenType.LBRACKET
+    child_fields = ('target', 'index')
+
     def __init__(self, token: Token, target: Expression, index: Expression):
         super().__init__(token)
         self.target = target
@@ -106,6 +177,10 @@ class BracketAccess(Expression):
         return [self.target, self.index]
 
 class Assignment(Statement):
+    __slots__ = ('identifier', 'value')
+    token_kind = TokenType.ASSIGN
+    child_fields = ('identifier', 'value')
+
     def __init__(self, token: Token, identifier: Union[Identifier, BracketAccess], value: Expression):
         super().__init__(token)
         self.identifier = identifier
@@ -119,22 +194,40 @@ class Assignment(Statement):
         return [self.identifier, self.value]
 
 class Integer(LiteralValue[int]):
+    __slots__ = ()
+    token_kind = TokenType.NUMBER
+
     def __init__(self, token: Token, value: int):
         super().__init__(token, value)
 
 class Float(LiteralValue[float]):
+    __slots__ = ()
+    token_kind = TokenType.FLOAT
+
     def __init__(self, token: Token, value: float):
         super().__init__(token, value)
 
 class String(LiteralValue[str]):
+    __slots__ = ()
+    token_kind = TokenType.STRING
+
     def __init__(self, token: Token, value: str):
         super().__init__(token, value)
 
 class Bool(LiteralValue[bool]):
+    __slots__ = ()
+    token_kind = TokenType.BOOLEAN
+
+    def token_literal(self) -> str:
+        return 'true' if self.value else 'false'
+
     def __init__(self, token: Token, value: bool):
         super().__init__(token, value)
 
 class BinaryOperation(Expression, ABC):
+    __slots__ = ('left', 'right')
+    child_fields = ('left', 'right')
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token)
         self.left = left
@@ -148,54 +241,93 @@ class BinaryOperation(Expression, ABC):
         return [self.left, self.right]
 
 class PlusOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.PLUS
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class MinusOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.MINUS
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class MultiplicationOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.MUL
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class DivisionOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.DIV
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class AndOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.AND
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class OrOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.OR
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class GreaterOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.GREATER
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class GreaterOrEqualOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.GREATER_EQ
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class LessOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.LESS
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class LessOrEqualOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.LESS_EQ
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class EqualOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.EQUAL
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class NotEqualOperation(BinaryOperation):
+    __slots__ = ()
+    token_kind = TokenType.NOT_EQUAL
+
     def __init__(self, token: Token, left: Expression, right: Expression):
         super().__init__(token, left, right)
 
 class PrefixOperation(Expression, ABC):
+    __slots__ = ('value',)
+    child_fields = ('value',)
+
     def __init__(self, token: Token, value: Expression):
         super().__init__(token)
         self.value = value
@@ -208,19 +340,33 @@ class PrefixOperation(Expression, ABC):
         return [self.value]
 
 class NegativeOperation(PrefixOperation):
+    __slots__ = ()
+    token_kind = TokenType.MINUS
+
     def __init__(self, token: Token, value: Expression):
         super().__init__(token, value)
 
 class NotOperation(PrefixOperation):
+    __slots__ = ()
+    token_kind = TokenType.NOT
+
     def __init__(self, token: Token, value: Expression):
         super().__init__(token, value)
 
 class FunctionCall(Expression, ABC):
+    __slots__ = ('function', 'arguments')
+    token_kind = TokenType.IDENTIFIER
+    child_fields = ('function',)
+    child_list = 'arguments'
+
     def __init__(self, token: Token, function: Identifier, arguments: List[Expression]):
         super().__init__(token)
         self.function = function
         self.arguments = arguments
 
+    def token_literal(self) -> str:
+        return self.function.value
+
     @property
     def children(self) -> List['ASTNode']:
         return self.arguments
@@ -233,11 +379,18 @@ class FunctionCall(Expression, ABC):
         return f"{self.__class__.__name__}({self.function}, {self.arguments})"
 
 class FunctionDefinition(Statement):
+    # `scope` is the static scope of the body, set by culebra.resolver
+    __slots__ = ('name', 'arguments', 'body', 'scope')
+    token_kind = TokenType.FUNCTION_DEFINITION
+    child_fields = ('name', 'body')
+    child_list = 'arguments'
+
     def __init__(self, token: Token, name: Identifier, arguments: List[Identifier], body: Block):
         super().__init__(token)
         self.name = name
         self.arguments = arguments
         self.body = body
+        self.scope = None
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.name}, {self.arguments}, {self.body.statements})"
@@ -251,6 +404,10 @@ class FunctionDefinition(Statement):
         return self.body.children
 
 class ReturnStatement(Statement):
+    __slots__ = ('value',)
+    token_kind = TokenType.RETURN
+    child_fields = ('value',)
+
     def __init__(self, token: Token, value: Expression):
         super().__init__(token)
         self.value = value
@@ -263,8 +420,12 @@ class ReturnStatement(Statement):
         return [self.value]
 
 class Conditional(Statement):
+    __slots__ = ('token_kind', 'condition', 'body', 'otherwise')
+    child_fields = ('condition', 'body', 'otherwise')
+
     def __init__(self, token: Token, condition: Expression, body: Block, otherwise: Optional['Conditional']):
         super().__init__(token)
+        self.token_kind = token.type  # IF, ELIF or ELSE
         self.condition = condition
         self.body = body
         self.otherwise = otherwise
@@ -282,6 +443,10 @@ class Conditional(Statement):
         return [self.body]
 
 class While(Statement):
+    __slots__ = ('condition', 'body')
+    token_kind = TokenType.WHILE
+    child_fields = ('condition', 'body')
+
     def __init__(self, token: Token, condition: Expression, body: Block):
         super().__init__(token)
         self.condition = condition
@@ -295,6 +460,10 @@ class While(Statement):
         return f"{self.__class__.__name__}({self.condition}) Then [{self.body}]"
 
 class For(Statement):
+    __slots__ = ('condition', 'body', 'post', 'pre')
+    token_kind = TokenType.FOR
+    child_fields = ('pre', 'condition', 'post', 'body')
+
     def __init__(self, token: Token, condition: Expression, body: Block, post: Statement, pre: Statement):
         super().__init__(token)
         self.condition = condition
@@ -306,9 +475,13 @@ class For(Statement):
 
     @property
     def children(self) -> List['ASTNode']:
-        return [self.condition, self.pre, self.condition, self.post]
+        return [self.pre, self.condition, self.post, self.body]
 
 class Array(Expression):
+    __slots__ = ('elements',)
+    token_kind = TokenType.LBRACKET
+    child_list = 'elements'
+
     def __init__(self, token: Token, elements: List[Expression]):
         super().__init__(token)
         self.elements = elements
@@ -319,4 +492,222 @@ class Array(Expression):
 
     @property
     def children(self) -> List['ASTNode']:
-        return self.elements
\ No newline at end of file
+        return self.elements
+class ConstantArray(Array):
+    """
+    Array of literal elements, with their values evaluated once (see
+    culebra.optimizer). Each evaluation copies `values` into a new list,
+    since arrays are mutable.
+    """
+    __slots__ = ('values',)
+
+    def __init__(self, token: Token, elements: List[Expression]):
+        super().__init__(token, elements)
+        self.values = tuple(element.value for element in elements)
+
+
+# Traversal
+# =========
+#
+# The children of a node are read with getters built once per node class
+# from its `child_fields` and `child_list` (see `child_getters`), so walking
+# a tree does not look fields up by name nor build the `children` list of
+# every node. Every
+# traversal is iterative, except `NodeVisitor` where visit methods choose
+# when to descend. The body of a LazyBlock that was not parsed yet has no
+# children: traversals do not parse it.
+
+NoChildren = ()
+
+# Getters of the fixed children (a tuple) and of the child list of each node class, None when it has
+# none, see `child_getters`
+ChildGetters: Dict[type, Tuple[Optional[Callable[[ASTNode], Tuple[Optional[ASTNode], ...]]],
+                               Optional[Callable[[ASTNode], Sequence[ASTNode]]]]] = {}
+
+
+def child_getters(node_class: type):
+    getters = ChildGetters.get(node_class)
+    if getters is None:
+        fields, list_field = node_class.child_fields, node_class.child_list
+        fixed = None
+        if len(fields) == 1:
+            single = attrgetter(fields[0])
+            fixed = lambda node: (single(node),)
+        elif fields:
+            fixed = attrgetter(*fields)
+
+        items = None
+        if issubclass(node_class, LazyBlock):
+            items = lambda node: node.statements if node.is_parsed else NoChildren
+        elif list_field is not None:
+            items = attrgetter(list_field)
+        getters = ChildGetters[node_class] = (fixed, items)
+    return getters
+
+
+def iter_child_nodes(node: ASTNode) -> Iterator[ASTNode]:
+    """Yields the children of `node`, of its `child_fields` then of its `child_list`, skipping missing ones."""
+    fixed, items = child_getters(type(node))
+    if fixed is not None:
+        for child in fixed(node):
+            if child is not None:
+                yield child
+    if items is not None:
+        yield from items(node)
+
+
+def walk(node: ASTNode) -> Iterator[ASTNode]:
+    """Yields `node` and all its descendants in pre-order, without recursion."""
+    stack = [node]
+    pop, append, extend = stack.pop, stack.append, stack.extend
+    getters = ChildGetters
+    while stack:
+        node = pop()
+        yield node
+        fixed, items = getters.get(type(node)) or child_getters(type(node))
+        if items is not None:
+            extend(items(node)[::-1])
+        if fixed is not None:
+            for child in fixed(node)[::-1]:
+                if child is not None:
+                    append(child)
+
+
+class NodeVisitor:
+    """
+    Calls `visit_<Class>` for a node, where Class is the first class of the
+    node's MRO with such a method (e.g. `visit_BinaryOperation` handles every
+    operation), or `generic_visit`, which visits the children. The method of
+    each node class is looked up once per visitor class.
+
+    `visit` recurses along the tree, use `walk` or `NodeTransformer` on trees
+    deeper than the recursion limit.
+    """
+    _dispatch: ClassVar[Dict[type, Callable[['NodeVisitor', ASTNode], object]]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
+    def visit(self, node: ASTNode):
+        method = self._dispatch.get(type(node))
+        if method is None:
+            method = self._dispatch[type(node)] = self._method_for(type(node))
+        return method(self, node)
+
+    @classmethod
+    def _method_for(cls, node_class: type) -> Callable[['NodeVisitor', ASTNode], object]:
+        for base in node_class.__mro__:
+            method = getattr(cls, f"visit_{base.__name__}", None)
+            if method is not None:
+                return method
+        return cls.generic_visit
+
+    def generic_visit(self, node: ASTNode):
+        for child in iter_child_nodes(node):
+            self.visit(child)
+
+
+class NodeTransformer(NodeVisitor):
+    """
+    Rewrites a tree bottom-up and in place: `transform` visits the children
+    of a node before the node itself, without recursion, and stores what each
+    visit method returns in place of the visited node. A visit method gets a
+    node whose children are already transformed; returning the node keeps
+    it, and returning None removes it from a list of children (statements,
+    elements or arguments) or leaves a missing child.
+    """
+
+    def transform(self, node: ASTNode) -> Optional[ASTNode]:
+        results = []
+        # Entries are (node, None) before its children are pushed and (node, its fixed children) after
+        stack = [(node, None)]
+        while stack:
+            node, fixed_children = stack.pop()
+            if node is None:
+                results.append(None)
+                continue
+            fixed, items = child_getters(type(node))
+            if fixed_children is None:
+                fixed_children = NoChildren if fixed is None else fixed(node)
+                stack.append((node, fixed_children))
+                if items is not None:
+                    stack.extend((child, None) for child in reversed(items(node)))
+                stack.extend((child, None) for child in reversed(fixed_children))
+                continue
+
+            item_children = NoChildren if items is None else items(node)
+            count = len(fixed_children) + len(item_children)
+            if count:
+                transformed = results[len(results) - count:]
+                del results[len(results) - count:]
+                for field, child, new_child in zip(node.child_fields, fixed_children, transformed):
+                    if new_child is not child:
+                        setattr(node, field, new_child)
+                new_items = transformed[len(fixed_children):]
+                if any(new_item is not item for new_item, item in zip(new_items, item_children)):
+                    item_children[:] = [item for item in new_items if item is not None]
+            results.append(self.visit(node))
+        return results[0]
+
+    def generic_visit(self, node: ASTNode) -> Optional[ASTNode]:
+        return node
+
+
+def pretty_lines(node: ASTNode, level: int = 1) -> Iterator[str]:
+    """
+    Yields the lines of `node.pretty(level)` one at a time, without recursion:
+    a node with `children` is its name followed by its children one level
+    deeper, a node without them is its repr.
+    """
+    stack = [(node, level)]
+    while stack:
+        node, level = stack.pop()
+        children = node.children
+        if len(children) == 0:
+            yield f"{'    ' * (level - 1)}└──{node!r}"
+        else:
+            yield f"{'    ' * (level - 1)}├── {node.node_name}"
+            stack.extend((child, level + 1) for child in reversed(children))
+
+
+def json_lines(node: ASTNode) -> Iterator[str]:
+    """
+    Yields a JSON object per node of the tree, in pre-order and without
+    recursion, e.g. for `x = 1`:
+
+        {"id": 0, "parent": null, "field": null, "type": "Program"}
+        {"id": 1, "parent": 0, "field": "statements", "type": "Assignment", "token": "ASSIGN", "pos": 2}
+        {"id": 2, "parent": 1, "field": "identifier", "type": "Identifier", "token": "IDENTIFIER", "pos": 0, "value": "x"}
+        {"id": 3, "parent": 1, "field": "value", "type": "Integer", "token": "NUMBER", "pos": 4, "value": 1}
+
+    `field` is the field of the parent that holds the node. Unlike `pretty`,
+    every child is listed (see `child_getters`).
+    """
+    # Ids, field, class and token names need no escaping, only literal values are encoded
+    encode = json.JSONEncoder().encode
+    stack = [(node, "null", "null")]
+    next_id = 0
+    while stack:
+        node, parent, field = stack.pop()
+        line = f'{{"id": {next_id}, "parent": {parent}, "field": {field}, "type": "{type(node).__name__}"'
+        if isinstance(node, Statement):
+            line += f', "token": "{node.token_kind.name}", "pos": {node.pos}'
+        if isinstance(node, LiteralValue):
+            line += f', "value": {encode(node.value)}'
+        yield line + "}"
+
+        fixed, items = child_getters(type(node))
+        if items is not None:
+            list_field = f'"{node.child_list}"'
+            stack.extend((child, next_id, list_field) for child in reversed(items(node)))
+        if fixed is not None:
+            stack.extend((child, next_id, f'"{field}"') for field, child in zip(reversed(node.child_fields),
+                                                                                reversed(fixed(node)))
+                         if child is not None)
+        next_id += 1
+
+
+def write_lines(lines: Iterable[str], out: TextIO) -> None:
+    """Writes `lines` to `out` as they are produced."""
+    out.writelines(f"{line}\n" for line in lines)
@@ -0,0 +1,97 @@
+import hashlib
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+from culebra.ast import Program
+
+"""
+On-disk AST cache
+=================
+
+Parsed programs are pickled next to their script, in the same spirit as
+CPython's __pycache__:
+
+    examples/loops.culebra
+    examples/__culebracache__/loops.culebra.<tag>.ast
+
+A cache file holds two pickles: a header and the Program. The header is
+read first, so a stale entry is rejected without unpickling its tree:
+
+    (CacheTag, source mtime_ns, source size, sha256 of the source)
+
+The entry is valid when its tag is the current one and the source either
+has the same mtime and size (no need to read it) or the same hash (the
+file was touched, e.g. by a checkout, but not changed).
+
+The tag identifies the interpreter: the Python cache tag, because the
+pickle references our classes, and a hash of the modules that decide the
+shape of the tree, so any change to the lexer, parser or AST classes
+invalidates every entry.
+
+Like __pycache__, entries are trusted: unpickling runs code, so the cache
+directory must be as trusted as the script itself.
+"""
+
+CACHE_DIR = "__culebracache__"
+
+
+def interpreter_tag() -> str:
+    """Identifies the Python implementation and the modules that build the AST."""
+    digest = hashlib.sha256()
+    package = Path(__file__).parent
+    for module in ["token.py", "lexer.py", "ast.py", "parser.py"]:
+        digest.update((package / module).read_bytes())
+    return f"{sys.implementation.cache_tag}-{digest.hexdigest()[:16]}"
+
+
+CacheTag = interpreter_tag()
+
+
+class ASTCache:
+    def __init__(self, source_path: Path):
+        self.source_path = Path(source_path)
+        self.path = self.source_path.parent / CACHE_DIR / f"{self.source_path.name}.{CacheTag}.ast"
+
+    def _source_key(self) -> Tuple[int, int]:
+        stat = self.source_path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _source_hash(self) -> str:
+        return hashlib.sha256(self.source_path.read_bytes()).hexdigest()
+
+    def load(self) -> Optional[Program]:
+        """Returns the cached program of the source, or None when there is no valid entry."""
+        try:
+            with open(self.path, 'rb') as f:
+                tag, mtime_ns, size, source_hash = pickle.load(f)
+                if tag != CacheTag:
+                    return None
+                if (mtime_ns, size) != self._source_key() and source_hash != self._source_hash():
+                    return None
+                program = pickle.load(f)
+        except Exception:
+            # Missing, unreadable or corrupt entries are cache misses
+            return None
+        return program if isinstance(program, Program) else None
+
+    def store(self, program: Program) -> bool:
+        """
+        Writes the program of the source to the cache, returns whether it was written.
+        Failures (read-only directories, trees too deep to pickle) are ignored.
+        """
+        try:
+            header = (CacheTag, *self._source_key(), self._source_hash())
+            data = pickle.dumps(header, pickle.HIGHEST_PROTOCOL) + pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+            self.path.parent.mkdir(exist_ok=True)
+            # Write to a temporary file and rename, so readers never see a partial entry
+            temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            try:
+                temporary.write_bytes(data)
+                os.replace(temporary, self.path)
+            finally:
+                temporary.unlink(missing_ok=True)
+        except (OSError, RecursionError, pickle.PicklingError):
+            return False
+        return True
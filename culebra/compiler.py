@@ -0,0 +1,421 @@
+from enum import IntEnum, unique
+from typing import Dict, Iterator, List, Optional
+from culebra import ast
+from culebra.interpreter.flat_interpreter import BinaryOperations
+
+"""
+Bytecode Compiler
+=================
+
+Lowers a program to the instructions of a stack machine, run by
+`culebra.interpreter.vm.VM`:
+
+    a = b + 1           0  BINARY_NAME_CONST     0  b + 1
+    print(a)            2  STORE_NAME            1  'a'
+                        4  LOAD_FUNCTION         2  'print'
+                        6  LOAD_NAME             1  'a'
+                        8  CALL                  1
+                       10  HALT                  0
+
+`Code.instructions` is a flat list of opcode and argument pairs, an
+instruction is found at an even offset and jumps go to offsets of that
+list. Arguments are counts, offsets or indices of `Code.constants`, the
+pool of the literals, names and function definitions of the code (equal
+literals are stored once). `Code.nodes` keeps the AST node of every
+instruction, where the errors it raises are reported.
+
+Superinstructions do the work of common sequences at once: a binary
+operation whose operands are identifiers or literals, `i < n` or `i + 1`,
+is one instruction instead of three. Its constant holds the names, the
+literal and the operation.
+
+Function bodies are compiled to their own `Code` the first time the
+function is called (so unparsed lazy bodies stay unparsed), an expression
+that is a statement leaves no value on the stack, except the one that gives
+the program its value (see `Compiler.compile_value`).
+"""
+
+
+@unique
+class Opcode(IntEnum):
+    LOAD_CONST = 0          # Push constants[arg]
+    LOAD_NAME = 1           # Push the value of the variable named constants[arg]
+    STORE_NAME = 2          # Pop a value and assign it to the variable named constants[arg]
+    BINARY_OP = 3           # Pop the right and left operands, push constants[arg](left, right)
+    BINARY_NAME_CONST = 4   # Push operation(variable, literal) of constants[arg] = (name, literal, operation, node)
+    BINARY_NAME_NAME = 5    # Push operation(variable, variable) of constants[arg] = (name, name, operation, node, node)
+    BINARY_CONST_NAME = 6   # Push operation(literal, variable) of constants[arg] = (literal, name, operation, node)
+    NEGATE = 7              # Negate the top of the stack
+    NOT = 8                 # Replace the top of the stack by its logical negation
+    JUMP = 9                # Go to offset arg
+    JUMP_IF_FALSE = 10      # Pop a value, go to offset arg if it is falsy
+    LOAD_FUNCTION = 11      # Push the callable value of the variable named constants[arg]
+    CALL = 12               # Pop arg arguments and the function below them, push the result of the call
+    RETURN = 13             # Pop a value and return it from the function
+    MAKE_FUNCTION = 14      # Assign a function of the definition constants[arg] in the environment
+    BUILD_ARRAY = 15        # Pop arg values, push the array of them
+    COPY_ARRAY = 16         # Push a new array of the values of the tuple constants[arg]
+    BRACKET_ACCESS = 17     # Pop an index and a target, push target[index]
+    STORE_BRACKET = 18      # Pop an index, a container and a value, assign container[index] = value
+    POP = 19                # Discard the top of the stack
+    HALT = 20               # Pop a value and end the program with it
+
+
+# Superinstructions of a binary operation, by whether its left and right operands are identifiers
+BinarySuperinstructions = {
+    (True, False): Opcode.BINARY_NAME_CONST,
+    (True, True): Opcode.BINARY_NAME_NAME,
+    (False, True): Opcode.BINARY_CONST_NAME,
+}
+
+# Python spelling of the binary operations, for the disassembler
+OperatorSymbols = {
+    ast.PlusOperation: '+', ast.MinusOperation: '-', ast.MultiplicationOperation: '*',
+    ast.DivisionOperation: '/', ast.EqualOperation: '==', ast.NotEqualOperation: '!=',
+    ast.LessOperation: '<', ast.GreaterOperation: '>', ast.LessOrEqualOperation: '<=',
+    ast.GreaterOrEqualOperation: '>=', ast.AndOperation: 'and', ast.OrOperation: 'or',
+}
+OperationSymbols = {BinaryOperations[cls]: symbol for cls, symbol in OperatorSymbols.items()}
+
+
+class Code:
+    """The instructions of a program or a function body, with their constants and nodes."""
+    __slots__ = ('name', 'instructions', 'constants', 'nodes')
+
+    def __init__(self, name: str, instructions: List[int], constants: list, nodes: List[Optional[ast.ASTNode]]):
+        self.name = name
+        self.instructions = instructions
+        self.constants = constants
+        self.nodes = nodes
+
+    def node_at(self, offset: int) -> Optional[ast.ASTNode]:
+        """Node of the instruction at an offset of `instructions`."""
+        return self.nodes[offset >> 1]
+
+
+class FunctionCode:
+    """A function definition, its body is compiled the first time `code()` is called."""
+    __slots__ = ('name', 'arguments', 'node', 'compiled')
+
+    def __init__(self, node: ast.FunctionDefinition):
+        self.name = node.name.value
+        self.arguments = [argument.value for argument in node.arguments]
+        self.node = node
+        self.compiled = None
+
+    def code(self) -> Code:
+        if self.compiled is None:
+            self.compiled = Compiler(self.name).compile_function(self.node)
+        return self.compiled
+
+    def __repr__(self):
+        return f"<function {self.name}>"
+
+
+class Compiler:
+    """Compiles a program or a function body to a `Code`."""
+
+    def __init__(self, name: str = '<program>'):
+        self.name = name
+        self.instructions: List[int] = []
+        self.constants: list = []
+        self.nodes: List[Optional[ast.ASTNode]] = []
+        # Index of each pooled literal or name, keyed by type so that 1, 1.0 and True stay apart
+        self.pool: Dict[tuple, int] = {}
+
+    def compile_program(self, program: ast.Program) -> Code:
+        self.compile_value(program)
+        last = program.statements[-1] if program.statements else None
+        # An expression that is the value of the program is the node of the halt
+        self.emit(Opcode.HALT, 0, last if type(last) not in StatementCompilers else None)
+        return self.code()
+
+    def compile_function(self, node: ast.FunctionDefinition) -> Code:
+        self.compile_statement(node.body)
+        self.emit(Opcode.LOAD_CONST, self.constant(None))
+        self.emit(Opcode.RETURN, 0)
+        return self.code()
+
+    def code(self) -> Code:
+        # Plain ints, the VM compares them faster than enum members
+        return Code(self.name, list(map(int, self.instructions)), self.constants, self.nodes)
+
+    def emit(self, opcode: Opcode, argument: int, node: Optional[ast.ASTNode] = None) -> int:
+        """Appends an instruction, returns its offset."""
+        instructions = self.instructions
+        instructions.append(opcode)
+        instructions.append(argument)
+        self.nodes.append(node)
+        return len(instructions) - 2
+
+    def patch(self, offset: int, target: int) -> None:
+        """Sets the target of the jump at an offset."""
+        self.instructions[offset + 1] = target
+
+    def constant(self, value) -> int:
+        """Index of a literal or a name in the constant pool."""
+        key = (type(value), repr(value) if type(value) is float else value)
+        index = self.pool.get(key)
+        if index is None:
+            index = self.pool[key] = self.add_constant(value)
+        return index
+
+    def add_constant(self, value) -> int:
+        """Index of a constant that is not pooled."""
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def compile_value(self, node: ast.ASTNode) -> None:
+        """
+        Compiles a statement of the program to leave its value on the stack, the
+        value the tree-walking interpreter gives it: the value of an expression,
+        of the last statement of a block and of the branch a conditional takes,
+        None for other statements.
+        """
+        if type(node) not in StatementCompilers:
+            self.compile_expression(node)
+        elif not has_value(node):
+            self.compile_statement(node)
+            self.emit(Opcode.LOAD_CONST, self.constant(None))
+        elif isinstance(node, ast.Block):
+            for statement in node.statements[:-1]:
+                self.compile_statement(statement)
+            self.compile_value(node.statements[-1])
+        elif type(node) is ast.Conditional and not is_literal(node.condition):
+            self.compile_expression(node.condition)
+            skip_body = self.emit(Opcode.JUMP_IF_FALSE, 0)
+            self.compile_value(node.body)
+            skip_otherwise = self.emit(Opcode.JUMP, 0)
+            self.patch(skip_body, len(self.instructions))
+            if node.otherwise:
+                self.compile_value(node.otherwise)
+            else:
+                self.emit(Opcode.LOAD_CONST, self.constant(None))
+            self.patch(skip_otherwise, len(self.instructions))
+        elif node.condition.value:
+            # E.g. else, whose condition is true
+            self.compile_value(node.body)
+        elif node.otherwise:
+            self.compile_value(node.otherwise)
+        else:
+            self.emit(Opcode.LOAD_CONST, self.constant(None))
+
+    # Statements
+
+    def compile_statement(self, node: ast.ASTNode) -> None:
+        compiler = StatementCompilers.get(type(node))
+        if compiler is None:
+            # An expression, its value is discarded
+            self.compile_expression(node)
+            self.emit(Opcode.POP, 0)
+        else:
+            compiler(self, node)
+
+    def compile_block(self, node: ast.Block) -> None:
+        for statement in node.statements:
+            self.compile_statement(statement)
+
+    def compile_assignment(self, node: ast.Assignment) -> None:
+        self.compile_expression(node.value)
+        target = node.identifier
+        if type(target) is ast.Identifier:
+            self.emit(Opcode.STORE_NAME, self.constant(target.value), node)
+        else:
+            self.compile_expression(target.target)
+            self.compile_expression(target.index)
+            self.emit(Opcode.STORE_BRACKET, 0, node)
+
+    def compile_conditional(self, node: ast.Conditional) -> None:
+        if is_literal(node.condition):
+            # E.g. else, whose condition is true
+            if node.condition.value:
+                self.compile_statement(node.body)
+            elif node.otherwise:
+                self.compile_statement(node.otherwise)
+            return
+        self.compile_expression(node.condition)
+        skip_body = self.emit(Opcode.JUMP_IF_FALSE, 0)
+        self.compile_statement(node.body)
+        if node.otherwise:
+            skip_otherwise = self.emit(Opcode.JUMP, 0)
+            self.patch(skip_body, len(self.instructions))
+            self.compile_statement(node.otherwise)
+            self.patch(skip_otherwise, len(self.instructions))
+        else:
+            self.patch(skip_body, len(self.instructions))
+
+    def compile_while(self, node: ast.While) -> None:
+        start = len(self.instructions)
+        self.compile_expression(node.condition)
+        exit_jump = self.emit(Opcode.JUMP_IF_FALSE, 0)
+        self.compile_statement(node.body)
+        self.emit(Opcode.JUMP, start)
+        self.patch(exit_jump, len(self.instructions))
+
+    def compile_for(self, node: ast.For) -> None:
+        self.compile_statement(node.pre)
+        start = len(self.instructions)
+        self.compile_expression(node.condition)
+        exit_jump = self.emit(Opcode.JUMP_IF_FALSE, 0)
+        self.compile_statement(node.body)
+        self.compile_statement(node.post)
+        self.emit(Opcode.JUMP, start)
+        self.patch(exit_jump, len(self.instructions))
+
+    def compile_function_definition(self, node: ast.FunctionDefinition) -> None:
+        self.emit(Opcode.MAKE_FUNCTION, self.add_constant(FunctionCode(node)), node)
+
+    def compile_return(self, node: ast.ReturnStatement) -> None:
+        self.compile_expression(node.value)
+        self.emit(Opcode.RETURN, 0, node)
+
+    # Expressions
+
+    def compile_expression(self, node: ast.Expression) -> None:
+        compiler = ExpressionCompilers.get(type(node))
+        if compiler is None:
+            raise TypeError(f"Unexpected AST node type: {type(node)}")
+        compiler(self, node)
+
+    def compile_literal(self, node: ast.LiteralValue) -> None:
+        self.emit(Opcode.LOAD_CONST, self.constant(node.value), node)
+
+    def compile_identifier(self, node: ast.Identifier) -> None:
+        self.emit(Opcode.LOAD_NAME, self.constant(node.value), node)
+
+    def compile_binary_operation(self, node: ast.BinaryOperation) -> None:
+        left, right = node.left, node.right
+        operation = BinaryOperations[type(node)]
+        superinstruction = None
+        if type(left) in Operands and type(right) in Operands:
+            superinstruction = BinarySuperinstructions.get((type(left) is ast.Identifier, type(right) is ast.Identifier))
+        if superinstruction == Opcode.BINARY_NAME_CONST:
+            operands = (left.value, right.value, operation, left)
+        elif superinstruction == Opcode.BINARY_NAME_NAME:
+            operands = (left.value, right.value, operation, left, right)
+        elif superinstruction == Opcode.BINARY_CONST_NAME:
+            operands = (left.value, right.value, operation, right)
+        else:
+            self.compile_expression(left)
+            self.compile_expression(right)
+            self.emit(Opcode.BINARY_OP, self.add_constant(operation), node)
+            return
+        self.emit(superinstruction, self.add_constant(operands), node)
+
+    def compile_prefix_operation(self, node: ast.PrefixOperation) -> None:
+        self.compile_expression(node.value)
+        self.emit(Opcode.NOT if type(node) is ast.NotOperation else Opcode.NEGATE, 0, node)
+
+    def compile_function_call(self, node: ast.FunctionCall) -> None:
+        self.emit(Opcode.LOAD_FUNCTION, self.constant(node.function.value), node)
+        for argument in node.arguments:
+            self.compile_expression(argument)
+        self.emit(Opcode.CALL, len(node.arguments), node)
+
+    def compile_bracket_access(self, node: ast.BracketAccess) -> None:
+        self.compile_expression(node.target)
+        self.compile_expression(node.index)
+        self.emit(Opcode.BRACKET_ACCESS, 0, node)
+
+    def compile_array(self, node: ast.Array) -> None:
+        for element in node.elements:
+            self.compile_expression(element)
+        self.emit(Opcode.BUILD_ARRAY, len(node.elements), node)
+
+    def compile_constant_array(self, node: ast.ConstantArray) -> None:
+        self.emit(Opcode.COPY_ARRAY, self.add_constant(node.values), node)
+
+
+StatementCompilers = {
+    ast.Program: Compiler.compile_block,
+    ast.Block: Compiler.compile_block,
+    ast.LazyBlock: Compiler.compile_block,
+    ast.Assignment: Compiler.compile_assignment,
+    ast.Conditional: Compiler.compile_conditional,
+    ast.While: Compiler.compile_while,
+    ast.For: Compiler.compile_for,
+    ast.FunctionDefinition: Compiler.compile_function_definition,
+    ast.ReturnStatement: Compiler.compile_return,
+}
+
+ExpressionCompilers = {
+    ast.Identifier: Compiler.compile_identifier,
+    ast.Integer: Compiler.compile_literal,
+    ast.Float: Compiler.compile_literal,
+    ast.String: Compiler.compile_literal,
+    ast.Bool: Compiler.compile_literal,
+    ast.BracketAccess: Compiler.compile_bracket_access,
+    ast.FunctionCall: Compiler.compile_function_call,
+    ast.Array: Compiler.compile_array,
+    ast.ConstantArray: Compiler.compile_constant_array,
+}
+ExpressionCompilers.update((cls, Compiler.compile_binary_operation) for cls in BinaryOperations)
+ExpressionCompilers.update((cls, Compiler.compile_prefix_operation) for cls in [ast.NegativeOperation, ast.NotOperation])
+
+# Node classes of the operands of the binary superinstructions
+Operands = {ast.Identifier, ast.Integer, ast.Float, ast.String, ast.Bool}
+
+
+def is_literal(node: ast.ASTNode) -> bool:
+    return type(node) in Operands and type(node) is not ast.Identifier
+
+
+def has_value(node: ast.ASTNode) -> bool:
+    """Whether a statement of the program may have a value other than None: an expression may."""
+    while True:
+        if type(node) not in StatementCompilers:
+            return True
+        if isinstance(node, ast.Block) and node.statements:
+            node = node.statements[-1]
+        elif type(node) is ast.Conditional:
+            if has_value(node.body):
+                return True
+            node = node.otherwise
+            if node is None:
+                return False
+        else:
+            return False
+
+
+def compile_program(program: ast.Program) -> Code:
+    """Compiles a program, its function bodies are compiled when they are first called."""
+    return Compiler().compile_program(program)
+
+
+def disassemble(code: Code) -> Iterator[str]:
+    """
+    Lines of a listing of the instructions of a code and of the functions it
+    defines, which are compiled for it.
+    """
+    pending = [code]
+    while pending:
+        code = pending.pop(0)
+        yield f"Disassembly of {code.name}:"
+        instructions, constants = code.instructions, code.constants
+        for offset in range(0, len(instructions), 2):
+            opcode, argument = Opcode(instructions[offset]), instructions[offset + 1]
+            detail = argument_detail(opcode, argument, constants)
+            node = code.node_at(offset)
+            position = f"pos {node.pos}" if node is not None else ""
+            yield f"{offset:>6}  {opcode.name:<18} {argument:>4}  {detail:<32} {position}".rstrip()
+            if opcode == Opcode.MAKE_FUNCTION:
+                pending.append(constants[argument].code())
+        if pending:
+            yield ""
+
+
+def argument_detail(opcode: Opcode, argument: int, constants: list) -> str:
+    """What the argument of an instruction stands for."""
+    if opcode in (Opcode.LOAD_CONST, Opcode.LOAD_NAME, Opcode.STORE_NAME, Opcode.LOAD_FUNCTION,
+                  Opcode.MAKE_FUNCTION, Opcode.COPY_ARRAY):
+        return repr(constants[argument])
+    if opcode == Opcode.BINARY_OP:
+        return OperationSymbols[constants[argument]]
+    if opcode in (Opcode.BINARY_NAME_CONST, Opcode.BINARY_NAME_NAME, Opcode.BINARY_CONST_NAME):
+        left, right, operation = constants[argument][:3]
+        left = repr(left) if opcode == Opcode.BINARY_CONST_NAME else left
+        right = repr(right) if opcode == Opcode.BINARY_NAME_CONST else right
+        return f"{left} {OperationSymbols[operation]} {right}"
+    if opcode in (Opcode.JUMP, Opcode.JUMP_IF_FALSE):
+        return f"to {argument}"
+    return ""
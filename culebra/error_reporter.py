@@ -1,12 +1,47 @@
+from bisect import bisect_right
+from typing import Iterable, List, Tuple
+
+
+class LineIndex:
+    """
+    Offsets where each line of a source starts, built once so that positions
+    resolve to lines with a binary search instead of a scan from the start.
+    """
+
+    def __init__(self, source_code: str):
+        self.source_code = source_code
+        self.line_starts = [0]
+        newline = source_code.find('\n')
+        while newline != -1:
+            self.line_starts.append(newline + 1)
+            newline = source_code.find('\n', newline + 1)
+
+    def line_number(self, pos: int) -> int:
+        """Returns the 1-based line of `pos`."""
+        return bisect_right(self.line_starts, pos)
+
+    def line_column(self, pos: int) -> Tuple[int, int]:
+        """Returns the 1-based line and the 0-based column of `pos`."""
+        line_num = self.line_number(pos)
+        return line_num, pos - self.line_starts[line_num - 1]
+
+    def line_text(self, line_num: int) -> str:
+        """Returns the text of the 1-based line `line_num`, without its newline."""
+        start = self.line_starts[line_num - 1]
+        if line_num < len(self.line_starts):
+            return self.source_code[start:self.line_starts[line_num] - 1]
+        return self.source_code[start:]
+
+
 class ErrorReporter:
     def __init__(self, source_code: str):
         self.source_code = source_code
-        self.lines = source_code.split('\n')
-    
-    def report(self, token, message: str):
+        self.line_index = LineIndex(source_code)
+
+    def format(self, token, message: str) -> str:
         """
-        Reports an error with source code context, line number, and position indicator.
-        
+        Formats an error with source code context, line number, and position indicator.
+
         Example output:
         Error at line 3:
         let x = 1 + ;
@@ -14,23 +49,27 @@ class ErrorReporter:
         Unexpected token ';'
         """
         # Get line number (1-based) and position in line
-        line_num = 1
-        pos_in_line = token.pos
-        
-        # Count newlines to find the actual line number and position
-        for i in range(token.pos):
-            if i < len(self.source_code) and self.source_code[i] == '\n':
-                line_num += 1
-                pos_in_line = token.pos - (i + 1)
-        
+        line_num, pos_in_line = self.line_index.line_column(token.pos)
+
         # Get the line of code where the error occurred
-        error_line = self.lines[line_num - 1]
-        
+        error_line = self.line_index.line_text(line_num)
+
         # Build the error message
         error = f"Error at line {line_num}:\n"
         error += f"{error_line}\n"
         error += " " * pos_in_line + "^\n"  # Position indicator
         error += message
-        
+        return error
+
+    def report(self, token, message: str):
+        """Prints the error at `token`, see `format`."""
+        error = self.format(token, message)
         print(error)
-        return error 
\ No newline at end of file
+        return error
+
+    def report_many(self, errors: Iterable[Tuple[object, str]]) -> List[str]:
+        """Prints an error for each `(token, message)` pair, resolving every position against the same index."""
+        reported = [self.format(token, message) for token, message in errors]
+        for error in reported:
+            print(error)
+        return reported
@@ -1,11 +1,79 @@
 import sys
 import argparse
+import mmap
 from pathlib import Path
-from culebra.interpreter.interpreter import Interpreter
+from typing import Optional, Tuple
+from culebra.cache import ASTCache, CACHE_DIR
+from culebra.compiler import compile_program, disassemble
+from culebra.interpreter.interpreter import Engines, Interpreter
+from culebra.interpreter.resolved_interpreter import ResolvedInterpreter
+from culebra.ast import Program, json_lines, pretty_lines, write_lines
+from culebra.optimizer import optimize
+from culebra.parallel import ParallelParser
 from culebra.parser import Parser
+from culebra.transpiler import transpile
 from culebra.lexer import Lexer
 from culebra.error_reporter import ErrorReporter
-from culebra.token import TokenType
+from culebra.token import Token, TokenBuffer, TokenType
+
+
+def map_tokens(lexer: Lexer, file_path: Path) -> TokenBuffer:
+    """Tokenizes a memory-mapped source file, see `Lexer.tokenize_bytes`."""
+    with open(file_path, 'rb') as f:
+        if file_path.stat().st_size == 0:
+            # Empty files cannot be mapped
+            return lexer.tokenize_bytes(b"")
+        # The mapping stays valid after the file is closed
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return lexer.tokenize_bytes(data)
+
+
+def report_error(file_path: Path, tokens: Optional[TokenBuffer], token: Token, message: str):
+    """Reports an error at `token`, converting byte positions of memory-mapped tokens to characters."""
+    if tokens is not None:
+        token = Token(token.type, token.literal, tokens.char_position(token.pos))
+    reporter = ErrorReporter(file_path.read_text())
+    reporter.report(token, message)
+
+
+def parse_file(file_path: Path, args) -> Tuple[Optional[Program], Optional[TokenBuffer]]:
+    """
+    Lexes and parses the source file, returns the program and the memory-mapped tokens if any.
+    In lexer mode the tokens are printed and no program is returned.
+    """
+    # Literal values are only needed by the parser
+    lexer = Lexer(decode_literals=not args.lexer)
+    if args.mmap:
+        tokens = map_tokens(lexer, file_path)
+        if args.lexer:
+            for token in tokens:
+                if token.type != TokenType.EOF:
+                    print(token)
+            return None, tokens
+        ast_parser = Parser(tokens, lazy_functions=args.lazy)
+        ast = ast_parser.parse()
+    elif args.jobs != 1 and not args.lexer:
+        tokens = None
+        ast_parser = ParallelParser(file_path.read_text(), workers=args.jobs)
+        ast = ast_parser.parse()
+    else:
+        tokens = None
+        # Stream tokens while the source file is read
+        with open(file_path, 'r') as f:
+            if args.lexer:
+                for token in lexer.iter_tokens(f):
+                    if token.type != TokenType.EOF:
+                        print(token)
+                return None, None
+
+            # Create parser (renamed local variable to avoid shadowing the argparse parser)
+            ast_parser = Parser(lexer.iter_tokens(f), lazy_functions=args.lazy)
+            ast = ast_parser.parse()
+
+    if ast_parser.has_error:
+        report_error(file_path, tokens, ast_parser.last_token, str(ast_parser.last_error))
+        sys.exit(1)
+    return ast, tokens
 
 
 def main():
@@ -19,9 +87,35 @@ def main():
     mode_group.add_argument('-l', '--lexer', action='store_true', help='Run lexer')
     mode_group.add_argument('-p', '--parser', action='store_true', help='Run parser')
     mode_group.add_argument('-i', '--interpreter', action='store_true', help='Run interpreter')
+    mode_group.add_argument('-d', '--dis', action='store_true',
+                            help='Print the bytecode of the program and of its functions')
+    mode_group.add_argument('--python', action='store_true',
+                            help='Print the Python translation of the program')
+
+    parser.add_argument('--format', choices=['tree', 'jsonl'], default='tree',
+                        help='Output of the parser mode: an indented tree or a JSON object per node')
+
+    # Input flags
+    parser.add_argument('-m', '--mmap', action='store_true',
+                        help='Memory-map the source file and lex its UTF-8 bytes in place')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'Neither read nor write the parsed program in {CACHE_DIR}')
+    parser.add_argument('--lazy', action='store_true',
+                        help='Parse the body of a function the first time it is called')
+    parser.add_argument('-O', '--optimize', action='store_true',
+                        help='Fold constant expressions and pool literals before running')
+    parser.add_argument('--engine', choices=Engines, default='tree',
+                        help='Run the program walking its tree, compiled to closures, compiled to bytecode or translated to Python')
+    parser.add_argument('-r', '--resolve', action='store_true',
+                        help='Resolve variables to frame slots before walking the tree (tree engine only)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='Lex and parse large files in N processes, 0 for one per CPU '
+                             '(function bodies are parsed eagerly)')
 
     # Parse arguments
     args = parser.parse_args()
+    if args.resolve and args.engine != 'tree':
+        parser.error(f"argument -r/--resolve: not allowed with --engine {args.engine}, it walks the tree")
 
     if args.filename is None:
         # --- REPL mode ---
@@ -42,42 +136,42 @@ def main():
             print(f"Error: File '{args.filename}' not found")
             sys.exit(1)
         try:
-            # Read the source file
-            with open(file_path, 'r') as f:
-                source = f.read()
+            # The lexer mode never reaches the parser, so it has nothing to cache
+            cache = None if args.no_cache or args.lexer else ASTCache(file_path)
+            ast = cache.load() if cache is not None else None
+            tokens = None
+            if ast is None:
+                ast, tokens = parse_file(file_path, args)
+                if ast is None:
+                    return
+                # Memory-mapped tokens have byte positions, the cache keeps character positions.
+                # Storing a lazily parsed program would parse every function body.
+                if cache is not None and tokens is None and not args.lazy:
+                    cache.store(ast)
 
-            # Create lexer and generate tokens
-            lexer = Lexer()
-            tokens = lexer.tokenize(source)
+            if args.optimize:
+                ast = optimize(ast)
 
-            if args.lexer:
-                for token in tokens:
-                    if token.type != TokenType.EOF:
-                        print(token)
+            # If parse flag is set, pretty print the AST and exit
+            if args.parser:
+                write_lines(json_lines(ast) if args.format == 'jsonl' else pretty_lines(ast), sys.stdout)
                 return
 
-            # Create parser (renamed local variable to avoid shadowing the argparse parser)
-            ast_parser = Parser(tokens)
-            ast = ast_parser.parse()
-
-            if ast_parser.has_error:
-                reporter = ErrorReporter(source)
-                reporter.report(ast_parser.last_token, str(ast_parser.last_error))
-                sys.exit(1)
+            if args.dis:
+                write_lines(disassemble(compile_program(ast)), sys.stdout)
+                return
 
-            # If parse flag is set, pretty print the AST and exit
-            if args.parser:
-                print(ast.pretty())
+            if args.python:
+                sys.stdout.write(transpile(ast, Interpreter().root_environment.values).source)
                 return
 
             # Otherwise, create interpreter and run the AST
-            interpreter = Interpreter()
+            interpreter = ResolvedInterpreter() if args.resolve else Interpreter(engine=args.engine)
 
             try:
                 interpreter.evaluate(ast)
             except Exception as e:
-                reporter = ErrorReporter(source)
-                reporter.report(interpreter.last_node.token, str(e))
+                report_error(file_path, tokens, interpreter.last_node.token, str(e))
                 sys.exit(1)
 
         except Exception as e:
@@ -0,0 +1,430 @@
+from typing import Callable, Dict, List, Tuple
+from culebra import ast
+from culebra.interpreter.environment import Environment, assign
+from culebra.interpreter.interpreter import ReturnValue, bracket_access
+
+"""
+Closure Compilation Engine
+==========================
+
+Each node of a program is compiled once into a Python closure that takes an
+environment and does the work of the node, with its children already
+compiled into the closures it calls. The node and token types are only
+inspected while compiling:
+
+    a + 1    ->    def run(env):
+                       values = env.values
+                       left = values['a'] if 'a' in values else lookup(env, 'a', node.left)
+                       return left + 1
+
+Expressions compile to closures that return their value. Statements compile
+to closures that return `NEXT` when execution continues with the next
+statement, or the value of a `return` that unwinds to the function call, so
+returns do not raise. The statements of the program itself compile to
+closures that return their value instead, as the program returns the value
+of its last statement (see `compile_value`), and a `return` among them
+raises ReturnValue as the tree-walking interpreter's does.
+
+The closure of a binary operation is specialized for operands that are
+identifiers (read inline from the environment) or literals (captured as
+constants), its source is generated once per operator and kinds of operands
+(see `binary_factory`).
+
+Scoping, evaluation order and errors are those of the tree-walking
+Interpreter: the innermost node that raises is recorded as `last_node`.
+Function bodies are compiled the first time the function is called.
+"""
+
+# Returned by statement closures when execution goes on with the next statement
+NEXT = object()
+
+Closure = Callable[[Environment], object]
+
+# Python spelling of each binary operation, `and` and `or` evaluate both operands as the tree walker does
+BinaryOperators = {
+    ast.PlusOperation: '+',
+    ast.MinusOperation: '-',
+    ast.MultiplicationOperation: '*',
+    ast.DivisionOperation: '/',
+    ast.EqualOperation: '==',
+    ast.NotEqualOperation: '!=',
+    ast.LessOperation: '<',
+    ast.GreaterOperation: '>',
+    ast.LessOrEqualOperation: '<=',
+    ast.GreaterOrEqualOperation: '>=',
+    ast.AndOperation: 'and',
+    ast.OrOperation: 'or',
+}
+
+# Kinds of operands of a specialized binary operation
+CONSTANT, NAME, EXPRESSION = 'constant', 'name', 'expression'
+
+OperandSources = {
+    CONSTANT: "{side}_value = {side}",
+    NAME: "{side}_value = values[{side}] if {side} in values else lookup(env, {side}, {side}_node)",
+    EXPRESSION: "{side}_value = {side}(env)",
+}
+
+BinaryTemplate = """
+def factory(node, left, right, left_node, right_node, lookup, fail):
+    def run(env):
+        try:
+            values = env.values
+            {left}
+            {right}
+            return left_value {operator} right_value
+        except Exception as e:
+            fail(e, node)
+    return run
+"""
+
+BinaryFactories: Dict[Tuple[str, str, str], Callable[..., Closure]] = {}
+
+
+def binary_factory(operator: str, left_kind: str, right_kind: str) -> Callable[..., Closure]:
+    """Returns the factory of closures for an operator and kinds of operands, generated on first use."""
+    key = (operator, left_kind, right_kind)
+    factory = BinaryFactories.get(key)
+    if factory is None:
+        source = BinaryTemplate.format(operator=operator,
+                                       left=OperandSources[left_kind].format(side='left'),
+                                       right=OperandSources[right_kind].format(side='right'))
+        namespace = {}
+        exec(source, namespace)
+        factory = BinaryFactories[key] = namespace['factory']
+    return factory
+
+
+class CompiledFunction:
+    """A function of the closure engine: its definition, compiled on first call, and its closure."""
+    __slots__ = ('name', 'arguments', 'definition', 'closure')
+
+    def __init__(self, name: str, arguments: List[str], definition: 'CompiledDefinition', closure: Environment):
+        self.name = name
+        self.arguments = arguments
+        self.definition = definition
+        self.closure = closure
+
+    def call(self, interpreter, arguments):
+        function_env = Environment(self.closure)
+        for arg_name, arg_value in zip(self.arguments, arguments):
+            assign(function_env, arg_name, arg_value)
+        result = self.definition.body()(function_env)
+        return None if result is NEXT else result
+
+
+class CompiledDefinition:
+    """The body of a function definition, compiled the first time it runs."""
+    __slots__ = ('compiler', 'node', 'compiled')
+
+    def __init__(self, compiler: 'ClosureCompiler', node: ast.FunctionDefinition):
+        self.compiler = compiler
+        self.node = node
+        self.compiled = None
+
+    def body(self) -> Closure:
+        if self.compiled is None:
+            self.compiled = self.compiler.compile_statement(self.node.body)
+        return self.compiled
+
+
+class ClosureCompiler:
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        # Whether the statements being compiled are the program's (function bodies are compiled on their first call)
+        self.program_level = False
+
+    def fail(self, error: Exception, node: ast.ASTNode):
+        """Records the innermost node where an error happened, as `Interpreter.eval_node` does, and raises it."""
+        interpreter = self.interpreter
+        if not interpreter.has_error:
+            interpreter.last_error = error
+            interpreter.last_node = node
+        raise error
+
+    def lookup(self, env: Environment, name: str, node: ast.Identifier):
+        """`Environment.get` without recursion."""
+        scope = env
+        while scope is not None:
+            if name in scope.values:
+                return scope.values[name]
+            scope = scope.parent
+        self.fail(NameError(f"Undefined variable '{name}'"), node)
+
+    def compile_program(self, program: ast.Program) -> Closure:
+        """
+        Compiles a program to a closure that returns the value of its last
+        statement, like `Interpreter.evaluate`.
+        """
+        self.program_level = True
+        try:
+            return self.compile_value(program)
+        finally:
+            self.program_level = False
+
+    def compile_value(self, node: ast.ASTNode) -> Closure:
+        """
+        Compiles a statement of the program to a closure that returns its value
+        as the tree-walking interpreter does: the value of an expression, of the
+        last statement of a block and of the branch a conditional takes, None
+        for other statements.
+        """
+        if isinstance(node, ast.Expression):
+            return self.compile_expression(node)
+        if isinstance(node, ast.Block):
+            statements = [self.compile_value(statement) for statement in node.statements]
+
+            def run(env):
+                result = None
+                for statement in statements:
+                    result = statement(env)
+                return result
+            return run
+        if type(node) is ast.Conditional:
+            condition, body = self.compile_expression(node.condition), self.compile_value(node.body)
+            otherwise = self.compile_value(node.otherwise) if node.otherwise else None
+
+            def run(env):
+                if condition(env):
+                    return body(env)
+                return otherwise(env) if otherwise is not None else None
+            return run
+        statement = self.compile_statement(node)
+
+        def run(env):
+            statement(env)
+            return None
+        return run
+
+    # Statements
+
+    def compile_statement(self, node: ast.ASTNode) -> Closure:
+        if isinstance(node, ast.Expression):
+            expression = self.compile_expression(node)
+
+            def run(env):
+                expression(env)
+                return NEXT
+            return run
+        compiler = getattr(self, 'compile_' + StatementCompilers[type(node)])
+        return compiler(node)
+
+    def compile_block(self, node: ast.Block) -> Closure:
+        statements = [self.compile_statement(statement) for statement in node.statements]
+        if len(statements) == 1:
+            return statements[0]
+
+        def run(env):
+            for statement in statements:
+                result = statement(env)
+                if result is not NEXT:
+                    return result
+            return NEXT
+        return run
+
+    def compile_assignment(self, node: ast.Assignment) -> Closure:
+        value, fail = self.compile_expression(node.value), self.fail
+        target = node.identifier
+        if isinstance(target, ast.Identifier):
+            name = target.value
+
+            def run(env):
+                result = value(env)
+                values = env.values
+                if name in values:
+                    values[name] = result
+                else:
+                    assign(env, name, result)
+                return NEXT
+            return run
+
+        container, index = self.compile_expression(target.target), self.compile_expression(target.index)
+
+        def run(env):
+            try:
+                result = value(env)
+                env.assign_bracket(container(env), index(env), result)
+            except Exception as e:
+                fail(e, node)
+            return NEXT
+        return run
+
+    def compile_conditional(self, node: ast.Conditional) -> Closure:
+        body = self.compile_statement(node.body)
+        otherwise = self.compile_statement(node.otherwise) if node.otherwise else None
+        if isinstance(node.condition, ast.LiteralValue) and not isinstance(node.condition, ast.Identifier):
+            # E.g. else, whose condition is true
+            if node.condition.value:
+                return body
+            return otherwise if otherwise is not None else (lambda env: NEXT)
+
+        condition = self.compile_expression(node.condition)
+        if otherwise is None:
+            def run(env):
+                if condition(env):
+                    return body(env)
+                return NEXT
+        else:
+            def run(env):
+                if condition(env):
+                    return body(env)
+                return otherwise(env)
+        return run
+
+    def compile_while(self, node: ast.While) -> Closure:
+        condition, body = self.compile_expression(node.condition), self.compile_statement(node.body)
+
+        def run(env):
+            while condition(env):
+                result = body(env)
+                if result is not NEXT:
+                    return result
+            return NEXT
+        return run
+
+    def compile_for(self, node: ast.For) -> Closure:
+        pre, condition = self.compile_statement(node.pre), self.compile_expression(node.condition)
+        post, body = self.compile_statement(node.post), self.compile_statement(node.body)
+
+        def run(env):
+            pre(env)
+            while condition(env):
+                result = body(env)
+                if result is not NEXT:
+                    return result
+                post(env)
+            return NEXT
+        return run
+
+    def compile_function_definition(self, node: ast.FunctionDefinition) -> Closure:
+        name, arguments = node.name.value, [argument.value for argument in node.arguments]
+        definition = CompiledDefinition(self, node)
+
+        def run(env):
+            assign(env, name, CompiledFunction(name, arguments, definition, env))
+            return NEXT
+        return run
+
+    def compile_return(self, node: ast.ReturnStatement) -> Closure:
+        value = self.compile_expression(node.value)
+        if not self.program_level:
+            # The value unwinds through the statement closures to the call
+            return value
+
+        def run(env):
+            # A return outside of a function
+            raise ReturnValue(value(env), node)
+        return run
+
+    # Expressions
+
+    def compile_expression(self, node: ast.Expression) -> Closure:
+        compiler = getattr(self, 'compile_' + ExpressionCompilers[type(node)])
+        return compiler(node)
+
+    def compile_literal(self, node: ast.LiteralValue) -> Closure:
+        value = node.value
+        return lambda env: value
+
+    def compile_identifier(self, node: ast.Identifier) -> Closure:
+        name, lookup = node.value, self.lookup
+
+        def run(env):
+            values = env.values
+            if name in values:
+                return values[name]
+            return lookup(env, name, node)
+        return run
+
+    def compile_binary_operation(self, node: ast.BinaryOperation) -> Closure:
+        operands = []
+        for operand in [node.left, node.right]:
+            if isinstance(operand, ast.Identifier):
+                operands.append((NAME, operand.value))
+            elif isinstance(operand, ast.LiteralValue):
+                operands.append((CONSTANT, operand.value))
+            else:
+                operands.append((EXPRESSION, self.compile_expression(operand)))
+        (left_kind, left), (right_kind, right) = operands
+        factory = binary_factory(BinaryOperators[type(node)], left_kind, right_kind)
+        return factory(node, left, right, node.left, node.right, self.lookup, self.fail)
+
+    def compile_prefix_operation(self, node: ast.PrefixOperation) -> Closure:
+        value, fail = self.compile_expression(node.value), self.fail
+        if isinstance(node, ast.NotOperation):
+            return lambda env: not value(env)
+
+        def run(env):
+            try:
+                return -value(env)
+            except Exception as e:
+                fail(e, node)
+        return run
+
+    def compile_function_call(self, node: ast.FunctionCall) -> Closure:
+        name, interpreter, fail, lookup = node.function.value, self.interpreter, self.fail, self.lookup
+        arguments = [self.compile_expression(argument) for argument in node.arguments]
+
+        def run(env):
+            try:
+                values = env.values
+                function = values[name] if name in values else lookup(env, name, node)
+                if type(function) is CompiledFunction:
+                    # Inlined CompiledFunction.call
+                    evaluated_args = [argument(env) for argument in arguments]
+                    function_env = Environment(function.closure)
+                    for arg_name, arg_value in zip(function.arguments, evaluated_args):
+                        assign(function_env, arg_name, arg_value)
+                    result = function.definition.body()(function_env)
+                    return None if result is NEXT else result
+                if not hasattr(function, "call"):
+                    raise Exception(f"{name} is not callable")
+                return function.call(interpreter, [argument(env) for argument in arguments])
+            except Exception as e:
+                fail(e, node)
+        return run
+
+    def compile_bracket_access(self, node: ast.BracketAccess) -> Closure:
+        target, index, fail = self.compile_expression(node.target), self.compile_expression(node.index), self.fail
+
+        def run(env):
+            try:
+                return bracket_access(target(env), index(env))
+            except Exception as e:
+                fail(e, node)
+        return run
+
+    def compile_array(self, node: ast.Array) -> Closure:
+        elements = [self.compile_expression(element) for element in node.elements]
+        return lambda env: [element(env) for element in elements]
+
+    def compile_constant_array(self, node: ast.ConstantArray) -> Closure:
+        values = node.values
+        return lambda env: list(values)
+
+
+StatementCompilers = {
+    ast.Program: 'block',
+    ast.Block: 'block',
+    ast.LazyBlock: 'block',
+    ast.Assignment: 'assignment',
+    ast.Conditional: 'conditional',
+    ast.While: 'while',
+    ast.For: 'for',
+    ast.FunctionDefinition: 'function_definition',
+    ast.ReturnStatement: 'return',
+}
+
+ExpressionCompilers = {
+    ast.Identifier: 'identifier',
+    ast.Integer: 'literal',
+    ast.Float: 'literal',
+    ast.String: 'literal',
+    ast.Bool: 'literal',
+    ast.BracketAccess: 'bracket_access',
+    ast.FunctionCall: 'function_call',
+    ast.Array: 'array',
+    ast.ConstantArray: 'constant_array',
+}
+ExpressionCompilers.update((cls, 'binary_operation') for cls in BinaryOperators)
+ExpressionCompilers.update((cls, 'prefix_operation') for cls in [ast.NegativeOperation, ast.NotOperation])
@@ -117,3 +117,29 @@ class Environment:
                 raise IndexError("List index out of range")
         else:
             raise TypeError("Bracket assignment only supported on list, got " + str(type(container)))
+
+
+def assign(env: Environment, name: str, value) -> None:
+    """`Environment.assign` without recursion."""
+    values = env.values
+    if name not in values:
+        scope = env.parent
+        while scope is not None:
+            if name in scope.values:
+                scope.values[name] = value
+                return
+            scope = scope.parent
+    values[name] = value
+
+
+# Value of a slot of a frame whose variable has not been assigned yet
+Unassigned = object()
+
+"""
+Frames are the environments of function calls for programs annotated by
+culebra.resolver: a list whose item 0 is the frame the function was defined
+in (None at the top level, whose variables stay in the root Environment)
+and whose other items are the variables of the function, at the slots the
+resolver gave them (from 1). A frame is a copy of the `frame_template` of
+its scope with the parent set, plain lists are indexed the fastest.
+"""
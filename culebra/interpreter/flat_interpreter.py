@@ -0,0 +1,164 @@
+import operator
+from culebra import ast
+from culebra.arena import FlatProgram, NodeKinds
+from culebra.interpreter.interpreter import Evaluators, Function, Interpreter, ReturnValue, bracket_access
+
+"""
+Evaluator of flat programs (see culebra.arena). Nodes are indices into the
+arrays of a FlatProgram instead of objects: the evaluator dispatches on the
+kind code of a node with a list lookup and reads its children from the
+operands array. Functions, environments and built-ins are the ones of the
+tree-walking Interpreter, a Function body is the index of its Block.
+"""
+
+BinaryOperations = {
+    ast.PlusOperation: operator.add,
+    ast.MinusOperation: operator.sub,
+    ast.MultiplicationOperation: operator.mul,
+    ast.DivisionOperation: operator.truediv,
+    ast.EqualOperation: operator.eq,
+    ast.NotEqualOperation: operator.ne,
+    ast.LessOperation: operator.lt,
+    ast.GreaterOperation: operator.gt,
+    ast.LessOrEqualOperation: operator.le,
+    ast.GreaterOrEqualOperation: operator.ge,
+    ast.OrOperation: lambda left, right: left or right,
+    ast.AndOperation: lambda left, right: left and right,
+}
+
+PrefixOperations = {
+    ast.NegativeOperation: operator.neg,
+    ast.NotOperation: operator.not_,
+}
+
+IdentifierKind = NodeKinds.index((ast.Identifier, ast.Identifier.token_kind))
+
+
+class FlatInterpreter(Interpreter):
+    def __init__(self):
+        super().__init__()
+        self.program = None
+        self.evaluators = [getattr(self, Evaluators[cls]) for cls, _ in NodeKinds]
+        self.operations = [BinaryOperations.get(cls) or PrefixOperations.get(cls) for cls, _ in NodeKinds]
+
+    @property
+    def last_token(self):
+        """Token of the node where the last error happened, see `FlatProgram.token_at`."""
+        return self.program.token_at(self.last_node)
+
+    def evaluate(self, program: FlatProgram):
+        self.program = program
+        self.kinds = program.kinds
+        self.offsets = program.offsets
+        self.operands = program.operands
+        self.literals = program.literals
+        self.last_error = None
+        self.last_node = None
+        try:
+            return self.eval_node(program.root, self.root_environment)
+        except ReturnValue as rv:
+            raise self.outside_function(rv) from None
+
+    def eval_node(self, node, environment):
+        try:
+            return self.evaluators[self.kinds[node]](node, environment)
+        except ReturnValue:
+            # Returns unwind through eval_node, they are not errors
+            raise
+        except Exception as e:
+            if not self.has_error:
+                self.last_error = e
+                self.last_node = node
+            raise e
+
+    def evaluate_identifier(self, node, environment):
+        return environment.get(self.literals[self.operands[self.offsets[node]]])
+
+    def evaluate_literal(self, node, environment):
+        return self.literals[self.operands[self.offsets[node]]]
+
+    def evaluate_block(self, node, environment):
+        result = None
+        for statement in self.operands[self.offsets[node]:self.offsets[node + 1]]:
+            result = self.eval_node(statement, environment)
+        return result
+
+    def evaluate_assignment(self, node, environment):
+        start = self.offsets[node]
+        target, value = self.operands[start], self.operands[start + 1]
+        value = self.eval_node(value, environment)
+        if self.kinds[target] == IdentifierKind:
+            environment.assign(self.literals[self.operands[self.offsets[target]]], value)
+        else:
+            target_start = self.offsets[target]
+            container = self.eval_node(self.operands[target_start], environment)
+            index = self.eval_node(self.operands[target_start + 1], environment)
+            environment.assign_bracket(container, index, value)
+        return None
+
+    def evaluate_binary_operation(self, node, environment):
+        start = self.offsets[node]
+        left = self.eval_node(self.operands[start], environment)
+        right = self.eval_node(self.operands[start + 1], environment)
+        return self.operations[self.kinds[node]](left, right)
+
+    def evaluate_prefix_operation(self, node, environment):
+        operand = self.eval_node(self.operands[self.offsets[node]], environment)
+        return self.operations[self.kinds[node]](operand)
+
+    def evaluate_conditional(self, node, environment):
+        start = self.offsets[node]
+        condition, body, otherwise = self.operands[start:start + 3]
+        if self.eval_node(condition, environment):
+            return self.eval_node(body, environment)
+        elif otherwise != -1:
+            return self.eval_node(otherwise, environment)
+        return None
+
+    def evaluate_while(self, node, environment):
+        start = self.offsets[node]
+        condition, body = self.operands[start:start + 2]
+        while self.eval_node(condition, environment):
+            self.eval_node(body, environment)
+        return None
+
+    def evaluate_for(self, node, environment):
+        start = self.offsets[node]
+        pre, condition, post, body = self.operands[start:start + 4]
+        self.eval_node(pre, environment)
+        while self.eval_node(condition, environment):
+            self.eval_node(body, environment)
+            self.eval_node(post, environment)
+        return None
+
+    def evaluate_function_definition(self, node, environment):
+        operands = self.operands[self.offsets[node]:self.offsets[node + 1]]
+        name, body, arguments = self.identifier_name(operands[0]), operands[1], operands[2:]
+        function = Function(name, [self.identifier_name(argument) for argument in arguments], body, environment)
+        environment.assign(name, function)
+        return None
+
+    def evaluate_function_call(self, node, environment):
+        operands = self.operands[self.offsets[node]:self.offsets[node + 1]]
+        name = self.identifier_name(operands[0])
+        function_obj = environment.get(name)
+        if not hasattr(function_obj, "call"):
+            raise Exception(f"{name} is not callable")
+        evaluated_args = [self.eval_node(argument, environment) for argument in operands[1:]]
+        return function_obj.call(self, evaluated_args)
+
+    def evaluate_return(self, node, environment):
+        raise ReturnValue(self.eval_node(self.operands[self.offsets[node]], environment), node)
+
+    def evaluate_bracket_access(self, node, environment):
+        start = self.offsets[node]
+        target = self.eval_node(self.operands[start], environment)
+        index = self.eval_node(self.operands[start + 1], environment)
+        return bracket_access(target, index)
+
+    def evaluate_array(self, node, environment):
+        return [self.eval_node(element, environment)
+                for element in self.operands[self.offsets[node]:self.offsets[node + 1]]]
+
+    def identifier_name(self, node):
+        return self.literals[self.operands[self.offsets[node]]]
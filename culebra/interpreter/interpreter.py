@@ -78,8 +78,10 @@ Implementation Notes:
 
 # Create a custom exception for function returns.
 class ReturnValue(Exception):
-    def __init__(self, value):
+    def __init__(self, value, node=None):
         self.value = value
+        # The return statement, to report a return outside of a function
+        self.node = node
 
 # Function object stores the function definition with its closure.
 class Function:
@@ -100,12 +102,50 @@ class Function:
             return rv.value
         return None
 
+# Evaluator method of each node class
+Evaluators = {
+    ast.Program: 'evaluate_block',
+    ast.Block: 'evaluate_block',
+    ast.LazyBlock: 'evaluate_block',
+    ast.Identifier: 'evaluate_identifier',
+    ast.Integer: 'evaluate_literal',
+    ast.Float: 'evaluate_literal',
+    ast.String: 'evaluate_literal',
+    ast.Bool: 'evaluate_literal',
+    ast.BracketAccess: 'evaluate_bracket_access',
+    ast.Assignment: 'evaluate_assignment',
+    ast.FunctionCall: 'evaluate_function_call',
+    ast.FunctionDefinition: 'evaluate_function_definition',
+    ast.ReturnStatement: 'evaluate_return',
+    ast.Conditional: 'evaluate_conditional',
+    ast.While: 'evaluate_while',
+    ast.For: 'evaluate_for',
+    ast.Array: 'evaluate_array',
+    ast.ConstantArray: 'evaluate_constant_array',
+}
+Evaluators.update((cls, 'evaluate_binary_operation') for cls in ast.BinaryOperation.__subclasses__())
+Evaluators.update((cls, 'evaluate_prefix_operation') for cls in ast.PrefixOperation.__subclasses__())
+
+# Execution engines: walking the tree, running it compiled to closures (see culebra.interpreter.closure_compiler),
+# compiled to bytecode (see culebra.compiler and culebra.interpreter.vm) or translated to Python (see culebra.transpiler)
+Engines = ['tree', 'closure', 'vm', 'python']
+
 class Interpreter:
-    def __init__(self):
+    # Evaluator method name of each node class, subclasses extend it to evaluate new node classes
+    node_evaluators = Evaluators
+
+    def __init__(self, engine: str = 'tree'):
+        if engine not in Engines:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(Engines)}")
+        self.engine = engine
         self.root_environment = Environment()
         self.load_builtins()  # Load built-in functions into the environment
         self.last_error = None
         self.last_node = None
+        # Namespace of the translated programs of the python engine, created on first use
+        self.python_runtime = None
+        # Bound evaluator of each node class, looked up by the exact class of a node
+        self.evaluators = {cls: getattr(self, name) for cls, name in self.node_evaluators.items()}
 
     @property
     def has_error(self):
@@ -114,47 +154,59 @@ class Interpreter:
     def evaluate(self, program: ast.Program):
         self.last_error = None
         self.last_node = None
+        try:
+            return self.run(program)
+        except ReturnValue as rv:
+            raise self.outside_function(rv) from None
+
+    def run(self, program: ast.Program):
+        """Evaluates a program with the engine of the interpreter."""
+        if self.engine == 'closure':
+            from culebra.interpreter.closure_compiler import ClosureCompiler
+            return ClosureCompiler(self).compile_program(program)(self.root_environment)
+        if self.engine == 'vm':
+            from culebra.interpreter.vm import VM
+            return VM(self).evaluate(program)
+        if self.engine == 'python':
+            from culebra.transpiler import PythonRuntime
+            if self.python_runtime is None:
+                self.python_runtime = PythonRuntime(self)
+            return self.python_runtime.evaluate(program)
         return self.eval_node(program, self.root_environment)
 
+    def outside_function(self, rv: ReturnValue) -> Exception:
+        """The error of a return that unwound out of the program, reported at the return statement."""
+        error = Exception("'return' outside of a function")
+        self.last_error = error
+        self.last_node = rv.node
+        return error
+
     def eval_node(self, node, environment):
         try:
-            # Dispatch evaluation based on the type of AST node.
-            if isinstance(node, ast.Identifier):
-                return self.evaluate_identifier(node, environment)
-            elif isinstance(node, ast.Assignment):
-                return self.evaluate_assignment(node, environment)
-            elif isinstance(node, ast.LiteralValue):
-                return self.evaluate_literal(node, environment)
-            elif isinstance(node, (ast.Program, ast.Block)):
-                return self.evaluate_block(node, environment)
-            elif isinstance(node, ast.BinaryOperation):
-                return self.evaluate_binary_operation(node, environment)
-            elif isinstance(node, ast.PrefixOperation):
-                return self.evaluate_prefix_operation(node, environment)
-            elif isinstance(node, ast.Conditional):
-                return self.evaluate_conditional(node, environment)
-            elif isinstance(node, ast.While):
-                return self.evaluate_while(node, environment)
-            elif isinstance(node, ast.For):
-                return self.evaluate_for(node, environment)
-            elif isinstance(node, ast.FunctionDefinition):
-                return self.evaluate_function_definition(node, environment)
-            elif isinstance(node, ast.FunctionCall):
-                return self.evaluate_function_call(node, environment)
-            elif isinstance(node, ast.ReturnStatement):
-                return self.evaluate_return(node, environment)
-            elif isinstance(node, ast.BracketAccess):
-                return self.evaluate_bracket_access(node, environment)
-            elif isinstance(node, ast.Array):
-                return self.evaluate_array(node, environment)
-            else:
-                raise TypeError(f"Unexpected AST node type: {type(node)}")
+            # Dispatch evaluation based on the class of the AST node.
+            evaluator = self.evaluators.get(type(node)) or self.evaluator_for(type(node))
+            return evaluator(node, environment)
+        except ReturnValue:
+            # Returns unwind through eval_node, they are not errors
+            raise
         except Exception as e:
             if not self.has_error:
                 self.last_error = e
                 self.last_node = node
             raise e
 
+    def evaluator_for(self, node_class):
+        """
+        Evaluator of a node class missing from `node_evaluators`, the one of its
+        closest base class (e.g. for a subclass of a node class), cached.
+        """
+        for base in node_class.__mro__:
+            name = self.node_evaluators.get(base)
+            if name is not None:
+                evaluator = self.evaluators[node_class] = getattr(self, name)
+                return evaluator
+        raise TypeError(f"Unexpected AST node type: {node_class}")
+
     def evaluate_identifier(self, node, environment):
         # AST Identifier: node.value holds the variable name.
         return environment.get(node.value)
@@ -186,7 +238,7 @@ class Interpreter:
     def evaluate_binary_operation(self, node, environment):
         left = self.eval_node(node.left, environment)
         right = self.eval_node(node.right, environment)
-        tt = node.token.type
+        tt = node.token_kind
 
         # Arithmetic
         if tt == TokenType.PLUS:
@@ -222,7 +274,7 @@ class Interpreter:
 
     def evaluate_prefix_operation(self, node, environment):
         operand = self.eval_node(node.value, environment)
-        tt = node.token.type
+        tt = node.token_kind
         if tt == TokenType.MINUS:
             return -operand
         elif tt == TokenType.NOT:
@@ -265,30 +317,21 @@ class Interpreter:
 
     def evaluate_return(self, node, environment):
         value = self.eval_node(node.value, environment)
-        raise ReturnValue(value)
+        raise ReturnValue(value, node)
 
     def evaluate_bracket_access(self, node, environment):
         target = self.eval_node(node.target, environment)
         index = self.eval_node(node.index, environment)
-        
-        # Ensure index is an integer
-        if not isinstance(index, int):
-            raise TypeError(f"Index must be an integer, got {type(index)}")
-        
-        # Support both strings and arrays
-        if not isinstance(target, (str, list)):
-            raise TypeError(f"Bracket access only supports strings and arrays, got {type(target)}")
-        
-        # Check index bounds
-        if index < 0 or index >= len(target):
-            raise IndexError(f"Index {index} out of range for {type(target)} of length {len(target)}")
-        
-        return target[index]
+        return bracket_access(target, index)
 
     def evaluate_array(self, node, environment):
         # Evaluate each element in the array
         return [self.eval_node(element, environment) for element in node.elements]
 
+    def evaluate_constant_array(self, node, environment):
+        # A new list each time, the array may be mutated
+        return list(node.values)
+
     def load_builtins(self):
         # Add built-in functions to the global environment.
         self.root_environment.assign("print", BuiltinFunction(builtin_print))
@@ -297,6 +340,21 @@ class Interpreter:
         self.root_environment.assign("chr", BuiltinFunction(builtin_chr))
         self.root_environment.assign("ord", BuiltinFunction(builtin_ord))
 
+def bracket_access(target, index):
+    # Ensure index is an integer
+    if not isinstance(index, int):
+        raise TypeError(f"Index must be an integer, got {type(index)}")
+    
+    # Support both strings and arrays
+    if not isinstance(target, (str, list)):
+        raise TypeError(f"Bracket access only supports strings and arrays, got {type(target)}")
+    
+    # Check index bounds
+    if index < 0 or index >= len(target):
+        raise IndexError(f"Index {index} out of range for {type(target)} of length {len(target)}")
+    
+    return target[index]
+
 ##############################
 # Built-in function wrapper and definitions
 ##############################
@@ -307,6 +365,10 @@ class BuiltinFunction:
     def call(self, interpreter, arguments):
         return self.func(*arguments)
 
+    def __call__(self, *arguments):
+        # Called directly by translated programs, see culebra.transpiler
+        return self.func(*arguments)
+
 def builtin_print(*args):
     print(*args)
     return None
@@ -0,0 +1,162 @@
+from culebra import ast
+from typing import List
+from culebra.interpreter.environment import Unassigned
+from culebra.interpreter.interpreter import Interpreter, ReturnValue
+from culebra.resolver import Resolver
+
+"""
+Evaluator of resolved programs (see culebra.resolver). The variables of a
+function call are the items of its frame (see culebra.interpreter.environment),
+found at the `depth` and `slot` of their identifier: `depth` parents up the
+chain of frames, then an index, instead of a search by name through every
+environment of the chain. The variables of the program stay in the root
+Environment, read by name. A variable that several scopes assign is searched
+through its `chain` of places, as the environments are.
+"""
+
+# A frame: its parent frame, then the variables of a call
+Frame = List[object]
+
+
+def holds(holder, key) -> bool:
+    """Whether a frame or the globals hold a variable."""
+    return key in holder if type(holder) is dict else holder[key] is not Unassigned
+
+
+class ResolvedFunction:
+    """A function of a resolved program and the frame it was defined in."""
+    __slots__ = ('name', 'definition', 'closure')
+
+    def __init__(self, definition: ast.FunctionDefinition, closure: Frame):
+        self.name = definition.name.value
+        self.definition = definition
+        self.closure = closure
+
+    def call(self, interpreter, arguments):
+        definition = self.definition
+        scope = definition.scope
+        if not scope.resolved:
+            interpreter.resolve_function(definition)
+        frame = scope.frame_template.copy()
+        frame[0] = self.closure
+        for argument, value in zip(definition.arguments, arguments):
+            if argument.chain is None:
+                frame[argument.slot] = value
+            else:
+                # A parameter named like a variable of an outer scope assigns it when it holds the name
+                interpreter.store(argument, frame, value)
+        try:
+            interpreter.eval_node(definition.body, frame)
+        except ReturnValue as rv:
+            return rv.value
+        return None
+
+
+class ResolvedInterpreter(Interpreter):
+    """Evaluates programs with the frames of culebra.resolver, the `environment` of a node is its Frame."""
+
+    def __init__(self):
+        super().__init__()
+        # Variables of the program
+        self.globals = self.root_environment.values
+
+    def evaluate(self, program: ast.Program):
+        Resolver().resolve(program, self.globals)
+        self.last_error = None
+        self.last_node = None
+        try:
+            # The top level has no frame, its variables are global
+            return self.eval_node(program, None)
+        except ReturnValue as rv:
+            raise self.outside_function(rv) from None
+
+    def resolve_function(self, definition: ast.FunctionDefinition) -> None:
+        """Resolves the lazily parsed body of a function, its parse errors are reported at the body."""
+        try:
+            Resolver().resolve_function(definition)
+        except Exception as e:
+            if not self.has_error:
+                self.last_error = e
+                self.last_node = definition.body
+            raise
+
+    def load(self, identifier: ast.Identifier, frame: Frame):
+        slot = identifier.slot
+        if slot is None:
+            if identifier.chain is not None:
+                return self.load_chain(identifier, frame)
+            try:
+                return self.globals[identifier.value]
+            except KeyError:
+                raise NameError(f"Undefined variable '{identifier.value}'") from None
+        depth = identifier.depth
+        while depth:
+            frame = frame[0]
+            depth -= 1
+        value = frame[slot]
+        if value is Unassigned:
+            raise NameError(f"Undefined variable '{identifier.value}'")
+        return value
+
+    def store(self, identifier: ast.Identifier, frame: Frame, value) -> None:
+        slot = identifier.slot
+        if slot is None:
+            if identifier.chain is not None:
+                self.store_chain(identifier, frame, value)
+            else:
+                self.globals[identifier.value] = value
+            return
+        depth = identifier.depth
+        while depth:
+            frame = frame[0]
+            depth -= 1
+        frame[slot] = value
+
+    def holders(self, identifier: ast.Identifier, frame: Frame):
+        """The frames (or the globals) that may hold a variable, innermost first, with its key in them."""
+        depth = 0
+        for place_depth, slot in identifier.chain:
+            while depth < place_depth:
+                frame = frame[0]
+                depth += 1
+            yield (self.globals, identifier.value) if slot is None else (frame, slot)
+
+    def load_chain(self, identifier: ast.Identifier, frame: Frame):
+        """Reads a variable from the innermost place that holds it, as `Environment.get` does."""
+        for holder, key in self.holders(identifier, frame):
+            if holds(holder, key):
+                return holder[key]
+        raise NameError(f"Undefined variable '{identifier.value}'")
+
+    def store_chain(self, identifier: ast.Identifier, frame: Frame, value) -> None:
+        """
+        Assigns the innermost place that holds a variable, else the frame of
+        the assignment (the first place), as `Environment.assign` does.
+        """
+        places = list(self.holders(identifier, frame))
+        holder, key = next((place for place in places if holds(*place)), places[0])
+        holder[key] = value
+
+    # The most frequent evaluator, without a call in between
+    evaluate_identifier = load
+
+    def evaluate_assignment(self, node, frame):
+        value = self.eval_node(node.value, frame)
+        if type(node.identifier) is ast.Identifier:
+            self.store(node.identifier, frame, value)
+        else:
+            container = self.eval_node(node.identifier.target, frame)
+            index = self.eval_node(node.identifier.index, frame)
+            self.root_environment.assign_bracket(container, index, value)
+        return None
+
+    def evaluate_function_definition(self, node, frame):
+        self.store(node.name, frame, ResolvedFunction(node, frame))
+        return None
+
+    def evaluate_function_call(self, node, frame):
+        function_obj = self.load(node.function, frame)
+        if not hasattr(function_obj, "call"):
+            raise Exception(f"{node.function.value} is not callable")
+        evaluated_args = [self.eval_node(arg, frame) for arg in node.arguments]
+        return function_obj.call(self, evaluated_args)
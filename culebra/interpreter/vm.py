@@ -0,0 +1,219 @@
+import sys
+from typing import List
+from culebra import ast
+from culebra.compiler import Code, FunctionCode, Opcode, compile_program
+from culebra.interpreter.environment import Environment, assign
+from culebra.interpreter.interpreter import ReturnValue, bracket_access
+
+"""
+Bytecode Virtual Machine
+========================
+
+Runs the code of `culebra.compiler` in a single dispatch loop. Every frame
+has its own value stack and environment; a call to a Culebra function
+pushes the frame of the caller on a list of frames and runs the code of
+the function in the same loop, so the depth of the recursion of a program
+is not bounded by the Python stack (only by `sys.getrecursionlimit()`
+calls, as a guard against runaway recursion).
+
+Scoping, evaluation order and errors are those of the tree-walking
+Interpreter: the node of the instruction that raises (or of the identifier
+a superinstruction fails to find) is recorded as `last_node`.
+"""
+
+# Opcodes as plain ints, the dispatch loop compares them by frequency
+LOAD_CONST = Opcode.LOAD_CONST.value
+LOAD_NAME = Opcode.LOAD_NAME.value
+STORE_NAME = Opcode.STORE_NAME.value
+BINARY_OP = Opcode.BINARY_OP.value
+BINARY_NAME_CONST = Opcode.BINARY_NAME_CONST.value
+BINARY_NAME_NAME = Opcode.BINARY_NAME_NAME.value
+BINARY_CONST_NAME = Opcode.BINARY_CONST_NAME.value
+NEGATE = Opcode.NEGATE.value
+NOT = Opcode.NOT.value
+JUMP = Opcode.JUMP.value
+JUMP_IF_FALSE = Opcode.JUMP_IF_FALSE.value
+LOAD_FUNCTION = Opcode.LOAD_FUNCTION.value
+CALL = Opcode.CALL.value
+RETURN = Opcode.RETURN.value
+MAKE_FUNCTION = Opcode.MAKE_FUNCTION.value
+BUILD_ARRAY = Opcode.BUILD_ARRAY.value
+COPY_ARRAY = Opcode.COPY_ARRAY.value
+BRACKET_ACCESS = Opcode.BRACKET_ACCESS.value
+STORE_BRACKET = Opcode.STORE_BRACKET.value
+POP = Opcode.POP.value
+HALT = Opcode.HALT.value
+
+
+class VMFunction:
+    """A function of the VM: its definition and the environment it was defined in."""
+    __slots__ = ('definition', 'closure')
+
+    def __init__(self, definition: FunctionCode, closure: Environment):
+        self.definition = definition
+        self.closure = closure
+
+    @property
+    def name(self) -> str:
+        return self.definition.name
+
+    def call(self, interpreter, arguments):
+        return VM(interpreter).call(self, arguments)
+
+
+class VM:
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+
+    def fail(self, error: Exception, node: ast.ASTNode):
+        """Records the innermost node where an error happened, as `Interpreter.eval_node` does, and raises it."""
+        interpreter = self.interpreter
+        if not interpreter.has_error:
+            interpreter.last_error = error
+            interpreter.last_node = node
+        raise error
+
+    def lookup(self, env: Environment, name: str, node: ast.ASTNode):
+        """`Environment.get` without recursion."""
+        scope = env
+        while scope is not None:
+            if name in scope.values:
+                return scope.values[name]
+            scope = scope.parent
+        self.fail(NameError(f"Undefined variable '{name}'"), node)
+
+    def function_code(self, function: VMFunction) -> Code:
+        """The code of a function, compiled on its first call; parse errors of a lazy body are reported there."""
+        try:
+            return function.definition.code()
+        except Exception as e:
+            self.fail(e, function.definition.node.body)
+
+    def evaluate(self, program: ast.Program):
+        return self.run(compile_program(program), self.interpreter.root_environment)
+
+    def call(self, function: VMFunction, arguments: list):
+        function_env = Environment(function.closure)
+        for arg_name, arg_value in zip(function.definition.arguments, arguments):
+            assign(function_env, arg_name, arg_value)
+        return self.run(self.function_code(function), function_env, function=True)
+
+    def run(self, code: Code, env: Environment, function: bool = False):
+        """
+        Runs a code until it halts, or returns from it when it is the code of
+        a `function`. A return from the code of a program raises `ReturnValue`.
+        """
+        lookup, interpreter, max_depth = self.lookup, self.interpreter, sys.getrecursionlimit()
+        instructions, constants = code.instructions, code.constants
+        stack: List[object] = []
+        # Callers of the running code: their code, offset to resume at, environment and stack
+        frames = []
+        pc = 0
+        try:
+            while True:
+                opcode = instructions[pc]
+                argument = instructions[pc + 1]
+                pc += 2
+                if opcode == LOAD_NAME:
+                    name = constants[argument]
+                    values = env.values
+                    stack.append(values[name] if name in values else lookup(env, name, code.node_at(pc - 2)))
+                elif opcode == LOAD_CONST:
+                    stack.append(constants[argument])
+                elif opcode == BINARY_NAME_CONST:
+                    name, right, operation, node = constants[argument]
+                    values = env.values
+                    stack.append(operation(values[name] if name in values else lookup(env, name, node), right))
+                elif opcode == JUMP_IF_FALSE:
+                    if not stack.pop():
+                        pc = argument
+                elif opcode == STORE_NAME:
+                    name = constants[argument]
+                    values = env.values
+                    if name in values:
+                        values[name] = stack.pop()
+                    else:
+                        assign(env, name, stack.pop())
+                elif opcode == BINARY_NAME_NAME:
+                    left, right, operation, left_node, right_node = constants[argument]
+                    values = env.values
+                    left = values[left] if left in values else lookup(env, left, left_node)
+                    stack.append(operation(left, values[right] if right in values else lookup(env, right, right_node)))
+                elif opcode == BINARY_OP:
+                    right = stack.pop()
+                    stack[-1] = constants[argument](stack[-1], right)
+                elif opcode == JUMP:
+                    pc = argument
+                elif opcode == LOAD_FUNCTION:
+                    name = constants[argument]
+                    values = env.values
+                    callee = values[name] if name in values else lookup(env, name, code.node_at(pc - 2))
+                    if type(callee) is not VMFunction and not hasattr(callee, "call"):
+                        raise Exception(f"{name} is not callable")
+                    stack.append(callee)
+                elif opcode == CALL:
+                    if argument:
+                        arguments = stack[-argument:]
+                        del stack[-argument:]
+                    else:
+                        arguments = []
+                    callee = stack.pop()
+                    if type(callee) is not VMFunction:
+                        stack.append(callee.call(interpreter, arguments))
+                        continue
+                    if len(frames) >= max_depth:
+                        raise RecursionError("maximum recursion depth exceeded")
+                    function_env = Environment(callee.closure)
+                    for arg_name, arg_value in zip(callee.definition.arguments, arguments):
+                        assign(function_env, arg_name, arg_value)
+                    callee_code = callee.definition.compiled or self.function_code(callee)
+                    frames.append((code, pc, env, stack))
+                    code, pc, env, stack = callee_code, 0, function_env, []
+                    instructions, constants = code.instructions, code.constants
+                elif opcode == RETURN:
+                    value = stack.pop()
+                    if not frames:
+                        if function:
+                            return value
+                        # A return outside of a function
+                        raise ReturnValue(value, code.node_at(pc - 2))
+                    code, pc, env, stack = frames.pop()
+                    instructions, constants = code.instructions, code.constants
+                    stack.append(value)
+                elif opcode == BINARY_CONST_NAME:
+                    left, name, operation, node = constants[argument]
+                    values = env.values
+                    stack.append(operation(left, values[name] if name in values else lookup(env, name, node)))
+                elif opcode == POP:
+                    stack.pop()
+                elif opcode == BRACKET_ACCESS:
+                    index = stack.pop()
+                    stack[-1] = bracket_access(stack[-1], index)
+                elif opcode == STORE_BRACKET:
+                    index = stack.pop()
+                    container = stack.pop()
+                    env.assign_bracket(container, index, stack.pop())
+                elif opcode == COPY_ARRAY:
+                    stack.append(list(constants[argument]))
+                elif opcode == BUILD_ARRAY:
+                    if argument:
+                        elements = stack[-argument:]
+                        del stack[-argument:]
+                    else:
+                        elements = []
+                    stack.append(elements)
+                elif opcode == NOT:
+                    stack[-1] = not stack[-1]
+                elif opcode == NEGATE:
+                    stack[-1] = -stack[-1]
+                elif opcode == MAKE_FUNCTION:
+                    definition = constants[argument]
+                    assign(env, definition.name, VMFunction(definition, env))
+                elif opcode == HALT:
+                    return stack.pop()
+                else:
+                    raise AssertionError(f"Unexpected opcode {opcode}")
+        except ReturnValue:
+            raise
+        except Exception as e:
+            self.fail(e, code.node_at(pc - 2))
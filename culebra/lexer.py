@@ -56,8 +56,8 @@ DEDENT  - When popping levels
 NEWLINE - At end of each line
 
 Token Matching Algorithm:
-• Uses Maximal Munch (Longest Match) principle
-• Tries patterns in order of precedence:
+• `TokenRegex` specifies the tokens as patterns tried in order of
+  precedence, first match wins:
   1. Whitespace and comments
   2. Keywords (to prevent 'if' being tokenized as identifier)
   3. Multi-character operators (==, >=, <=)
@@ -65,6 +65,21 @@ Token Matching Algorithm:
   5. Invalid identifiers (for error reporting)
   6. Numbers and literals
   7. Valid identifiers
+• `scan_token` implements the same table without trying every pattern:
+  the first character selects the token class, words are matched once
+  and resolved as keywords by a dict lookup, and operators come from
+  one- and two-character tables. Matching is done in place with
+  `regex.match(text, pos)`, so the source is never re-sliced
+
+First Character Dispatch:
+┌───────────┬──────────────────────────────────────────────┐
+│ a-z A-Z _ │ word → KeywordTokens[word] or IDENTIFIER     │
+│ 0-9       │ INVALID_IDENTIFIER, FLOAT or NUMBER          │
+│ "         │ STRING (triple quoted before single quoted)  │
+│ ( ) = < … │ TwoCharTokens, then OneCharTokens            │
+│ #         │ LINE_COMMENT                                 │
+│ space     │ WHITESPACE                                   │
+└───────────┴──────────────────────────────────────────────┘
 
 Special Features:
 • Tracks position of each token for error reporting
@@ -72,131 +87,667 @@ Special Features:
 • Handles comments and whitespace
 • Validates identifier names
 • Supports multi-line strings
+• Streams tokens lazily from file objects read in chunks (`Lexer.iter_tokens`)
+• Scans UTF-8 bytes in place, e.g. a memory-mapped file (`Lexer.tokenize_bytes`)
+• Re-scans only the edited lines of a changed source (`Lexer.relex`)
 """
 
-from typing import List
+from bisect import bisect_left
+from mmap import mmap
+from operator import attrgetter
+from typing import Callable, Iterator, List, Optional, TextIO, Tuple, Union
 import re
-from culebra.token import Token, TokenType
+from culebra.token import Shift, Token, TokenBuffer, TokenType
+
+# Characters requested from a file object per read by `Lexer.iter_tokens`
+DEFAULT_CHUNK_SIZE = 64 * 1024
 
 class Lexer:
+    def __init__(self, decode_literals: bool = True):
+        # Attach the value of NUMBER, FLOAT, STRING and BOOLEAN tokens, see `LiteralDecoders`
+        self.decode_literals = decode_literals
+
     def tokenize(self, text: str) -> List[Token]:
-        text = text.strip()
-        indent_stack = [0]  # Keep track of indent levels
+        return list(self.iter_tokens(text))
+
+    def tokenize_compact(self, text: str) -> TokenBuffer:
+        """Tokenizes `text` into a `TokenBuffer`, which keeps offsets instead of `Token` objects."""
+        base = LeadingWhitespaceRegex.match(text).end()
+        return TokenBuffer.from_tokens(text, self.iter_tokens(text), base)
+
+    def iter_tokens(self, source: Union[str, TextIO], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Token]:
+        """
+        Lazily generates the tokens of `source`, which is either the whole text
+        or a file object read `chunk_size` characters at a time.
+
+        Tokens are identical to the ones produced for the whole text at once,
+        positions included. While reading a file only the unconsumed tail of
+        the current chunk is kept in memory: a token is emitted once enough
+        text follows it to be sure more input cannot change it, and the
+        indent stack carries over from one chunk to the next.
+        """
+        if isinstance(source, str):
+            return self._scan(source.strip(), 0, [0])
+        return self._scan("", 0, [0], source.read, chunk_size)
+
+    def relex(self, previous_tokens: List[Token], source: str, edit_start: int, edit_end: int,
+              new_text: str) -> List[Token]:
+        """
+        Updates `previous_tokens`, the tokens of `source`, for the source where
+        `source[edit_start:edit_end]` is replaced by `new_text`, and returns it.
+
+        Only the edited lines are scanned again: scanning restarts at the last
+        newline before the edit, with the indent stack rebuilt from the
+        tokens of the enclosing block, and stops at the first newline after
+        the edit where the indent stack agrees with the previous tokens. The
+        previous tokens from there on are kept, and moved in place through
+        the Shift they share (see `shift_tail`). The edited source is read
+        from the restart on, and is not built. The result is the same as
+        tokenizing the edited source.
+        """
+        lead = LeadingWhitespaceRegex.match(source).end()
+        following = new_text[:1] or source[edit_end:edit_end + 1]
+        if edit_start < lead or (edit_start == lead and (not following or following.isspace())):
+            # The stripped leading whitespace changes every position
+            previous_tokens[:] = self.tokenize(source[:edit_start] + new_text + source[edit_end:])
+            return previous_tokens
+
+        # Restart at the last newline before the edit that is still followed by tokens,
+        # the tokens before it do not depend on the edit
+        end = previous_tokens[-1].pos  # The EOF, at the end of the stripped source
+        restart = bisect_left(previous_tokens, min(edit_start - lead, end), key=TokenPosition) - 1
+        while restart >= 0 and not (
+                previous_tokens[restart].type == TokenType.NEWLINE and
+                source[previous_tokens[restart].pos + lead] == '\n'):
+            restart -= 1
+        if restart < 0 or previous_tokens[restart].value:
+            # An unterminated string looks ahead to the end of the text, no token before the edit is safe
+            previous_tokens[:] = self.tokenize(source[:edit_start] + new_text + source[edit_end:])
+            return previous_tokens
+
+        indent_stack = indent_stack_at(previous_tokens, restart, source, lead)
+        old_indent_stack = list(indent_stack)
+        delta = len(new_text) - (edit_end - edit_start)
+        unchanged_from = edit_start + len(new_text) - lead  # Start of the text after the edit, in the new positions
+        restart_pos = previous_tokens[restart].pos
+        read_from = edit_end
+
+        def read(size: int) -> str:
+            nonlocal read_from
+            chunk = source[read_from:read_from + size]
+            read_from += len(chunk)
+            return chunk
+
         tokens = []
-        i = 0
-        while i < len(text):
-            chunk = text[i:]
-            is_legal = False
+        old_index = restart
+        count = len(previous_tokens)
+        for token in self._scan(source[restart_pos + lead:edit_start] + new_text, 0, indent_stack, read,
+                                offset=restart_pos):
+            if token.type == TokenType.NEWLINE and unchanged_from <= token.pos and token.pos - delta < end:
+                # Replay the previous tokens up to the same newline before the edit
+                old_pos = token.pos - delta
+                while old_index < count and (previous_tokens[old_index].pos < old_pos or (
+                        previous_tokens[old_index].pos == old_pos and
+                        previous_tokens[old_index].type != TokenType.NEWLINE)):
+                    old_token = previous_tokens[old_index]
+                    if old_token.type == TokenType.INDENT:
+                        old_indent_stack.append(old_token.literal)
+                    elif old_token.type == TokenType.DEDENT:
+                        old_indent_stack.pop()
+                    old_index += 1
+                if (old_index < count and previous_tokens[old_index].pos == old_pos and
+                        old_indent_stack == indent_stack and previous_tokens[old_index].value == token.value):
+                    # Back in sync, the rest of the previous tokens are still valid
+                    if delta:
+                        shift_tail(previous_tokens, old_index, delta)
+                    previous_tokens[restart:old_index] = tokens
+                    return previous_tokens
+            tokens.append(token)
 
+        previous_tokens[restart:] = tokens
+        return previous_tokens
+
+    def _scan(self, text: str, start: int, indent_stack: List[int],
+              read: Optional[Callable[[int], str]] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              offset: int = 0) -> Iterator[Token]:
+        """
+        Generates the tokens of the stripped `text` from `start`, a token
+        boundary where the indentation levels were `indent_stack`, or of the
+        rest of a file when given its `read` function. `offset` is the
+        position of `text[0]` in the stripped source. `indent_stack` is
+        updated as tokens are generated. NEWLINE tokens have the value True
+        once a string failed to match, see `Lexer.relex`.
+        """
+        eof = read is None
+        # Text past the last non-whitespace character may still be stripped
+        limit = len(text) if eof else len(text.rstrip())
+        started = eof or offset > 0  # Leading whitespace has been stripped
+        read_size = chunk_size
+        decoders = LiteralDecoders if self.decode_literals else {}
+        last_type = None
+        failed = None  # Whether a string failed to match: a quote is illegal, or a triple quote is an empty string
+        i = start
+        while True:
+            needs_input = i >= limit
+            if not needs_input and text[i] == '\n':
+                match = IndentRegex.match(text, i + 1)
+                # An incomplete indentation unit may still be followed by more spaces
+                needs_input = not eof and match.end() + 4 > limit
+            elif not needs_input:
+                scanned = scan_token(text, i)
+                if not eof:
+                    # Operators and numbers look up to two characters past their end, and a
+                    # string that is not closed yet may be closed by the next chunk.
+                    end = i + 1 if scanned is None else scanned[1]
+                    needs_input = end + 2 > limit or (text[i] == '"' and (
+                        scanned is None or (end - i == 2 and text.startswith('"""', i))
+                    ))
+
+            if needs_input:
+                if eof:
+                    break
+                if i:
+                    text = text[i:]
+                    offset += i
+                    i = 0
+                    read_size = chunk_size
+                else:
+                    # The pending token spans the whole buffer, grow reads to stay linear
+                    read_size *= 2
+                chunk = read(read_size)
+                if chunk:
+                    text += chunk
+                    if not started:
+                        text = text.lstrip()
+                        started = bool(text)
+                else:
+                    eof = True
+                    text = text.rstrip()
+                limit = len(text) if eof else len(text.rstrip())
+                continue
+
+            pos = offset + i
             if text[i] == '\n':
-                tokens.append(Token(TokenType.NEWLINE, '\n', i))
-                indent = 0
-                i += 1
-                while i < len(text):
-                    match = IndentRegex.match(text[i:])
-                    if not match: break
-                    indent += 1
-                    i += match.end()
+                yield Token(TokenType.NEWLINE, '\n', pos, failed)
+                indent = match.group(0).count('\t')
+                indent += (match.end() - i - 1 - indent) // 4
+                i = match.end()
+                pos = offset + i
+                last_type = TokenType.NEWLINE
 
                 current_indent = indent_stack[-1]
                 if indent > current_indent:
                     # Increasing indent
-                    tokens.append(Token(TokenType.INDENT, indent, i))
+                    yield Token(TokenType.INDENT, indent, pos)
                     indent_stack.append(indent)
+                    last_type = TokenType.INDENT
                 elif indent < current_indent:
                     # Decreasing indent - may need multiple DEDENT tokens
                     while indent < indent_stack[-1]:
                         indent_stack.pop()
-                        tokens.append(Token(TokenType.DEDENT, None, i))
+                        yield Token(TokenType.DEDENT, None, pos)
+                    last_type = TokenType.DEDENT
                     ## TODO: esto esta mal
                     if indent != indent_stack[-1]:
                         raise IndentationError(f"Unindent does not match any outer indentation level")
 
                 continue
 
-            for token_type, regex in TokenRegex.items():
-                match = regex.match(chunk)
-                if match:
-                    value = match.group(0)
-                    if token_type not in [TokenType.WHITESPACE, TokenType.LINE_COMMENT]:
-                        token = Token(token_type, value, i)
-                        tokens.append(token)
-                    i += len(value)
-                    is_legal = True
-                    break
-
-            if not is_legal:
-                char = chunk[0]
-                token = Token(TokenType.ILLEGAL_CHARACTER, char, i)
-                tokens.append(token)
+            if scanned is None:
+                if text[i] == '"':
+                    failed = True
+                yield Token(TokenType.ILLEGAL_CHARACTER, text[i], pos)
+                last_type = TokenType.ILLEGAL_CHARACTER
                 i += 1
+                continue
 
-        if not tokens or tokens[-1].type != TokenType.NEWLINE:
-            tokens.append(Token(TokenType.NEWLINE, '\n', i))
+            token_type, end = scanned
+            if end - i == 2 and token_type is TokenType.STRING and text.startswith('"""', i):
+                failed = True
+            if token_type not in SkippedTokenTypes:
+                literal = text[i:end]
+                decoder = decoders.get(token_type)
+                yield Token(token_type, literal, pos, None if decoder is None else decoder(literal))
+                last_type = token_type
+            i = end
+
+        pos = offset + i
+        if last_type != TokenType.NEWLINE:
+            yield Token(TokenType.NEWLINE, '\n', pos, failed)
 
         # Handle any remaining dedents at the end of file
         while len(indent_stack) > 1:
             indent_stack.pop()
-            tokens.append(Token(TokenType.DEDENT, None, i))
+            yield Token(TokenType.DEDENT, None, pos)
+
+        yield Token(TokenType.EOF, "", pos)
 
-        tokens.append(Token(TokenType.EOF, "", i))
-        return tokens
+    def tokenize_bytes(self, data: Union[bytes, mmap]) -> TokenBuffer:
+        """
+        Tokenizes UTF-8 encoded source, such as a memory-mapped file, into a
+        `TokenBuffer` over `data` without decoding it as a whole.
 
-IndentRegex = re.compile(r"^(\t| {4})")
+        Token positions are byte offsets from the end of the leading
+        whitespace, and literals are decoded only when their token is
+        accessed. Line endings are treated as when reading the file in text
+        mode, so `\r\n` and `\r` are newlines too.
+        """
+        base = ByteLeadingWhitespaceRegex.match(data).end()
+        limit = stripped_end(data, base)
+        buffer = TokenBuffer(data, base)
+        add = buffer.add
+        indent_stack = [0]  # Keep track of indent levels
+        last_type = None
+        i = base
+        while i < limit:
+            byte = data[i]
+            if byte == 0x0A or byte == 0x0D:
+                add(TokenType.NEWLINE, i - base, i - base)
+                i += 2 if data[i:i + 2] == b"\r\n" else 1
+                match = ByteIndentRegex.match(data, i, limit)
+                indent = match.group(0).count(b'\t')
+                indent += (match.end() - i - indent) // 4
+                i = match.end()
+                last_type = TokenType.NEWLINE
+
+                current_indent = indent_stack[-1]
+                if indent > current_indent:
+                    add(TokenType.INDENT, i - base, indent)
+                    indent_stack.append(indent)
+                    last_type = TokenType.INDENT
+                elif indent < current_indent:
+                    while indent < indent_stack[-1]:
+                        indent_stack.pop()
+                        add(TokenType.DEDENT, i - base, i - base)
+                    last_type = TokenType.DEDENT
+                    if indent != indent_stack[-1]:
+                        raise IndentationError(f"Unindent does not match any outer indentation level")
+                continue
+
+            token_type, end = scan_token_bytes(data, i, limit)
+            if token_type not in SkippedTokenTypes:
+                add(token_type, i - base, end - base)
+                last_type = token_type
+            i = end
+
+        pos = limit - base
+        if last_type != TokenType.NEWLINE:
+            add(TokenType.NEWLINE, pos, pos)
+        while len(indent_stack) > 1:
+            indent_stack.pop()
+            add(TokenType.DEDENT, pos, pos)
+        add(TokenType.EOF, pos, pos)
+        return buffer
+
+# Whitespace stripped from the start of the source, token positions are relative to its end
+LeadingWhitespaceRegex = re.compile(r"\s*")
+
+# Consecutive indentation units (a tab or four spaces) at the start of a line
+IndentRegex = re.compile(r"(?:\t| {4})*")
 
 TokenRegex = {
-    TokenType.WHITESPACE: re.compile(r"^[\s]+"),
+    TokenType.WHITESPACE: re.compile(r"[\s]+"),
     # Matches line comments, everything except newlines
-    TokenType.LINE_COMMENT: re.compile(r"^#[^\n]*"),
+    TokenType.LINE_COMMENT: re.compile(r"#[^\n]*"),
 
     # Keywords
-    TokenType.IF: re.compile(r"^if(?=\s|$)"),
-    TokenType.ELSE: re.compile(r"^else(?=[\s:]|$)"),
-    TokenType.ELIF: re.compile(r"^elif(?=\s|$)"),
-    TokenType.WHILE: re.compile(r"^while(?=\s|$)"),
-    TokenType.FOR: re.compile(r"^for(?=\s|$)"),
-    TokenType.BREAK: re.compile(r"^break(?=\s|$)"),
-    TokenType.CONTINUE: re.compile(r"^continue(?=\s|$)"),
-    TokenType.RETURN: re.compile(r"^return(?=\s|$)"),
-    TokenType.NOT: re.compile(r"^not(?=\s|$)"),
-    TokenType.FUNCTION_DEFINITION: re.compile(r"^def(?=[\s\(]|$)"),
-    TokenType.BOOLEAN: re.compile(r"^(true|false)(?=[\s,:]|$)"),
-    TokenType.AND: re.compile(r"^and(?=\s|$)"),
-    TokenType.OR: re.compile(r"^or(?=\s|$)"),
+    TokenType.IF: re.compile(r"if(?=\s|$)"),
+    TokenType.ELSE: re.compile(r"else(?=[\s:]|$)"),
+    TokenType.ELIF: re.compile(r"elif(?=\s|$)"),
+    TokenType.WHILE: re.compile(r"while(?=\s|$)"),
+    TokenType.FOR: re.compile(r"for(?=\s|$)"),
+    TokenType.BREAK: re.compile(r"break(?=\s|$)"),
+    TokenType.CONTINUE: re.compile(r"continue(?=\s|$)"),
+    TokenType.RETURN: re.compile(r"return(?=\s|$)"),
+    TokenType.NOT: re.compile(r"not(?=\s|$)"),
+    TokenType.FUNCTION_DEFINITION: re.compile(r"def(?=[\s\(]|$)"),
+    TokenType.BOOLEAN: re.compile(r"(?:true|false)(?=[\s,:]|$)"),
+    TokenType.AND: re.compile(r"and(?=\s|$)"),
+    TokenType.OR: re.compile(r"or(?=\s|$)"),
 
     
     # Single-character tokens
-    TokenType.LPAREN: re.compile(r"^\("),
-    TokenType.RPAREN: re.compile(r"^\)"), 
-    TokenType.LBRACE: re.compile(r"^{"),
-    TokenType.RBRACE: re.compile(r"^}"),
-    TokenType.LBRACKET: re.compile(r"^\["),
-    TokenType.RBRACKET: re.compile(r"^\]"),
-    TokenType.COMMA: re.compile(r"^,"),
-    TokenType.SEMICOLON: re.compile(r"^;"),
-    TokenType.COLON: re.compile(r"^:"),
+    TokenType.LPAREN: re.compile(r"\("),
+    TokenType.RPAREN: re.compile(r"\)"), 
+    TokenType.LBRACE: re.compile(r"{"),
+    TokenType.RBRACE: re.compile(r"}"),
+    TokenType.LBRACKET: re.compile(r"\["),
+    TokenType.RBRACKET: re.compile(r"\]"),
+    TokenType.COMMA: re.compile(r","),
+    TokenType.SEMICOLON: re.compile(r";"),
+    TokenType.COLON: re.compile(r":"),
 
     # Assignment after equals
-    TokenType.EQUAL: re.compile(r"^=="),
-    TokenType.ASSIGN: re.compile(r"^="),
+    TokenType.EQUAL: re.compile(r"=="),
+    TokenType.ASSIGN: re.compile(r"="),
 
     # Operators
-    TokenType.PLUS: re.compile(r"^\+"),
-    TokenType.MINUS: re.compile(r"^-"),
-    TokenType.MUL: re.compile(r"^\*"),
-    TokenType.DIV: re.compile(r"^/"),
+    TokenType.PLUS: re.compile(r"\+"),
+    TokenType.MINUS: re.compile(r"-"),
+    TokenType.MUL: re.compile(r"\*"),
+    TokenType.DIV: re.compile(r"/"),
 
     # Comparison operators
-    TokenType.NOT_EQUAL: re.compile(r"^!="),
-    TokenType.LESS_EQ: re.compile(r"^<="),
-    TokenType.LESS: re.compile(r"^<"),
-    TokenType.GREATER_EQ: re.compile(r"^>="),
-    TokenType.GREATER: re.compile(r"^>"),
+    TokenType.NOT_EQUAL: re.compile(r"!="),
+    TokenType.LESS_EQ: re.compile(r"<="),
+    TokenType.LESS: re.compile(r"<"),
+    TokenType.GREATER_EQ: re.compile(r">="),
+    TokenType.GREATER: re.compile(r">"),
 
     # Literals
-    TokenType.INVALID_IDENTIFIER: re.compile(r"^[0-9]+[a-zA-Z_][a-zA-Z0-9_]*"),
-    TokenType.FLOAT: re.compile(r"^[0-9]+\.[0-9]+"),
-    TokenType.NUMBER: re.compile(r"^([0-9]+)"),
-    TokenType.IDENTIFIER: re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*"),
-    TokenType.STRING: re.compile(r'^"""[\s\S]*?"""|"(?:[^"\\]|\\.)*"'),
+    TokenType.INVALID_IDENTIFIER: re.compile(r"[0-9]+[a-zA-Z_][a-zA-Z0-9_]*"),
+    TokenType.FLOAT: re.compile(r"[0-9]+\.[0-9]+"),
+    TokenType.NUMBER: re.compile(r"[0-9]+"),
+    TokenType.IDENTIFIER: re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*"),
+    TokenType.STRING: re.compile(r'"""[\s\S]*?"""|"(?:[^"\\]|\\.)*"'),
+}
+
+SkippedTokenTypes = frozenset([TokenType.WHITESPACE, TokenType.LINE_COMMENT])
+
+
+# Escape sequences in strings and the characters they denote, other escapes are kept as written
+EscapeSequences = {
+    r'\n': '\n',    # newline
+    r'\t': '\t',    # tab
+    r'\r': '\r',    # carriage return
+    r'\"': '"',     # quote
+    r'\\': '\\',    # backslash
+    r'\b': '\b',    # backspace
+    r'\f': '\f',    # form feed
 }
+
+# Escapes of a character other than a backslash
+SingleEscapeSequences = [(sequence, char) for sequence, char in EscapeSequences.items() if sequence != '\\\\']
+
+
+def process_escape_sequences(s: str) -> str:
+    """Process common escape sequences in strings, in linear time using `str.split` and `str.replace`."""
+    if '\\' not in s:
+        return s
+    # Escaped backslashes pair up from left to right, so any backslash left
+    # between them escapes the character that follows it
+    parts = s.split('\\\\')
+    for i, part in enumerate(parts):
+        if '\\' in part:
+            for sequence, char in SingleEscapeSequences:
+                part = part.replace(sequence, char)
+            parts[i] = part
+    return '\\'.join(parts)
+
+
+def decode_string(literal: str) -> str:
+    """Returns the value of a STRING literal, the text between its quotes with escape sequences processed."""
+    if literal.startswith('"""') and literal.endswith('"""'):
+        return process_escape_sequences(literal[3:-3])
+    return process_escape_sequences(literal[1:-1])
+
+
+# Converts the literal of a token to the value it denotes
+LiteralDecoders = {
+    TokenType.NUMBER: int,
+    TokenType.FLOAT: float,
+    TokenType.STRING: decode_string,
+    TokenType.BOOLEAN: lambda literal: literal == 'true',
+}
+
+
+def decode_literal(token: Token):
+    """Returns the value of a literal token, decoding it unless the lexer already did."""
+    if token.value is not None:
+        return token.value
+    return LiteralDecoders[token.type](token.literal)
+
+# Keywords and the characters that may follow them besides whitespace and the
+# end of the text, as given by the lookaheads in `TokenRegex`
+KeywordTokens = {
+    "if": (TokenType.IF, ""),
+    "else": (TokenType.ELSE, ":"),
+    "elif": (TokenType.ELIF, ""),
+    "while": (TokenType.WHILE, ""),
+    "for": (TokenType.FOR, ""),
+    "break": (TokenType.BREAK, ""),
+    "continue": (TokenType.CONTINUE, ""),
+    "return": (TokenType.RETURN, ""),
+    "not": (TokenType.NOT, ""),
+    "def": (TokenType.FUNCTION_DEFINITION, "("),
+    "true": (TokenType.BOOLEAN, ",:"),
+    "false": (TokenType.BOOLEAN, ",:"),
+    "and": (TokenType.AND, ""),
+    "or": (TokenType.OR, ""),
+}
+
+TwoCharTokens = {
+    "==": TokenType.EQUAL,
+    "!=": TokenType.NOT_EQUAL,
+    "<=": TokenType.LESS_EQ,
+    ">=": TokenType.GREATER_EQ,
+}
+
+OneCharTokens = {
+    "(": TokenType.LPAREN,
+    ")": TokenType.RPAREN,
+    "{": TokenType.LBRACE,
+    "}": TokenType.RBRACE,
+    "[": TokenType.LBRACKET,
+    "]": TokenType.RBRACKET,
+    ",": TokenType.COMMA,
+    ";": TokenType.SEMICOLON,
+    ":": TokenType.COLON,
+    "=": TokenType.ASSIGN,
+    "+": TokenType.PLUS,
+    "-": TokenType.MINUS,
+    "*": TokenType.MUL,
+    "/": TokenType.DIV,
+    "<": TokenType.LESS,
+    ">": TokenType.GREATER,
+}
+
+WordRegex = TokenRegex[TokenType.IDENTIFIER]
+# Digits followed by an identifier tail (INVALID_IDENTIFIER) or a fraction (FLOAT)
+NumberRegex = re.compile(r"[0-9]+(?:(?P<INVALID_IDENTIFIER>[a-zA-Z_][a-zA-Z0-9_]*)|(?P<FLOAT>\.[0-9]+))?")
+
+# Token classes selected by the first character
+WORD, NUMBER, OPERATOR, STRING, COMMENT, WHITESPACE = range(6)
+
+FirstCharClasses = {
+    **{char: WORD for char in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_"},
+    **{char: NUMBER for char in "0123456789"},
+    **{char: OPERATOR for char in "!" + "".join(OneCharTokens)},
+    **{char: WHITESPACE for char in " \t\n\r\f\v"},
+    '"': STRING,
+    "#": COMMENT,
+}
+
+
+def scan_token(text: str, pos: int) -> Optional[Tuple[TokenType, int]]:
+    """
+    Matches the token starting at `pos`, returning its type and end position,
+    or None for an illegal character. Same result as trying each `TokenRegex`
+    pattern in order.
+    """
+    token_class = FirstCharClasses.get(text[pos])
+    if token_class == WORD:
+        end = WordRegex.match(text, pos).end()
+        keyword = KeywordTokens.get(text[pos:end])
+        if keyword is not None:
+            token_type, followers = keyword
+            if end == len(text) or text[end].isspace() or text[end] in followers:
+                return token_type, end
+        return TokenType.IDENTIFIER, end
+
+    if token_class == OPERATOR:
+        token_type = TwoCharTokens.get(text[pos:pos + 2])
+        if token_type is not None:
+            return token_type, pos + 2
+        token_type = OneCharTokens.get(text[pos])
+        return None if token_type is None else (token_type, pos + 1)
+
+    if token_class == NUMBER:
+        match = NumberRegex.match(text, pos)
+        if match.lastgroup is None:
+            return TokenType.NUMBER, match.end()
+        return TokenType[match.lastgroup], match.end()
+
+    if token_class == STRING:
+        match = TokenRegex[TokenType.STRING].match(text, pos)
+        return None if match is None else (TokenType.STRING, match.end())
+
+    if token_class == COMMENT:
+        return TokenType.LINE_COMMENT, TokenRegex[TokenType.LINE_COMMENT].match(text, pos).end()
+
+    if token_class == WHITESPACE or text[pos].isspace():
+        return TokenType.WHITESPACE, TokenRegex[TokenType.WHITESPACE].match(text, pos).end()
+
+    return None
+
+
+# Characters matched by `\s` in str patterns, i.e. those for which `str.isspace` is true
+UnicodeWhitespace = (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680"
+    "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+    "\u2028\u2029\u202f\u205f\u3000"
+)
+
+# Patterns and tables for `scan_token_bytes`, derived from the ones above.
+# Whitespace is spelled out as UTF-8 sequences since `\s` only matches ASCII in bytes patterns.
+ByteWhitespace = b"(?:[" + re.escape("".join(c for c in UnicodeWhitespace if c.isascii()).encode()) + b"]|" + \
+    b"|".join(re.escape(c.encode()) for c in UnicodeWhitespace if not c.isascii()) + b")"
+ByteWhitespaceRegex = re.compile(ByteWhitespace + b"+")
+ByteLeadingWhitespaceRegex = re.compile(ByteWhitespace + b"*")
+ByteIndentRegex = re.compile(IndentRegex.pattern.encode())
+ByteWordRegex = re.compile(WordRegex.pattern.encode())
+ByteNumberRegex = re.compile(NumberRegex.pattern.encode())
+ByteStringRegex = re.compile(TokenRegex[TokenType.STRING].pattern.encode())
+ByteCommentRegex = re.compile(TokenRegex[TokenType.LINE_COMMENT].pattern.encode())
+
+ByteKeywordTokens = {
+    word.encode(): (token_type, followers.encode()) for word, (token_type, followers) in KeywordTokens.items()
+}
+ByteTwoCharTokens = {operator.encode(): token_type for operator, token_type in TwoCharTokens.items()}
+ByteOneCharTokens = {ord(operator): token_type for operator, token_type in OneCharTokens.items()}
+
+# Token class of each byte value. Non-ASCII bytes start either a whitespace
+# character or an illegal one.
+FirstByteClasses = [None] * 256
+for char, token_class in FirstCharClasses.items():
+    FirstByteClasses[ord(char)] = token_class
+for byte in range(0x80, 0x100):
+    FirstByteClasses[byte] = WHITESPACE
+for char in UnicodeWhitespace[:9]:
+    FirstByteClasses[ord(char)] = WHITESPACE
+
+
+def scan_token_bytes(data: Union[bytes, mmap], pos: int, limit: int) -> Tuple[TokenType, int]:
+    """
+    `scan_token` over UTF-8 encoded source ending at `limit`, with byte
+    positions. An illegal character is returned as ILLEGAL_CHARACTER spanning
+    its whole UTF-8 sequence.
+    """
+    token_class = FirstByteClasses[data[pos]]
+    if token_class == WORD:
+        end = ByteWordRegex.match(data, pos, limit).end()
+        keyword = ByteKeywordTokens.get(data[pos:end])
+        if keyword is not None:
+            token_type, followers = keyword
+            if end == limit or data[end] in followers or ByteWhitespaceRegex.match(data, end, limit):
+                return token_type, end
+        return TokenType.IDENTIFIER, end
+
+    if token_class == OPERATOR:
+        token_type = ByteTwoCharTokens.get(data[pos:pos + 2])
+        if token_type is not None:
+            return token_type, pos + 2
+        token_type = ByteOneCharTokens.get(data[pos])
+        if token_type is not None:
+            return token_type, pos + 1
+
+    elif token_class == NUMBER:
+        match = ByteNumberRegex.match(data, pos, limit)
+        if match.lastgroup is None:
+            return TokenType.NUMBER, match.end()
+        return TokenType[match.lastgroup], match.end()
+
+    elif token_class == STRING:
+        match = ByteStringRegex.match(data, pos, limit)
+        if match is not None:
+            return TokenType.STRING, match.end()
+
+    elif token_class == COMMENT:
+        return TokenType.LINE_COMMENT, ByteCommentRegex.match(data, pos, limit).end()
+
+    elif token_class == WHITESPACE:
+        match = ByteWhitespaceRegex.match(data, pos, limit)
+        if match is not None:
+            return TokenType.WHITESPACE, match.end()
+
+    lead = data[pos]
+    length = 1 if lead < 0xC0 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+    return TokenType.ILLEGAL_CHARACTER, min(pos + length, limit)
+
+
+def stripped_end(data: Union[bytes, mmap], start: int = 0) -> int:
+    """Returns the end of UTF-8 encoded `data` without its trailing whitespace."""
+    end = len(data)
+    while end > start:
+        char_start = end - 1
+        # Step back over continuation bytes to the start of the last character
+        while char_start > start and end - char_start < 4 and 0x80 <= data[char_start] < 0xC0:
+            char_start -= 1
+        if not str(data[char_start:end], 'utf-8', 'replace').isspace():
+            break
+        end = char_start
+    return end
+
+
+TokenPosition = attrgetter('pos')
+
+
+def has_shift(token: Token) -> bool:
+    return token.shift is not None
+
+
+def shift_tail(tokens: List[Token], start: int, delta: int) -> None:
+    """
+    Moves the positions of `tokens[start:]` by `delta`. The tokens after the
+    last edit share a Shift, the ones between it and `start` change sides:
+    the work is proportional to the distance between the edits, not to the
+    number of tokens.
+    """
+    count = len(tokens)
+    # The first token that has the Shift
+    tail = bisect_left(tokens, True, key=has_shift)
+    shift = Shift() if tail == count else tokens[tail].shift
+    for index in range(tail, start):
+        token = tokens[index]
+        token.offset += shift.delta
+        token.shift = None
+    for index in range(start, tail):
+        token = tokens[index]
+        token.offset -= shift.delta
+        token.shift = shift
+    shift.delta += delta
+
+
+def indent_stack_at(tokens: List[Token], end: int, source: str, lead: int) -> List[int]:
+    """
+    Rebuilds the indent stack before `tokens[end]` from the INDENT tokens
+    still open, walking back to the closest line at indentation level zero.
+    """
+    levels = []
+    closed = 0
+    index = end - 1
+    while index >= 0:
+        token = tokens[index]
+        if token.type == TokenType.NEWLINE:
+            start = token.pos + lead + 1
+            if IndentRegex.match(source, start).end() == start:
+                break
+        elif token.type == TokenType.DEDENT:
+            closed += 1
+        elif token.type == TokenType.INDENT:
+            if closed:
+                closed -= 1
+            else:
+                levels.append(token.literal)
+        index -= 1
+    return [0] + levels[::-1]
@@ -0,0 +1,99 @@
+import sys
+from typing import Dict, Optional
+from culebra import ast
+from culebra.interpreter.flat_interpreter import BinaryOperations, PrefixOperations
+from culebra.token import Token
+
+"""
+AST Optimizer
+=============
+
+A pass between `Parser.parse` and `Interpreter.evaluate` that rewrites the
+program in place:
+
+- Constant folding: operations whose operands are literals are evaluated
+  once and replaced by a literal at the position of the operation,
+  `60 * 60 * 24` becomes `Integer(86400)` and `not true` becomes
+  `Bool(False)`. Operations that raise (`1 / 0`, `"a" + 1`) are kept, so
+  the error happens at run time, where it is reported. Strings longer than
+  `MAX_FOLDED_STRING` are not folded, to keep the program small: their
+  length is estimated from the operands, `"a" * 1000000000` is never
+  evaluated.
+- Constant arrays: an array of literals is replaced by a `ConstantArray`
+  that keeps the tuple of its values and is evaluated by copying it.
+- Literal pooling: equal strings and floats share one object, and strings
+  (identifiers included) are interned, so names are compared by identity
+  when they are looked up in an environment.
+
+The pass is a bottom-up `NodeTransformer`, so deep trees are supported.
+Function bodies that a lazy parser has not parsed yet are left as they are.
+"""
+
+MAX_FOLDED_STRING = 4096
+
+# Literal node class of each value type that a folded operation may produce
+LiteralClasses = {int: ast.Integer, float: ast.Float, str: ast.String, bool: ast.Bool}
+
+
+class Optimizer(ast.NodeTransformer):
+    def __init__(self):
+        # Pooled floats, keyed by their text so that 0.0 and -0.0 stay apart
+        self.pool: Dict[str, float] = {}
+
+    def optimize(self, program: ast.Program) -> ast.Program:
+        return self.transform(program)
+
+    def visit_LiteralValue(self, node: ast.LiteralValue) -> ast.Expression:
+        node.value = self.pooled(node.value)
+        return node
+
+    def visit_BinaryOperation(self, node: ast.BinaryOperation) -> ast.Expression:
+        if is_constant(node.left) and is_constant(node.right):
+            return self.folded(node, BinaryOperations[type(node)], node.left.value, node.right.value)
+        return node
+
+    def visit_PrefixOperation(self, node: ast.PrefixOperation) -> ast.Expression:
+        if is_constant(node.value):
+            return self.folded(node, PrefixOperations[type(node)], node.value.value)
+        return node
+
+    def visit_Array(self, node: ast.Array) -> ast.Expression:
+        if type(node) is ast.Array and all(is_constant(element) for element in node.elements):
+            return ast.ConstantArray(node.token, node.elements)
+        return node
+
+    def folded(self, node: ast.Expression, operation, *operands) -> ast.Expression:
+        if string_length(operands) > MAX_FOLDED_STRING:
+            return node
+        try:
+            value = operation(*operands)
+        except Exception:
+            return node
+        literal_class = LiteralClasses.get(type(value))
+        if literal_class is None:
+            return node
+        return literal_class(Token(literal_class.token_kind, str(value), node.pos), self.pooled(value))
+
+    def pooled(self, value):
+        if type(value) is str:
+            return sys.intern(value)
+        if type(value) is float:
+            return self.pool.setdefault(repr(value), value)
+        return value
+
+
+def string_length(operands) -> int:
+    """The longest string an operation of the operands may give: their concatenation or repetition."""
+    length = sum(len(operand) for operand in operands if type(operand) is str)
+    for operand in operands:
+        if type(operand) in (int, bool) and length:
+            length *= max(operand, 1)
+    return length
+
+
+def is_constant(node: Optional[ast.ASTNode]) -> bool:
+    return isinstance(node, ast.LiteralValue) and not isinstance(node, ast.Identifier)
+
+
+def optimize(program: ast.Program) -> ast.Program:
+    return Optimizer().optimize(program)
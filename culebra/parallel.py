@@ -0,0 +1,114 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from culebra.ast import Program, Statement
+from culebra.lexer import Lexer
+from culebra.parser import Parser, shift_positions
+
+"""
+Parallel Parsing
+================
+
+A large source is split into chunks of whole top-level statements, which are
+lexed and parsed in a pool of worker processes and joined in order:
+
+    stripped source     def f(x):        <- chunk 0, positions from 0
+                            return x
+                        y = f(1)          <- chunk 1, positions from 23
+                        if y:
+                            print(y)
+                        else:
+                            print(0)
+
+A chunk starts at a line that begins at indent zero (the lexer closes every
+block there) outside of strings and comments, and is not an `elif`/`else`
+continuing the statement before it. Each worker shifts the positions of its
+statements by the offset of its chunk, so the joined program is the one
+`Parser` builds from the whole source.
+
+When any chunk fails to lex or parse, the whole source is parsed again in
+this process, so errors are reported exactly as by `Parser`. Sources below
+`MIN_PARALLEL_SIZE` are always parsed in this process: starting the workers
+costs more than parsing them.
+"""
+
+# Strings and comments are matched whole, so only the newlines outside of them start a chunk
+ChunkBoundaryRegex = re.compile(r'"""[\s\S]*?"""|"(?:[^"\\]|\\.)*"|#[^\n]*|\n(?=[^\s#])(?!el(?:if|se)\b)')
+
+MIN_PARALLEL_SIZE = 256 * 1024
+
+# Chunks per worker, smaller chunks balance the work of the pool better
+CHUNKS_PER_WORKER = 4
+
+
+def chunk_boundaries(text: str, chunks: int) -> List[int]:
+    """
+    Positions of the stripped `text` where at most `chunks` chunks of about
+    the same size start, the first one is 0.
+    """
+    boundaries = [0]
+    step = len(text) // chunks
+    if step == 0:
+        return boundaries
+    # Scanned from the start, a match can only be told from the inside of a string there
+    for match in ChunkBoundaryRegex.finditer(text):
+        if match.group(0) == '\n' and match.end() >= boundaries[-1] + step:
+            boundaries.append(match.end())
+    return boundaries
+
+
+def parse_chunk(chunk: Tuple[str, int]) -> Optional[List[Statement]]:
+    """Parses the statements of a chunk with their positions in the whole source, or None on errors."""
+    text, offset = chunk
+    try:
+        parser = Parser(Lexer().tokenize(text))
+        program = parser.parse()
+    except Exception:
+        return None
+    if parser.has_error:
+        return None
+    shift_positions(program.statements, offset)
+    return program.statements
+
+
+class ParallelParser:
+    """
+    Parses a source in a pool of `workers` processes (all the CPUs by
+    default), with the interface of `Parser`: `parse()`, `has_error`,
+    `last_error` and `last_token`.
+    """
+
+    def __init__(self, source: str, workers: Optional[int] = None, lexer: Optional[Lexer] = None):
+        self.source = source
+        self.workers = workers or os.cpu_count() or 1
+        self.lexer = lexer or Lexer()
+        self.last_error = None
+        self.last_token = None
+
+    @property
+    def has_error(self):
+        return self.last_error is not None
+
+    def parse(self) -> Program:
+        text = self.source.strip()
+        boundaries = [0]
+        if self.workers > 1 and len(text) >= MIN_PARALLEL_SIZE:
+            boundaries = chunk_boundaries(text, self.workers * CHUNKS_PER_WORKER)
+        if len(boundaries) > 1:
+            chunks = [(text[start:end], start) for start, end in zip(boundaries, boundaries[1:] + [len(text)])]
+            try:
+                with ProcessPoolExecutor(self.workers) as executor:
+                    results = list(executor.map(parse_chunk, chunks))
+            except Exception:
+                # E.g. a tree too deep to send back from a worker
+                results = [None]
+            if all(result is not None for result in results):
+                return Program([statement for statements in results for statement in statements])
+
+        parser = Parser(self.lexer.tokenize(self.source))
+        try:
+            return parser.parse()
+        finally:
+            self.last_error = parser.last_error
+            self.last_token = parser.last_token
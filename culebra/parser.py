@@ -1,5 +1,10 @@
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Callable, Iterable, Union
+
 from culebra.ast import *
-from culebra.token import Token, TokenType
+from culebra.lexer import Lexer, LeadingWhitespaceRegex, decode_literal
+from culebra.token import Token, TokenStream, TokenType
 
 """
 Culebra Language Grammar and Parser Implementation
@@ -153,9 +158,36 @@ ReturnStatement ::= "return" Expression
 
 Notes:
 - Each rule maps directly to a _parse_* method in the Parser class
-- The parser uses recursive descent with operator precedence for expressions
+- Statements use recursive descent, expressions are parsed by binding power
+  (Pratt parsing, see `BinaryOperators`): each precedence level in the hierarchy
+  above is a binding power, and pending operators and parentheses are kept on an
+  explicit stack so nesting depth is not limited by recursion
+- The operand of a prefix operator is a whole expression: `-2 + 3` is `-(2 + 3)`
 - INDENT/DEDENT tokens are generated by the lexer for block structure
 - Error handling includes synchronization and detailed error messages
+
+Token Input:
+- A `list[Token]` (e.g. from `Lexer.tokenize`) or a `TokenBuffer`
+  (from `Lexer.tokenize_compact`) is indexed directly
+- Any other iterable (e.g. `Lexer.iter_tokens`) is wrapped in a `TokenStream`:
+  tokens are pulled on demand and released after each top-level statement,
+  so only the tokens of the statement being parsed are kept in memory
+- Literal values are taken from `Token.value` as decoded by the lexer, and
+  decoded here only for tokens without one (e.g. from a `TokenBuffer`)
+
+Lazy Function Bodies:
+- With `Parser(tokens, lazy_functions=True)` a function definition only skims
+  its body to the matching DEDENT: the body is a `LazyBlock` that keeps its
+  tokens and parses them the first time its statements are used, i.e. when
+  the function is first called. Parsing time scales with the functions that
+  run, at the cost of keeping their tokens and of reporting syntax errors in
+  a body when it is first used instead of when the program is parsed
+
+Incremental Parsing:
+- `IncrementalParser` keeps the tokens and program of a source across edits:
+  `Lexer.relex` rescans the edited lines and `Parser.reparse` parses only the
+  top-level statements from the one before the edit up to the first statement
+  whose tokens were kept by the lexer, the following statements are reused
 """
 
 ComparisonOperators = {
@@ -187,22 +219,108 @@ LogicalOperators = {
     TokenType.OR: OrOperation,
 }
 
+# Binary operators with their binding power, a higher power binds tighter. All are left associative.
+BinaryOperators = {
+    token_type: (power, operation)
+    for power, operators in enumerate([LogicalOperators, ComparisonOperators, ArithmeticOperators, TermOperators], 1)
+    for token_type, operation in operators.items()
+}
+
+# Kinds of the entries pending on the stack of `Parser._parse_expression`
+BINARY, PREFIX, GROUP = range(3)
+
 class Parser:
-    def __init__(self, sequence: list[Token]):
+    def __init__(self, sequence: Union[Sequence[Token], Iterable[Token]], lazy_functions: bool = False):
+        if not isinstance(sequence, Sequence):
+            sequence = TokenStream(sequence)
         self.sequence = sequence
+        self.lazy_functions = lazy_functions
         self.index = 0
         self.last_error = None
         self.last_token = None
+        # Token index where each top-level statement of the last parse starts
+        self.statement_starts = []
 
     def parse(self) -> Program:
+        self.statement_starts = []
+        return self._parse_program([])
+
+    def reparse(self, previous: Program, previous_tokens: Sequence[Token], previous_starts: List[int],
+                edit_start: int, edit_end: int, delta: int,
+                previous_nodes: Optional[List[List[Statement]]] = None) -> Program:
+        """
+        Parses the tokens of an edited source reusing the top-level statements
+        of `previous`, the program of the source before the edit.
+
+        The tokens must come from `Lexer.relex` over `previous_tokens` (a copy
+        taken before it updated them in place), and `previous_starts` are the
+        `statement_starts` of the parse of `previous`. The edit replaced the
+        token positions `edit_start:edit_end` of the previous source, moving
+        the text after it by `delta`.
+
+        Parsing restarts one statement before the first statement touched by
+        the edit (the end of a statement looks at the next token, e.g. for an
+        `else`) and stops at the first statement past the edit that starts at
+        a token `relex` kept from the previous tokens: every token from there
+        on is unchanged, so the previous statements from there on are reused
+        with their positions shifted in place. `previous_nodes`, the
+        `positioned_nodes` of each previous statement, saves walking the
+        reused subtrees to find them.
+        """
+        touched = bisect_left(previous_starts, edit_start, key=lambda index: previous_tokens[index].pos) - 1
+        first = max(touched - 1, 0)
+        # Tokens before the edit are scanned again when the edit closes a string opened before it
+        while first > 0 and not (previous_starts[first] < len(self.sequence) and
+                                 self.sequence[previous_starts[first]] is previous_tokens[previous_starts[first]]):
+            first -= 1
+        self.index = previous_starts[first] if first else 0
+        self.statement_starts = previous_starts[:first]
+
+        # Statements that may be reused, by the token they start at
+        reusable = {id(previous_tokens[start]): number
+                    for number, start in enumerate(previous_starts[first + 1:], first + 1)}
+
+        def resume(token: Token) -> Optional[List[Statement]]:
+            number = reusable.get(id(token)) if token.pos >= edit_end + delta else None
+            if number is None:
+                return None
+            statements = previous.statements[number:]
+            if delta and previous_nodes is None:
+                shift_positions(statements, delta)
+            elif delta:
+                for nodes in previous_nodes[number:]:
+                    for node in nodes:
+                        node.pos += delta
+            shift = self.index - previous_starts[number]
+            self.statement_starts += [start + shift for start in previous_starts[number:]]
+            return statements
+
+        return self._parse_program(previous.statements[:first], resume)
+
+    def _parse_program(self, statements: List[Statement],
+                       resume: Optional[Callable[[Token], Optional[List[Statement]]]] = None) -> Program:
+        """
+        Parses top-level statements after `statements` up to the end of the
+        tokens, or until `resume` returns the remaining statements for the
+        token a statement starts at.
+        """
+        stream = self.sequence if isinstance(self.sequence, TokenStream) else None
         try:
-            statements = []
             while self._ignore_newlines() and self._has_token() and self._current_token.type != TokenType.EOF:
+                if stream is not None:
+                    # No backtracking crosses top-level statements
+                    stream.release(self.index)
+                if resume is not None:
+                    rest = resume(self._current_token)
+                    if rest is not None:
+                        return Program(statements + rest)
+                start = self.index
                 statement = self._parse_statement()
                 if statement is None:
                     self._advance_token()
                 else:
                     statements.append(statement)
+                    self.statement_starts.append(start)
 
             return Program(statements)
         except Exception as e:
@@ -221,13 +339,20 @@ class Parser:
             return None
 
         if self._current_token.type == TokenType.IDENTIFIER:
-            start_index = self.index
-            target = self._parse_assignment_target()
-            if self._current_token is not None and self._current_token.type == TokenType.ASSIGN:
+            if self._next_token.type == TokenType.ASSIGN:
+                target = Identifier(self._current_token, self._current_token.literal)
+                self._advance_token()
                 return self._parse_assignment_statement(target)
-            else:
-                # Not an assignment, so revert to the saved index.
-                self.index = start_index
+
+            # Parse the expression once, it is the target of an assignment when `=` follows
+            expr = self._parse_expression()
+            target = self._as_assignment_target(expr)
+            if target is not None:
+                return self._parse_assignment_statement(target)
+            if expr is not None:
+                return expr
+            self._expect_one_of([TokenType.IDENTIFIER, TokenType.FUNCTION_DEFINITION])
+            return None
 
         if self._current_token.type == TokenType.FUNCTION_DEFINITION:
             return self._parse_function_definition()
@@ -263,23 +388,60 @@ class Parser:
         return Assignment(assignment_token, target, value)
 
     def _parse_expression(self) -> Optional[Expression]:
-        expr = self._parse_logical_expression()
-        return expr
-    
-    def _parse_logical_expression(self) -> Optional[Expression]:
-        first_expr = self._parse_comparison_expression()
-        if first_expr is None:
-            return None
-
-        while first_expr is not None and self._current_token.type in LogicalOperators.keys():
+        """
+        Parses an expression with binary operators by binding power (Pratt
+        parsing). Operators waiting for their right operand, prefix operators
+        and open parentheses are kept on an explicit stack, so deeply nested
+        expressions do not recurse.
+        """
+        pending = []  # (kind, token, left operand, binding power to restore)
+        min_power = 0
+        while True:
             token = self._current_token
-            self._advance_token()
-            second_expr = self._parse_comparison_expression()
-            if second_expr is None:
+            if token.type in PrefixOperators:
+                tokens = []
+                while self._current_token.type in PrefixOperators:
+                    tokens.append(self._current_token)
+                    self._advance_token()
+                # The operand of a prefix operator is a whole expression
+                pending.append((PREFIX, tokens, None, min_power))
+                min_power = 0
+                continue
+
+            if token.type == TokenType.LPAREN:
+                self._advance_token()
+                pending.append((GROUP, token, None, min_power))
+                min_power = 0
+                continue
+
+            left = self._parse_elemental_expression()
+            if left is None:
                 return None
-            first_expr = LogicalOperators[token.type](token, first_expr, second_expr)
 
-        return first_expr
+            while True:
+                token = self._current_token
+                operator = BinaryOperators.get(token.type)
+                if operator is not None and operator[0] > min_power:
+                    # Parse the right operand, it takes the operators that bind tighter
+                    self._advance_token()
+                    pending.append((BINARY, token, left, min_power))
+                    min_power = operator[0]
+                    break
+
+                if not pending:
+                    return left
+
+                kind, token, first, min_power = pending.pop()
+                if kind == BINARY:
+                    left = BinaryOperators[token.type][1](token, first, left)
+                elif kind == PREFIX:
+                    for prefix in reversed(token):
+                        left = PrefixOperators[prefix.type](prefix, left)
+                elif self._current_token.type != TokenType.RPAREN:
+                    self._expect_one_of([TokenType.RPAREN])
+                    return None
+                else:
+                    self._advance_token()
 
     def _expect_one_of(self, token_types: list[TokenType]) -> bool:
         if self._current_token.type not in token_types:
@@ -294,93 +456,25 @@ class Parser:
 
     @property
     def _current_token(self) -> Optional[Token]:
-        if self.index < len(self.sequence):
+        try:
             return self.sequence[self.index]
-        return None
+        except IndexError:
+            return None
 
     @property
     def _next_token(self) -> Optional[Token]:
-        if self.index + 1 < len(self.sequence):
+        try:
             return self.sequence[self.index + 1]
-        return None
+        except IndexError:
+            return None
 
     def _advance_token(self) -> None:
         self.index += 1
 
-    def _parse_comparison_expression(self) -> Optional[Expression]:
-        first = self._parse_arithmetic_expression()
-        if first is None:
-            return None
-
-        while first is not None and self._current_token.type in ComparisonOperators.keys():
-            token = self._current_token
-            comparison_operator = ComparisonOperators[token.type]
-            self._advance_token()
-            second_expr = self._parse_arithmetic_expression()
-            if second_expr is None:
-                return None
-            first = comparison_operator(token, first, second_expr)
-
-        return first
-
-    def _parse_arithmetic_expression(self) -> Optional[Expression]:
-        term = self._parse_term()
-        if term is None:
-            return None
-
-        while term is not None and self._current_token.type in ArithmeticOperators.keys():
-            token = self._current_token
-            self._advance_token()
-            second_term = self._parse_term()
-            if second_term is None:
-                return None
-            term = ArithmeticOperators[token.type](token, term, second_term)
-
-        return term
-
-    def _parse_term(self) -> Optional[Expression]:
-        factor = self._parse_unary_expression()
-        if factor is None:
-            return None
-
-        while factor is not None and self._current_token.type in TermOperators.keys():
-            token = self._current_token
-            self._advance_token()
-            second_factor = self._parse_unary_expression()
-            if second_factor is None:
-                return None
-            factor = TermOperators[token.type](token, factor, second_factor)
-
-        return factor
-
-    def _parse_unary_expression(self) -> Optional[Expression]:
-        if self._current_token.type not in PrefixOperators.keys():
-            return self._parse_elemental_expression()
-
-        tokens = [self._current_token]
-        self._advance_token()
-
-        while self._current_token.type in PrefixOperators.keys():
-            tokens.append(self._current_token)
-            self._advance_token()
-
-        expr = self._parse_expression()
-        if expr is None:
-            return None
-
-        while tokens:
-            token = tokens.pop()
-            expr = PrefixOperators[token.type](token, expr)
-
-        return expr
-
     def _parse_elemental_expression(self) -> Optional[Expression]:
         if self._current_token.type == TokenType.LBRACKET:
             return self._parse_array_literal()
 
-        if self._current_token.type == TokenType.LPAREN:
-            return self._parse_parentheses_group_expression()
-
         if self._current_token.type == TokenType.IDENTIFIER and self._next_token.type == TokenType.LPAREN:
             return self._parse_function_call()
 
@@ -393,25 +487,18 @@ class Parser:
             return factor
 
         if self._current_token.type == TokenType.NUMBER:
-            number = Integer(self._current_token, int(self._current_token.literal))
+            number = Integer(self._current_token, decode_literal(self._current_token))
             self._advance_token()
             return number
 
         if self._current_token.type == TokenType.STRING:
             literal = self._current_token.literal
-            # Handle triple quotes
-            if literal.startswith('"""') and literal.endswith('"""'):
-                string_content = literal[3:-3]
-            # Handle single quotes
-            elif literal.startswith('"') and literal.endswith('"'):
-                string_content = literal[1:-1]
-            else:
+            if not (literal.startswith('"') and literal.endswith('"')):
                 self.errors.append(f"Invalid string format at position {self._current_token.pos}")
                 return None
 
-            # Process escape sequences
-            string_content = self._process_escape_sequences(string_content)
-            string = String(self._current_token, string_content)
+            # Quotes are stripped and escape sequences processed by the lexer
+            string = String(self._current_token, decode_literal(self._current_token))
             self._advance_token()
             # Check for bracket access
             if self._current_token and self._current_token.type == TokenType.LBRACKET:
@@ -419,47 +506,18 @@ class Parser:
             return string
 
         if self._current_token.type == TokenType.BOOLEAN:
-            val = True if self._current_token.literal == 'true' else False
-            b = Bool(self._current_token, val)
+            b = Bool(self._current_token, decode_literal(self._current_token))
             self._advance_token()
             return b
 
         if self._current_token.type == TokenType.FLOAT:
-            val = Float(self._current_token, float(self._current_token.literal))
+            val = Float(self._current_token, decode_literal(self._current_token))
             self._advance_token()
             return val
         
         self._expect_one_of([TokenType.IDENTIFIER, TokenType.NUMBER, TokenType.STRING, TokenType.BOOLEAN, TokenType.FLOAT])
         return None
 
-    def _process_escape_sequences(self, s: str) -> str:
-        """Process common escape sequences in strings."""
-        escape_sequences = {
-            r'\n': '\n',    # newline
-            r'\t': '\t',    # tab
-            r'\r': '\r',    # carriage return
-            r'\"': '"',     # quote
-            r'\\': '\\',    # backslash
-            r'\b': '\b',    # backspace
-            r'\f': '\f',    # form feed
-        }
-        result = ''
-        i = 0
-        while i < len(s):
-            if s[i] == '\\' and i + 1 < len(s):
-                escape_seq = s[i:i+2]
-                if escape_seq in escape_sequences:
-                    result += escape_sequences[escape_seq]
-                    i += 2
-                else:
-                    # Invalid escape sequence - keep it as is
-                    result += escape_seq
-                    i += 2
-            else:
-                result += s[i]
-                i += 1
-        return result
-
     def _parse_function_call(self) -> Optional[Expression]:
         token = self._current_token
         identifier = Identifier(self._current_token, self._current_token.literal)
@@ -483,21 +541,6 @@ class Parser:
         self._advance_token()
         return FunctionCall(token, identifier, arguments)
 
-    def _parse_parentheses_group_expression(self) -> Optional[Expression]:
-        assert self._current_token.type == TokenType.LPAREN
-        self._advance_token()
-
-        expr = self._parse_expression()
-        if expr is None:
-            return None
-
-        if self._current_token.type != TokenType.RPAREN:
-            self._expect_one_of([TokenType.RPAREN])
-            return None
-
-        self._advance_token()
-        return expr
-
     def _parse_function_definition(self):
         assert self._current_token.type == TokenType.FUNCTION_DEFINITION
         token = self._current_token
@@ -511,7 +554,7 @@ class Parser:
         if arguments is None:
             return None
 
-        block = self._parse_block()
+        block = self._skim_block() if self.lazy_functions else self._parse_block()
 
         return FunctionDefinition(token, identifier, arguments, block)
 
@@ -675,6 +718,47 @@ class Parser:
         block = self._parse_block_statements()
         return block
 
+    def _skim_block(self) -> Optional[Block]:
+        """
+        Like `_parse_block`, but only skips the tokens of the block up to its
+        matching DEDENT and returns a LazyBlock that parses them when used.
+        """
+        if not self._expect_one_of([TokenType.COLON]):
+            return None
+        self._advance_token()
+
+        if not self._expect_one_of([TokenType.NEWLINE]):
+            return None
+        self._advance_token()
+        self._ignore_newlines()
+
+        if not self._has_token() or self._current_token.type != TokenType.INDENT:
+            return self._parse_block_statements()
+
+        # Hot loop: the sequence is indexed directly
+        sequence, index = self.sequence, self.index
+        indent, dedent, eof = TokenType.INDENT, TokenType.DEDENT, TokenType.EOF
+        tokens = []
+        depth = 0
+        while True:
+            try:
+                token = sequence[index]
+            except IndexError:
+                break
+            token_type = token.type
+            if token_type is eof:
+                break
+            tokens.append(token)
+            index += 1
+            if token_type is indent:
+                depth += 1
+            elif token_type is dedent:
+                depth -= 1
+                if depth == 0:
+                    break
+        self.index = index
+        return LazyBlock(tokens, parse_lazy_block)
+
     def _parse_bracket_access(self, target: Expression) -> Optional[Expression]:
         """Parse array/string index access with brackets."""
         assert self._current_token.type == TokenType.LBRACKET
@@ -714,16 +798,104 @@ class Parser:
         self._advance_token()
         return Array(token, elements)
 
-    def _parse_assignment_target(self) -> Optional[Expression]:
+    def _as_assignment_target(self, expression: Optional[Expression]) -> Optional[Expression]:
+        """
+        Returns `expression`, parsed at the start of a statement, as the target
+        of an assignment if `=` follows it, or None.
+        """
         # Only identifiers are valid as assignment base targets.
-        if self._current_token.type != TokenType.IDENTIFIER:
+        if not isinstance(expression, (Identifier, BracketAccess)) or self._current_token is None:
             return None
-        target = Identifier(self._current_token, self._current_token.literal)
-        self._advance_token()
+        if self._current_token.type != TokenType.LBRACKET:
+            return expression if self._current_token.type == TokenType.ASSIGN else None
 
-        # Allow chain bracket access for assignment targets, e.g., mylist[0][1]
-        while self._has_token() and self._current_token.type == TokenType.LBRACKET:
+        # An expression has a single bracket access, assignment targets allow chains, e.g., mylist[0][1]
+        start_index = self.index
+        target = expression
+        while target is not None and self._has_token() and self._current_token.type == TokenType.LBRACKET:
             target = self._parse_bracket_access(target)
-            if target is None:
-                return None
-        return target
\ No newline at end of file
+        if target is not None and self._current_token is not None and self._current_token.type == TokenType.ASSIGN:
+            return target
+        # Not an assignment, the brackets start the next statement
+        self.index = start_index
+        return None
+
+def parse_lazy_block(block: LazyBlock) -> List[Statement]:
+    """Parses the statements of a skimmed function body, raising its first syntax error."""
+    parser = Parser(block.tokens, lazy_functions=True)
+    try:
+        body = parser._parse_block_statements()
+    except Exception as e:
+        if not parser.has_error:
+            parser.last_error = e
+            parser.last_token = parser._current_token
+    if parser.has_error:
+        block.error_token = parser.last_token
+        raise parser.last_error
+    return body.statements
+
+
+def positioned_nodes(node: ASTNode) -> List[Statement]:
+    """Returns `node` and its descendants that have a position."""
+    return [descendant for descendant in walk(node) if isinstance(descendant, Statement)]
+
+
+def shift_positions(nodes: List[ASTNode], delta: int) -> None:
+    """Moves the positions of `nodes` and all their descendants by `delta`, in place."""
+    for node in nodes:
+        for positioned in positioned_nodes(node):
+            positioned.pos += delta
+
+
+class IncrementalParser:
+    """
+    Keeps the tokens and the program of a source up to date as it is edited,
+    relexing the edited lines (`Lexer.relex`) and reparsing only the
+    top-level statements around the edit (`Parser.reparse`).
+
+    Errors of the lexer or the parser are raised from `edit`, the edit is
+    still applied to `source` and the next edit parses the whole source.
+    """
+
+    def __init__(self, source: str, lexer: Optional[Lexer] = None):
+        self.lexer = lexer or Lexer()
+        self.source = source
+        self.tokens = None
+        self.program = None
+        self.statement_starts = []
+        # Positioned nodes of each top-level statement, to shift them without walking them
+        self.statement_nodes = []
+        self.tokens = self.lexer.tokenize(source)
+        self._parse(lambda parser: parser.parse())
+
+    def edit(self, edit_start: int, edit_end: int, new_text: str) -> Program:
+        """Replaces `source[edit_start:edit_end]` by `new_text` and returns the program of the new source."""
+        source = self.source
+        self.source = source[:edit_start] + new_text + source[edit_end:]
+        previous, previous_tokens, previous_starts = self.program, self.tokens, self.statement_starts
+        previous_nodes = self.statement_nodes
+        self.program, self.tokens = None, None
+        if previous is None:
+            # The last edit failed, there is nothing to reuse
+            self.tokens = self.lexer.tokenize(self.source)
+            return self._parse(lambda parser: parser.parse())
+
+        # Relexing updates the tokens in place, keep the previous ones to match them
+        tokens = list(previous_tokens)
+        self.tokens = self.lexer.relex(tokens, source, edit_start, edit_end, new_text)
+        lead = LeadingWhitespaceRegex.match(source).end()
+        delta = len(new_text) - (edit_end - edit_start)
+        return self._parse(lambda parser: parser.reparse(
+            previous, previous_tokens, previous_starts, edit_start - lead, edit_end - lead, delta, previous_nodes),
+            previous)
+
+    def _parse(self, parse: Callable[[Parser], Program], previous: Optional[Program] = None) -> Program:
+        self.parser = Parser(self.tokens)
+        program = parse(self.parser)
+        # Reused statements keep their nodes
+        known = {} if previous is None else {
+            id(statement): nodes for statement, nodes in zip(previous.statements, self.statement_nodes)}
+        self.statement_nodes = [known.get(id(statement)) or positioned_nodes(statement)
+                                for statement in program.statements]
+        self.program, self.statement_starts = program, self.parser.statement_starts
+        return program
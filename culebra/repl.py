@@ -38,7 +38,7 @@ def process_lexer_input(text: str) -> bool:
         print("Goodbye!")
         return False
 
-    lexer = Lexer()
+    lexer = Lexer(decode_literals=False)
     tokens = lexer.tokenize(text)
 
     for token in tokens:
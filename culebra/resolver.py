@@ -0,0 +1,151 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from culebra import ast
+from culebra.interpreter.environment import Unassigned
+
+"""
+Scope Resolver
+==============
+
+A pass between `Parser.parse` and the interpreter that finds, once, where
+each variable lives, following the function scoping of
+culebra.interpreter.environment: every function call gets a frame, blocks
+share the frame of their function, and a function assigns the variables
+of the functions around it (and of the program) when they hold the name.
+
+    x = 1                   x: global
+    def counter(step):
+        count = 0           count: depth 0, slot 1
+        def inc():
+            total = count + step    total: depth 0, slot 1, count: depth 1, slot 1
+            return x                x: global
+        return inc()
+
+Each `Identifier` gets its `depth` (frames up the chain of frames, from the
+frame of the function where it appears) and `slot` (index of the variable
+in that frame, see culebra.interpreter.environment), or `slot` None for the
+variables of the program, which stay in the root Environment. Each
+`FunctionDefinition` gets its `scope`, whose `frame_template` is copied
+for the frames of its calls.
+
+Every function has a slot for each name it assigns and each parameter, but
+whether a call assigns its own variable or one of a scope around depends on
+the order the program runs: the interpreter assigns the innermost frame
+that already holds the name. A name that more than one scope of the chain
+assigns gets the `chain` of its places instead, innermost first, which the
+interpreter searches as `Environment.get` and `Environment.assign` do.
+
+Bodies of functions that a lazy parser has not parsed yet are resolved when
+the function is first called (see `Resolver.resolve_function`).
+"""
+
+
+class Scope:
+    """The variables of a function body, or of the program, whose variables are global."""
+    __slots__ = ('parent', 'names', 'slots', 'resolved', 'frame_template')
+
+    def __init__(self, parent: Optional['Scope']):
+        self.parent = parent
+        # The names the scope assigns (and the parameters of a function)
+        self.names: Set[str] = set()
+        # Slot of each variable of a function scope, from 1 (see `frame_template`)
+        self.slots: Dict[str, int] = {}
+        self.resolved = False
+        # Frames of calls are copies of it: the parent frame, then the unassigned variables
+        self.frame_template: List[object] = [None]
+
+    def places(self, name: str) -> List[Tuple[int, Optional[int]]]:
+        """
+        The places that may hold a name used in this scope, innermost first: the
+        depth of each scope that assigns it and its slot, None for the program.
+        """
+        places = []
+        scope, depth = self, 0
+        while scope is not None:
+            if name in scope.names:
+                places.append((depth, scope.slots.get(name)))
+            scope, depth = scope.parent, depth + 1
+        return places
+
+
+def assigned_names(statements: Iterable[ast.ASTNode]) -> Set[str]:
+    """Names assigned by statements, not counting the bodies of the functions they define."""
+    names = set()
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        node_type = type(node)
+        if node_type is ast.Assignment:
+            if type(node.identifier) is ast.Identifier:
+                names.add(node.identifier.value)
+        elif node_type is ast.FunctionDefinition:
+            names.add(node.name.value)
+        elif node_type is ast.Conditional:
+            pending.append(node.body)
+            if node.otherwise:
+                pending.append(node.otherwise)
+        elif node_type is ast.While:
+            pending.append(node.body)
+        elif node_type is ast.For:
+            pending += [node.pre, node.post, node.body]
+        elif isinstance(node, ast.Block):
+            pending += node.statements
+    return names
+
+
+class Resolver:
+    def resolve(self, program: ast.Program, global_names: Iterable[str] = ()) -> ast.Program:
+        """
+        Annotates a program, `global_names` are the variables it may find
+        already assigned (the builtins, the variables of earlier programs).
+        """
+        scope = Scope(None)
+        scope.names = assigned_names(program.statements) | set(global_names)
+        scope.resolved = True
+        self.annotate(program.statements, scope)
+        return program
+
+    def resolve_function(self, definition: ast.FunctionDefinition) -> None:
+        """Gives slots to the variables of a function body and annotates it, parsing a lazy body."""
+        scope = definition.scope
+        statements = definition.body.statements
+        scope.names = assigned_names(statements) | {argument.value for argument in definition.arguments}
+        for name in sorted(scope.names):
+            scope.slots[name] = len(scope.slots) + 1
+        scope.frame_template = [None] + [Unassigned] * len(scope.slots)
+        scope.resolved = True
+        self.annotate(definition.arguments, scope)
+        self.annotate(statements, scope)
+
+    def annotate(self, nodes: Iterable[ast.ASTNode], scope: Scope) -> None:
+        pending = [(node, scope) for node in nodes]
+        while pending:
+            node, scope = pending.pop()
+            node_type = type(node)
+            if node_type is ast.Identifier:
+                self.locate(node, scope)
+            elif node_type is ast.FunctionDefinition:
+                self.locate(node.name, scope)
+                node.scope = Scope(scope)
+                body = node.body
+                if not isinstance(body, ast.LazyBlock) or body.is_parsed:
+                    self.resolve_function(node)
+            else:
+                pending += [(child, scope) for child in ast.iter_child_nodes(node)]
+
+    def locate(self, identifier: ast.Identifier, scope: Scope) -> None:
+        places = scope.places(identifier.value)
+        identifier.chain = None
+        if len(places) > 1:
+            identifier.depth = identifier.slot = None
+            identifier.chain = tuple(places)
+        elif places:
+            identifier.depth, identifier.slot = places[0]
+            if identifier.slot is None:
+                identifier.depth = None
+        else:
+            # Not assigned by the program (yet), a global that may be undefined
+            identifier.depth = identifier.slot = None
+
+
+def resolve(program: ast.Program, global_names: Iterable[str] = ()) -> ast.Program:
+    return Resolver().resolve(program, global_names)
@@ -1,5 +1,8 @@
+from array import array
+from collections.abc import Sequence
 from enum import Enum, auto, unique
-from typing import NamedTuple, Optional
+from mmap import mmap
+from typing import Iterable, List, NamedTuple, Optional, Union
 
 
 @unique
@@ -71,15 +74,43 @@ class TokenType(Enum):
 
     LINE_COMMENT = auto()
 
+    # Members are singletons compared by identity, hashing them the same way keeps
+    # the dict and set lookups keyed by token type in C instead of `Enum.__hash__`
+    __hash__ = object.__hash__
+
+class Shift:
+    """
+    A move of token positions shared by the tokens after the last edit of
+    `Lexer.relex`, which moves all of them at once (see `Token.pos`).
+    """
+    __slots__ = ('delta',)
+
+    def __init__(self, delta: int = 0):
+        self.delta = delta
+
+
 class Token:
+    __slots__ = ('type', 'literal', 'offset', 'value', 'shift')
+
     type: TokenType
     literal: Optional[str]
-    pos: int
+    offset: int  # The position, before `shift`
+    # Decoded value of a literal token, None when not decoded by the lexer. For a NEWLINE, whether a string
+    # failed to match before it (see `Lexer.relex`)
+    value: object
+    shift: Optional[Shift]
 
-    def __init__(self, type: TokenType, literal: Optional[str], pos: int):
+    def __init__(self, type: TokenType, literal: Optional[str], pos: int, value: object = None):
         self.type = type
         self.literal = literal
-        self.pos = pos
+        self.offset = pos
+        self.value = value
+        self.shift = None
+
+    @property
+    def pos(self) -> int:
+        shift = self.shift
+        return self.offset if shift is None else self.offset + shift.delta
 
     def __eq__(self, other):
         if not isinstance(other, Token):
@@ -90,3 +121,134 @@ class Token:
         if self.type in [TokenType.NEWLINE, TokenType.DEDENT]:
             return f"{self.type.name}"
         return f"{self.type.name} {self.literal}"
+
+
+class TokenStream:
+    """
+    Index-addressable view over a token iterator, used by the parser to pull
+    tokens on demand. Tokens are buffered from the first one that has not been
+    released, so memory is bounded by the longest lookahead instead of the
+    whole token list.
+    """
+
+    def __init__(self, tokens: Iterable[Token]):
+        self._tokens = iter(tokens)
+        self._buffer: List[Token] = []
+        self._start = 0  # Index of the first buffered token
+
+    def __getitem__(self, index: int) -> Token:
+        relative = index - self._start
+        if relative < 0:
+            raise IndexError(f"Token {index} was already released")
+        buffer = self._buffer
+        while relative >= len(buffer):
+            token = next(self._tokens, None)
+            if token is None:
+                raise IndexError("Token stream exhausted")
+            buffer.append(token)
+        return buffer[relative]
+
+    def release(self, index: int) -> None:
+        """Drops the buffered tokens before `index`, they can no longer be accessed."""
+        count = index - self._start
+        if count > 0:
+            del self._buffer[:count]
+            self._start = index
+
+
+# Token types indexed by their enum value, as stored in `TokenBuffer.types`
+TokenTypesByValue = {token_type.value: token_type for token_type in TokenType}
+
+# Tokens whose literal is not a slice of the source
+SyntheticLiterals = {
+    TokenType.NEWLINE: '\n',
+    TokenType.DEDENT: None,
+    TokenType.EOF: "",
+}
+
+
+class TokenBuffer(Sequence):
+    """
+    Compact token list stored as parallel arrays over the source text: one
+    byte per token type and two 32-bit offsets per token. Indexing
+    materialises a `Token` on demand, slicing its literal from the source,
+    so the parser can consume a buffer like a `list[Token]`.
+
+    The source may also be UTF-8 bytes, such as a memory-mapped file (see
+    `Lexer.tokenize_bytes`). Offsets are then byte offsets and literals are
+    decoded when their token is accessed.
+
+    For INDENT tokens the `ends` slot holds the indentation level, which is
+    the literal of the token.
+    """
+
+    def __init__(self, source: Union[str, bytes, mmap], base: int = 0):
+        self.source = source
+        self.base = base  # Offset in `source` of position 0, i.e. the leading whitespace stripped by the lexer
+        self.types = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self._cached_index = -1
+        self._cached_token = None
+
+    @classmethod
+    def from_tokens(cls, source: str, tokens: Iterable[Token], base: int = 0) -> 'TokenBuffer':
+        """Packs `tokens` lexed from `source` into a buffer."""
+        buffer = cls(source, base)
+        for token in tokens:
+            buffer.append(token)
+        return buffer
+
+    def append(self, token: Token) -> None:
+        literal = token.literal
+        if token.type == TokenType.INDENT:
+            end = literal
+        elif token.type in SyntheticLiterals:
+            end = token.pos
+        else:
+            end = token.pos + len(literal)
+        self.add(token.type, token.pos, end)
+
+    def add(self, token_type: TokenType, start: int, end: int) -> None:
+        """Appends a token by its offsets, without creating a `Token`."""
+        self.types.append(token_type.value)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        if index == self._cached_index:
+            return self._cached_token
+        token = Token(self.type_at(index), self.literal_at(index), self.starts[index])
+        self._cached_index = index
+        self._cached_token = token
+        return token
+
+    def type_at(self, index: int) -> TokenType:
+        return TokenTypesByValue[self.types[index]]
+
+    def literal_at(self, index: int):
+        token_type = self.type_at(index)
+        if token_type == TokenType.INDENT:
+            return self.ends[index]
+        if token_type in SyntheticLiterals:
+            return SyntheticLiterals[token_type]
+        literal = self.source[self.base + self.starts[index]:self.base + self.ends[index]]
+        if isinstance(literal, str):
+            return literal
+        # UTF-8 source, line endings are translated as when reading in text mode
+        literal = str(literal, 'utf-8')
+        if '\r' in literal:
+            literal = literal.replace('\r\n', '\n').replace('\r', '\n')
+        return literal
+
+    def char_position(self, pos: int) -> int:
+        """
+        Converts a token position to a character offset in the stripped text.
+        Positions are byte offsets when the source is UTF-8 bytes.
+        """
+        if isinstance(self.source, str):
+            return pos
+        return len(str(self.source[self.base:self.base + pos], 'utf-8', 'replace'))
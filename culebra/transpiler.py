@@ -0,0 +1,468 @@
+import itertools
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from culebra import ast
+from culebra.interpreter.environment import Unassigned
+from culebra.interpreter.interpreter import ReturnValue, bracket_access
+from culebra.resolver import assigned_names
+
+"""
+Python Transpiler
+=================
+
+Translates a program to Python source, which CPython compiles and runs:
+
+    def fib(n):                         def v_fib(v_n=_unassigned, *_extra):
+                                            if v_n is _unassigned: del v_n
+        if n < 2:                           if (v_n < 2):
+            return n                            return v_n
+        return fib(n - 1) + fib(n - 2)      return (v_fib((v_n - 1)) + v_fib((v_n - 2)))
+    result = fib(20)                    v_result = v_fib(20)
+
+Names get a `v_` prefix, so that they are never Python keywords or the
+runtime helpers of the translation (`_bracket`, `_or`...). Operations are
+parenthesized, `for` becomes a `while` loop, and `and`/`or` evaluate both
+operands as the tree walker does (through a helper, unless the right one
+is a literal).
+
+Scoping: blocks share the scope of their function, as in Python. A name
+assigned in a function is local to it, unless a function around it or the
+program assign it too: then it is declared `nonlocal` or `global`, as the
+interpreter assigns an existing variable of an outer scope. A parameter
+named like such a variable is assigned to it on entry. Calls bind their
+arguments as the interpreter does: parameters without an argument are left
+unassigned and extra arguments are ignored.
+
+Scoping is decided at compile time, and the interpreter decides it when a
+function runs: it assigns the variable of an outer scope only if that scope
+holds it by then. The translation is the same when the nearest outer scope
+that assigns a name has assigned it on every path to the definition of the
+function. Otherwise (`def fact(n)` before `n = 3`) `transpile` raises
+Untranslatable, and the tree-walking interpreter runs the program.
+
+Position map: each line of the translation keeps its statement, and the
+columns of each expression in it. The innermost frame of the translation
+in the traceback of an error, and its instruction's columns, give the
+node where the error is reported (see `Translation.node_at`).
+"""
+
+# Prefixes of the Python names of variables and of parameters assigned to outer variables
+VARIABLE_PREFIX = 'v_'
+PARAMETER_PREFIX = 'p_'
+
+INDENT = '    '
+
+# Python spelling of the binary operations, parenthesized so that comparisons never chain
+BinaryOperators = {
+    ast.PlusOperation: '+', ast.MinusOperation: '-', ast.MultiplicationOperation: '*',
+    ast.DivisionOperation: '/', ast.EqualOperation: '==', ast.NotEqualOperation: '!=',
+    ast.LessOperation: '<', ast.GreaterOperation: '>', ast.LessOrEqualOperation: '<=',
+    ast.GreaterOrEqualOperation: '>=', ast.AndOperation: 'and', ast.OrOperation: 'or',
+}
+
+# Helpers of `and` and `or` whose right operand is evaluated even when the left one decides
+LogicalHelpers = {ast.AndOperation: '_and', ast.OrOperation: '_or'}
+
+Literals = {ast.Integer, ast.Float, ast.String, ast.Bool}
+
+# An expression: its text and the spans (start, end, node) of its nodes in the text
+Fragment = Tuple[str, List[Tuple[int, int, ast.ASTNode]]]
+
+
+def python_name(name: str) -> str:
+    return VARIABLE_PREFIX + name
+
+
+def python_constant(value) -> str:
+    """Python expression of a constant, ASCII only as Python reports columns in bytes."""
+    if type(value) is float and not math.isfinite(value):
+        # `ascii` spells them as names, the runtime has them as constants
+        return '_nan' if math.isnan(value) else '_inf' if value > 0 else '(-_inf)'
+    return ascii(value)
+
+
+class Untranslatable(Exception):
+    """A program whose Python scoping would differ from the interpreter's."""
+
+
+class Scope:
+    """The names a program or a function body assigns, and how its Python code refers to them."""
+    __slots__ = ('parent', 'assigned', 'declarations', 'definite')
+
+    def __init__(self, parent: Optional['Scope'], assigned: Set[str]):
+        self.parent = parent
+        self.assigned = assigned
+        # `global` or `nonlocal` of each assigned name that is a variable of an outer scope
+        self.declarations: Dict[str, str] = {}
+        if parent is not None:
+            for name in assigned:
+                declaration = parent.declaration_of(name)
+                if declaration is not None:
+                    self.declarations[name] = declaration
+        # Names assigned on every path to the statement being translated (declared ones are held outside)
+        self.definite: Set[str] = set(self.declarations)
+
+    def declaration_of(self, name: str) -> Optional[str]:
+        """How a function in this scope declares a name it assigns, None when the name is its own."""
+        scope = self
+        while scope.parent is not None:
+            if name in scope.assigned:
+                return scope.declarations.get(name, 'nonlocal')
+            scope = scope.parent
+        return 'global' if name in scope.assigned else None
+
+    def holder_of(self, name: str) -> Optional['Scope']:
+        """The nearest scope from this one out that assigns a name."""
+        scope = self
+        while scope is not None and name not in scope.assigned:
+            scope = scope.parent
+        return scope
+
+
+class Translation:
+    """Python source of a program, with the Culebra nodes of its lines and columns."""
+
+    def __init__(self, source: str, statements: List[Optional[ast.ASTNode]],
+                 spans: List[List[Tuple[int, int, ast.ASTNode]]]):
+        self.source = source
+        # Statement and expression spans of each line, from line 1
+        self.statements = statements
+        self.spans = spans
+
+    def node_at(self, line: int, start: Optional[int], end: Optional[int]) -> Optional[ast.ASTNode]:
+        """The innermost node whose text contains the columns of a line, else the statement of the line."""
+        if not 1 <= line <= len(self.statements):
+            return None
+        best, best_size = None, None
+        if start is not None and end is not None:
+            for span_start, span_end, node in self.spans[line - 1]:
+                if span_start <= start and end <= span_end and (best is None or span_end - span_start < best_size):
+                    best, best_size = node, span_end - span_start
+        return best if best is not None else self.statements[line - 1]
+
+
+class Transpiler:
+    """Translates a program, see `transpile`."""
+
+    def __init__(self, global_names: Iterable[str] = ()):
+        self.global_names = set(global_names)
+        self.lines: List[str] = []
+        self.statements: List[Optional[ast.ASTNode]] = []
+        self.spans: List[List[Tuple[int, int, ast.ASTNode]]] = []
+        self.scope: Optional[Scope] = None
+
+    def transpile(self, program: ast.Program) -> Translation:
+        self.scope = Scope(None, assigned_names(program.statements) | self.global_names)
+        self.scope.definite |= self.global_names
+        self.value_statement(program, 0)
+        return Translation("\n".join(self.lines) + "\n", self.statements, self.spans)
+
+    def emit(self, level: int, node: Optional[ast.ASTNode], *parts) -> None:
+        """Appends a line of strings and fragments, keeping the spans of the fragments."""
+        text = INDENT * level
+        spans = []
+        for part in parts:
+            if type(part) is str:
+                text += part
+            else:
+                part_text, part_spans = part
+                spans += [(start + len(text), end + len(text), span_node) for start, end, span_node in part_spans]
+                text += part_text
+        self.lines.append(text)
+        self.statements.append(node)
+        self.spans.append(spans)
+
+    # Statements
+
+    def statement(self, node: ast.ASTNode, level: int) -> None:
+        translator = StatementTranslators.get(type(node))
+        if translator is None:
+            # An expression, its value is discarded
+            self.emit(level, node, self.expression(node))
+        else:
+            translator(self, node, level)
+
+    def value_statement(self, node: ast.ASTNode, level: int) -> None:
+        """
+        Translates a statement of the program that assigns `_result` the value
+        the tree-walking interpreter gives it: the value of an expression, of
+        the last statement of a block and of the branch a conditional takes
+        (it stays None otherwise).
+        """
+        if type(node) not in StatementTranslators:
+            self.emit(level, node, "_result = ", self.expression(node))
+        elif type(node) is ast.Conditional:
+            self.conditional(node, level, self.value_statement)
+        elif isinstance(node, ast.Block) and node.statements:
+            for statement in node.statements[:-1]:
+                self.statement(statement, level)
+            self.value_statement(node.statements[-1], level)
+        else:
+            self.statement(node, level)
+
+    def block(self, node: ast.Block, level: int) -> None:
+        statements = node.statements
+        if not statements:
+            self.emit(level, node, "pass")
+        for statement in statements:
+            self.statement(statement, level)
+
+    def assignment(self, node: ast.Assignment, level: int) -> None:
+        target = node.identifier
+        if type(target) is ast.Identifier:
+            self.emit(level, node, python_name(target.value), " = ", self.expression(node.value))
+            self.scope.definite.add(target.value)
+        else:
+            # Evaluated in the order of the interpreter: value, container and index
+            self.emit(level, node, self.fragment(node, [
+                "_store(", self.expression(node.value), ", ", self.expression(target.target),
+                ", ", self.expression(target.index), ")"]))
+
+    def conditional(self, node: ast.Conditional, level: int,
+                    branch: Optional[Callable[[ast.ASTNode, int], None]] = None) -> None:
+        """Translates a conditional, its bodies with `branch` (`statement` by default)."""
+        branch = branch or self.statement
+        keyword = "if "
+        while node is not None:
+            if keyword != "if " and type(node.condition) in Literals and node.condition.value:
+                self.emit(level, node, "else:")
+            else:
+                self.emit(level, node, keyword, self.expression(node.condition), ":")
+            self.branch(branch, node.body, level + 1)
+            node, keyword = node.otherwise, "elif "
+
+    def while_loop(self, node: ast.While, level: int) -> None:
+        self.emit(level, node, "while ", self.expression(node.condition), ":")
+        self.branch(self.statement, node.body, level + 1)
+
+    def for_loop(self, node: ast.For, level: int) -> None:
+        self.statement(node.pre, level)
+        self.emit(level, node, "while ", self.expression(node.condition), ":")
+        # Both run on the same iterations
+        self.branch(self.statement, node.body, level + 1)
+        self.branch(self.statement, node.post, level + 1)
+
+    def branch(self, translate: Callable[[ast.ASTNode, int], None], node: ast.ASTNode, level: int) -> None:
+        """Translates a body that may not run, the names it assigns are not definitely assigned after it."""
+        definite = set(self.scope.definite)
+        translate(node, level)
+        self.scope.definite = definite
+
+    def function_definition(self, node: ast.FunctionDefinition, level: int) -> None:
+        arguments = [argument.value for argument in node.arguments]
+        self.scope.definite.add(node.name.value)
+        scope = self.scope = Scope(self.scope, assigned_names(node.body.statements) | set(arguments))
+        # Reads need no check: a scope that assigns a name of an outer scope declares it
+        for name in scope.assigned:
+            holder = scope.parent.holder_of(name)
+            if holder is not None and name not in holder.definite:
+                raise Untranslatable(f"'{name}' may be assigned after the definition of {node.name.value}")
+        # Parameters that are variables of an outer scope are assigned to them
+        parameters = [PARAMETER_PREFIX + argument if argument in scope.declarations else python_name(argument)
+                      for argument in arguments]
+        # Missing arguments leave their parameters unassigned, extra ones are ignored
+        signature = "".join(f"{parameter}=_unassigned, " for parameter in parameters) + "*_extra"
+        self.emit(level, node, f"def {python_name(node.name.value)}({signature}):")
+        for declaration in ['global', 'nonlocal']:
+            names = sorted(python_name(name) for name, kind in scope.declarations.items() if kind == declaration)
+            if names:
+                self.emit(level + 1, node, f"{declaration} {', '.join(names)}")
+        for argument, parameter in zip(arguments, parameters):
+            if argument in scope.declarations:
+                self.emit(level + 1, node, f"if {parameter} is not _unassigned: {python_name(argument)} = {parameter}")
+            else:
+                # Reading an unassigned parameter raises UnboundLocalError, reported as an undefined variable
+                self.emit(level + 1, node, f"if {parameter} is _unassigned: del {parameter}")
+        self.statement(node.body, level + 1)
+        self.scope = scope.parent
+
+    def return_statement(self, node: ast.ReturnStatement, level: int) -> None:
+        if self.scope.parent is None:
+            # A return outside of a function
+            self.emit(level, node, "raise _Return(", self.expression(node.value), ")")
+        else:
+            self.emit(level, node, "return ", self.expression(node.value))
+
+    # Expressions
+
+    def expression(self, node: ast.Expression) -> Fragment:
+        translator = ExpressionTranslators.get(type(node))
+        if translator is None:
+            raise TypeError(f"Unexpected AST node type: {type(node)}")
+        return translator(self, node)
+
+    def fragment(self, node: ast.ASTNode, parts) -> Fragment:
+        """The fragment of a node made of strings and fragments."""
+        text, spans = "", []
+        for part in parts:
+            if type(part) is str:
+                text += part
+            else:
+                part_text, part_spans = part
+                spans += [(start + len(text), end + len(text), span_node) for start, end, span_node in part_spans]
+                text += part_text
+        spans.append((0, len(text), node))
+        return text, spans
+
+    def parenthesized(self, fragment: Fragment) -> Fragment:
+        text, spans = fragment
+        return f"({text})", [(start + 1, end + 1, node) for start, end, node in spans]
+
+    def literal(self, node: ast.LiteralValue) -> Fragment:
+        return self.fragment(node, [python_constant(node.value)])
+
+    def identifier(self, node: ast.Identifier) -> Fragment:
+        return self.fragment(node, [python_name(node.value)])
+
+    def binary_operation(self, node: ast.BinaryOperation) -> Fragment:
+        left, right = self.expression(node.left), self.expression(node.right)
+        helper = LogicalHelpers.get(type(node))
+        if helper is not None and type(node.right) not in Literals:
+            return self.fragment(node, [helper, "(", left, ", ", right, ")"])
+        return self.parenthesized(self.fragment(node, [left, f" {BinaryOperators[type(node)]} ", right]))
+
+    def prefix_operation(self, node: ast.PrefixOperation) -> Fragment:
+        if type(node) is ast.NotOperation:
+            # Not `not`: CPython reports a comparison under it at the columns of the `not`
+            return self.parenthesized(self.fragment(node, ["False if ", self.expression(node.value), " else True"]))
+        return self.parenthesized(self.fragment(node, ["-", self.expression(node.value)]))
+
+    def function_call(self, node: ast.FunctionCall) -> Fragment:
+        parts = [python_name(node.function.value), "("]
+        for i, argument in enumerate(node.arguments):
+            parts += [", "] if i else []
+            parts.append(self.expression(argument))
+        return self.fragment(node, parts + [")"])
+
+    def bracket_access(self, node: ast.BracketAccess) -> Fragment:
+        return self.fragment(node, ["_bracket(", self.expression(node.target), ", ", self.expression(node.index), ")"])
+
+    def array(self, node: ast.Array) -> Fragment:
+        parts = ["["]
+        for i, element in enumerate(node.elements):
+            parts += [", "] if i else []
+            parts.append(self.expression(element))
+        return self.fragment(node, parts + ["]"])
+
+    def constant_array(self, node: ast.ConstantArray) -> Fragment:
+        return self.fragment(node, ["[", ", ".join(python_constant(value) for value in node.values), "]"])
+
+
+StatementTranslators = {
+    ast.Program: Transpiler.block,
+    ast.Block: Transpiler.block,
+    ast.LazyBlock: Transpiler.block,
+    ast.Assignment: Transpiler.assignment,
+    ast.Conditional: Transpiler.conditional,
+    ast.While: Transpiler.while_loop,
+    ast.For: Transpiler.for_loop,
+    ast.FunctionDefinition: Transpiler.function_definition,
+    ast.ReturnStatement: Transpiler.return_statement,
+}
+
+ExpressionTranslators = {
+    ast.Identifier: Transpiler.identifier,
+    ast.Integer: Transpiler.literal,
+    ast.Float: Transpiler.literal,
+    ast.String: Transpiler.literal,
+    ast.Bool: Transpiler.literal,
+    ast.BracketAccess: Transpiler.bracket_access,
+    ast.FunctionCall: Transpiler.function_call,
+    ast.Array: Transpiler.array,
+    ast.ConstantArray: Transpiler.constant_array,
+}
+ExpressionTranslators.update((cls, Transpiler.binary_operation) for cls in BinaryOperators)
+ExpressionTranslators.update((cls, Transpiler.prefix_operation) for cls in [ast.NegativeOperation, ast.NotOperation])
+
+
+def transpile(program: ast.Program, global_names: Iterable[str] = ()) -> Translation:
+    """
+    Translates a program, `global_names` are the variables it may find
+    already assigned (the builtins, the variables of earlier programs).
+    """
+    return Transpiler(global_names).transpile(program)
+
+
+class PythonRuntime:
+    """
+    Runs translated programs for an interpreter. Its variables live in the
+    namespace of the Python code, they are copied from the root environment
+    before a program runs and back to it after.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        environment = interpreter.root_environment
+        self.namespace = {
+            '__builtins__': {},
+            '_bracket': bracket_access,
+            '_store': lambda value, container, index: environment.assign_bracket(container, index, value),
+            '_and': lambda left, right: left and right,
+            '_or': lambda left, right: left or right,
+            '_Return': ReturnValue,
+            '_unassigned': Unassigned,
+            '_inf': math.inf,
+            '_nan': math.nan,
+        }
+        # Translation of each file name of the compiled programs, to map their errors back
+        self.translations: Dict[str, Translation] = {}
+        self.counter = itertools.count()
+
+    def evaluate(self, program: ast.Program):
+        values, namespace = self.interpreter.root_environment.values, self.namespace
+        try:
+            translation = transpile(program, values)
+            filename = f"<culebra-{next(self.counter)}>"
+            code = compile(translation.source, filename, 'exec')
+        except Exception:
+            # Untranslatable, too deeply nested for Python, or a lazy function body that does not parse
+            # (an error of the call to the function): the tree-walking interpreter runs the program
+            return self.interpreter.eval_node(program, self.interpreter.root_environment)
+        self.translations[filename] = translation
+
+        namespace.update((python_name(name), value) for name, value in values.items())
+        namespace['_result'] = None
+        try:
+            exec(code, namespace)
+            return namespace['_result']
+        except ReturnValue as rv:
+            # A return outside of a function, its statement is the one of the `raise _Return` line
+            rv.node = self.node_of(rv)
+            raise
+        except Exception as e:
+            raise self.reported(e)
+        finally:
+            values.update((name[len(VARIABLE_PREFIX):], value) for name, value in namespace.items()
+                          if name.startswith(VARIABLE_PREFIX))
+
+    def node_of(self, error: Exception) -> Optional[ast.ASTNode]:
+        """The node of the innermost frame of a translation where an error happened."""
+        node = None
+        traceback = error.__traceback__
+        while traceback is not None:
+            code = traceback.tb_frame.f_code
+            translation = self.translations.get(code.co_filename)
+            if translation is not None:
+                line, _, start, end = list(code.co_positions())[traceback.tb_lasti // 2]
+                node = translation.node_at(line, start, end) if line is not None else node
+            traceback = traceback.tb_next
+        return node
+
+    def reported(self, error: Exception) -> Exception:
+        """
+        Records the node of the innermost frame of a translation where an
+        error happened, returns the error as the interpreter raises it.
+        """
+        node = self.node_of(error)
+        if node is None:
+            return error
+        if isinstance(error, NameError):
+            name = node.function.value if type(node) is ast.FunctionCall else getattr(node, 'value', None)
+            error = NameError(f"Undefined variable '{name}'")
+        elif type(node) is ast.FunctionCall and str(error).endswith("object is not callable"):
+            error = Exception(f"{node.function.value} is not callable")
+        interpreter = self.interpreter
+        if not interpreter.has_error:
+            interpreter.last_error = error
+            interpreter.last_node = node
+        return error
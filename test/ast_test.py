@@ -0,0 +1,118 @@
+import io
+import json
+from unittest import TestCase
+
+from culebra.ast import (Bool, For, Identifier, Integer, NodeTransformer, NodeVisitor, Program, iter_child_nodes,
+                         json_lines, pretty_lines, walk, write_lines)
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+
+def parse(source, **options):
+    return Parser(Lexer().tokenize(source), **options).parse()
+
+
+class TestTraversal(TestCase):
+    source = "for i = 0; i < 3; i = i + 1:\n    if f(i, [1]):\n        x[i] = -i\n"
+
+    def test_for_children(self):
+        loop = parse(self.source).statements[0]
+        self.assertIsInstance(loop, For)
+        self.assertEqual([loop.pre, loop.condition, loop.post, loop.body], loop.children)
+        self.assertEqual(loop.children, list(iter_child_nodes(loop)))
+
+    def test_walk_in_source_order(self):
+        names = [node.value for node in walk(parse(self.source)) if isinstance(node, Identifier)]
+        self.assertEqual(["i", "i", "i", "i", "f", "i", "x", "i", "i"], names)
+
+    def test_function_definition_children(self):
+        definition = parse("def f(a, b):\n    return g(a)\n").statements[0]
+        # The body comes before the arguments
+        self.assertEqual([definition.name, definition.body] + definition.arguments, list(iter_child_nodes(definition)))
+        self.assertEqual(["f", "g", "a", "a", "b"],
+                         [node.value for node in walk(definition) if isinstance(node, Identifier)])
+
+    def test_walk_deep_tree(self):
+        depth = 5000
+        program = parse("x = " + "-(" * depth + "1" + ")" * depth)
+        self.assertEqual(depth + 4, sum(1 for _ in walk(program)))
+
+    def test_walk_skips_unparsed_function_bodies(self):
+        program = parse("def f(a):\n    return a\n", lazy_functions=True)
+        self.assertEqual(["Program", "FunctionDefinition", "Identifier", "LazyBlock", "Identifier"],
+                         [type(node).__name__ for node in walk(program)])
+        self.assertFalse(program.statements[0].body.is_parsed)
+
+    def test_visitor_dispatch(self):
+        class Names(NodeVisitor):
+            def __init__(self):
+                self.names, self.operations = [], 0
+
+            def visit_Identifier(self, node):
+                self.names.append(node.value)
+
+            def visit_BinaryOperation(self, node):
+                self.operations += 1
+                self.generic_visit(node)
+
+        visitor = Names()
+        visitor.visit(parse(self.source))
+        self.assertEqual(["i", "i", "i", "i", "f", "i", "x", "i", "i"], visitor.names)
+        self.assertEqual(2, visitor.operations)
+
+    def test_transformer_rewrites_in_place(self):
+        class Rewrite(NodeTransformer):
+            def visit_Integer(self, node):
+                return Integer(node.token, node.value * 10)
+
+            def visit_Assignment(self, node):
+                # Drops assignments of true
+                return None if isinstance(node.value, Bool) else node
+
+        program = parse("a = 1\nb = true\nc = [2, a + 3]\n")
+        statements = program.statements
+        self.assertIs(program, Rewrite().transform(program))
+        self.assertIs(statements, program.statements)
+        self.assertEqual(["Assignment(Identifier(a), Integer(10))",
+                          "Assignment(Identifier(c), Array([Integer(20), PlusOperation(Identifier(a), Integer(30))]))"],
+                         [repr(statement) for statement in program.statements])
+
+
+class TestPrinting(TestCase):
+    def test_pretty(self):
+        program = parse("if f(x, 1):\n    y = [2]\n")
+        self.assertEqual("\n".join([
+            "├── Program",
+            "    ├── Conditional",
+            "        ├── Block",
+            "            ├── Assignment",
+            "                └──Identifier(y)",
+            "                ├── Array",
+            "                    └──Integer(2)",
+        ]), program.pretty())
+        out = io.StringIO()
+        write_lines(pretty_lines(program), out)
+        self.assertEqual(program.pretty() + "\n", out.getvalue())
+
+    def test_pretty_deep_tree(self):
+        depth = 5000
+        lines = list(pretty_lines(parse("x = " + "-(" * depth + "1" + ")" * depth)))
+        self.assertEqual(depth + 4, len(lines))
+        self.assertEqual("    " * (depth + 2) + "└──Integer(1)", lines[-1])
+
+    def test_json_lines(self):
+        source = 'x = f("a\\"b", 1.5)'
+        entries = [json.loads(line) for line in json_lines(parse(source))]
+        self.assertEqual([
+            {"id": 0, "parent": None, "field": None, "type": "Program"},
+            {"id": 1, "parent": 0, "field": "statements", "type": "Assignment", "token": "ASSIGN", "pos": 2},
+            {"id": 2, "parent": 1, "field": "identifier", "type": "Identifier", "token": "IDENTIFIER", "pos": 0,
+             "value": "x"},
+            {"id": 3, "parent": 1, "field": "value", "type": "FunctionCall", "token": "IDENTIFIER", "pos": 4},
+            {"id": 4, "parent": 3, "field": "function", "type": "Identifier", "token": "IDENTIFIER", "pos": 4,
+             "value": "f"},
+            {"id": 5, "parent": 3, "field": "arguments", "type": "String", "token": "STRING", "pos": 6,
+             "value": 'a"b'},
+            {"id": 6, "parent": 3, "field": "arguments", "type": "Float", "token": "FLOAT", "pos": 14,
+             "value": 1.5},
+        ], entries)
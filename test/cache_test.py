@@ -0,0 +1,62 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+from culebra import cache
+from culebra.cache import ASTCache
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+
+
+class TestASTCache(TestCase):
+    source = "def f(x):\n    return x * 2\n\nprint(f(3), \"a\\tb\", [1.5, true])\n"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "script.culebra"
+        self.path.write_text(self.source)
+        self.program = Parser(Lexer().tokenize(self.source)).parse()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_stored_program(self):
+        self.assertIsNone(ASTCache(self.path).load())
+        self.assertTrue(ASTCache(self.path).store(self.program))
+        self.assertEqual(Path(self.directory.name) / "__culebracache__", ASTCache(self.path).path.parent)
+
+        loaded = ASTCache(self.path).load()
+        self.assertEqual(repr(self.program), repr(loaded))
+        self.assertEqual(self.program.pretty(), loaded.pretty())
+        self.assertEqual(self.program.statements[1].pos, loaded.statements[1].pos)
+
+    def test_changed_source_is_a_miss(self):
+        ASTCache(self.path).store(self.program)
+        self.path.write_text(self.source.replace("2", "3"))
+        self.assertIsNone(ASTCache(self.path).load())
+
+    def test_touched_source_is_a_hit(self):
+        ASTCache(self.path).store(self.program)
+        stat = self.path.stat()
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(repr(self.program), repr(ASTCache(self.path).load()))
+
+    def test_other_interpreter_version_is_a_miss(self):
+        ASTCache(self.path).store(self.program)
+        path = ASTCache(self.path).path
+        with patch.object(cache, "CacheTag", "other"):
+            entry = ASTCache(self.path)
+            entry.path = path
+            self.assertIsNone(entry.load())
+
+    def test_corrupt_entry_is_a_miss(self):
+        entry = ASTCache(self.path)
+        entry.store(self.program)
+        entry.path.write_bytes(entry.path.read_bytes()[:-10])
+        self.assertIsNone(entry.load())
+
+    def test_unwritable_cache_is_ignored(self):
+        (Path(self.directory.name) / "__culebracache__").write_text("not a directory")
+        self.assertFalse(ASTCache(self.path).store(self.program))
+        self.assertIsNone(ASTCache(self.path).load())
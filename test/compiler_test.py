@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+from culebra.compiler import Opcode, compile_program, disassemble
+from culebra.lexer import Lexer
+from culebra.optimizer import optimize
+from culebra.parser import Parser
+
+
+def parse(source):
+    return Parser(Lexer().tokenize(source)).parse()
+
+
+def opcodes(code):
+    return [Opcode(opcode).name for opcode in code.instructions[::2]]
+
+
+class TestCompiler(TestCase):
+    def test_superinstructions(self):
+        code = compile_program(parse("a = b + 1\nc = 2 * a\nd = a < b\ne = (a + 1) * b"))
+        self.assertEqual([
+            "BINARY_NAME_CONST", "STORE_NAME",
+            "BINARY_CONST_NAME", "STORE_NAME",
+            "BINARY_NAME_NAME", "STORE_NAME",
+            "BINARY_NAME_CONST", "LOAD_NAME", "BINARY_OP", "STORE_NAME",
+            "LOAD_CONST", "HALT",
+        ], opcodes(code))
+
+    def test_constant_pool(self):
+        code = compile_program(parse("a = 1\nb = 1\nc = 1.0\nd = true\ne = \"a\""))
+        self.assertEqual([1, 'a', 'b', 1.0, 'c', True, 'd', 'e', None], code.constants)
+
+    def test_jumps(self):
+        code = compile_program(parse("i = 0\nwhile i < 3:\n    i = i + 1\nif i:\n    i = 0\nelse:\n    i = 1"))
+        self.assertEqual([
+            "LOAD_CONST", "STORE_NAME",
+            "BINARY_NAME_CONST", "JUMP_IF_FALSE", "BINARY_NAME_CONST", "STORE_NAME", "JUMP",
+            "LOAD_NAME", "JUMP_IF_FALSE", "LOAD_CONST", "STORE_NAME", "JUMP", "LOAD_CONST", "STORE_NAME",
+            "LOAD_CONST", "HALT",
+        ], opcodes(code))
+        instructions = code.instructions
+        self.assertEqual(4, instructions[13])
+        self.assertEqual(14, instructions[7])
+        self.assertEqual(24, instructions[17])
+        self.assertEqual(28, instructions[23])
+
+    def test_function_bodies_are_compiled_on_first_call(self):
+        code = compile_program(parse("def f(x):\n    return x\nf(1)"))
+        definition = code.constants[code.instructions[1]]
+        self.assertIsNone(definition.compiled)
+        self.assertEqual(["LOAD_NAME", "RETURN", "LOAD_CONST", "RETURN"], opcodes(definition.code()))
+
+    def test_nodes(self):
+        source = "a = [1, x]\nb = a[0]"
+        code = compile_program(optimize(parse(source)))
+        self.assertEqual(source.index("x"), code.node_at(2).pos)
+        self.assertEqual(source.index("[0]"), code.node_at(12).pos)
+
+    def test_disassemble(self):
+        lines = list(disassemble(compile_program(parse("def f(x):\n    return x * 2\nf(1)"))))
+        self.assertEqual([
+            "Disassembly of <program>:",
+            "     0  MAKE_FUNCTION         0  <function f>                     pos 0",
+            "     2  LOAD_FUNCTION         1  'f'                              pos 27",
+            "     4  LOAD_CONST            2  1                                pos 29",
+            "     6  CALL                  1                                   pos 27",
+            "     8  HALT                  0                                   pos 27",
+            "",
+            "Disassembly of f:",
+            "     0  BINARY_NAME_CONST     0  x * 2                            pos 23",
+            "     2  RETURN                0                                   pos 14",
+            "     4  LOAD_CONST            1  None",
+            "     6  RETURN                0",
+        ], lines)
@@ -0,0 +1,42 @@
+import unittest.mock
+from unittest import TestCase
+from culebra.error_reporter import ErrorReporter, LineIndex
+from culebra.token import Token, TokenType
+
+
+class TestErrorReporter(TestCase):
+    source = "x = 1\nif x:\n    y = x + ;\n\nprint(y)"
+
+    def test_report(self):
+        token = Token(TokenType.SEMICOLON, ";", self.source.index(";"))
+        with unittest.mock.patch("builtins.print") as mock_print:
+            error = ErrorReporter(self.source).report(token, "Unexpected token ';'")
+        expected = "Error at line 3:\n    y = x + ;\n            ^\nUnexpected token ';'"
+        self.assertEqual(expected, error)
+        mock_print.assert_called_once_with(expected)
+
+    def test_report_first_and_last_line(self):
+        reporter = ErrorReporter(self.source)
+        with unittest.mock.patch("builtins.print"):
+            first = reporter.report(Token(TokenType.IDENTIFIER, "x", 0), "first")
+            last = reporter.report(Token(TokenType.IDENTIFIER, "y", len(self.source) - 2), "last")
+        self.assertEqual("Error at line 1:\nx = 1\n^\nfirst", first)
+        self.assertEqual("Error at line 5:\nprint(y)\n      ^\nlast", last)
+
+    def test_report_many(self):
+        tokens = [Token(TokenType.IDENTIFIER, "x", self.source.index("x:")),
+                  Token(TokenType.IDENTIFIER, "print", self.source.index("print"))]
+        reporter = ErrorReporter(self.source)
+        with unittest.mock.patch("builtins.print") as mock_print:
+            errors = reporter.report_many([(tokens[0], "one"), (tokens[1], "two")])
+        self.assertEqual(["Error at line 2:\nif x:\n   ^\none", "Error at line 5:\nprint(y)\n^\ntwo"], errors)
+        self.assertEqual(2, mock_print.call_count)
+
+    def test_line_column_matches_counting_newlines(self):
+        source = self.source + "\n"
+        index = LineIndex(source)
+        for pos in range(len(source) + 3):
+            line_num = source[:pos].count("\n") + 1
+            column = pos - (source.rfind("\n", 0, pos) + 1)
+            self.assertEqual((line_num, column), index.line_column(pos))
+            self.assertEqual(source.split("\n")[line_num - 1], index.line_text(line_num))
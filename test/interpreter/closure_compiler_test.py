@@ -0,0 +1,18 @@
+from unittest import TestCase
+
+from culebra.interpreter.interpreter import Interpreter
+from test.interpreter.engine_suite import EngineComparison, engine_interpreter, interpreter_suite, turing_completeness_suite
+
+TestClosureInterpreter = interpreter_suite(engine_interpreter('closure'))
+TestClosureTuringCompleteness = turing_completeness_suite(engine_interpreter('closure'))
+
+
+class TestClosureEngine(EngineComparison, TestCase):
+    engine = 'closure'
+
+    def test_arguments_are_evaluated_before_binding(self):
+        self.assertSameResult("x = 1\ndef f(x, y):\n    return y\nr = f(x + 1, x)\nr")
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            Interpreter(engine='jit')
@@ -0,0 +1,136 @@
+from typing import Type
+from unittest import TestCase
+from unittest.mock import patch
+
+from culebra.interpreter.interpreter import Interpreter
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+from test.interpreter import interpreter_test, turing_complete_test
+
+"""
+Shared tests of the engines: the tree-walking interpreter tests rerun with
+another interpreter or parser class, and comparisons of an engine with the
+tree-walking interpreter.
+"""
+
+
+def engine_interpreter(engine: str) -> Type[Interpreter]:
+    """An Interpreter class that runs programs with an engine."""
+
+    class EngineInterpreter(Interpreter):
+        def __init__(self):
+            super().__init__(engine=engine)
+
+    EngineInterpreter.__name__ = EngineInterpreter.__qualname__ = f"{engine.title()}Interpreter"
+    return EngineInterpreter
+
+
+def patched(module, interpreter: Type[Interpreter], parser: Type[Parser]):
+    """setUp of a TestCase that replaces the `Interpreter` and `Parser` of a test module."""
+
+    def setUp(self):
+        for name, replacement in [("Interpreter", interpreter), ("Parser", parser)]:
+            patcher = patch.object(module, name, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    return setUp
+
+
+def interpreter_suite(interpreter: Type[Interpreter] = Interpreter, parser: Type[Parser] = Parser) -> Type[TestCase]:
+    """The interpreter tests, evaluated by another interpreter class or parsed by another parser class."""
+    return type("InterpreterSuite", (interpreter_test.TestParser,),
+                {'setUp': patched(interpreter_test, interpreter, parser)})
+
+
+def turing_completeness_suite(interpreter: Type[Interpreter] = Interpreter,
+                              parser: Type[Parser] = Parser) -> Type[TestCase]:
+    """The Turing completeness tests, evaluated by another interpreter class or parsed by another parser class."""
+    return type("TuringCompletenessSuite", (turing_complete_test.TestTuringCompleteness,),
+                {'setUp': patched(turing_complete_test, interpreter, parser)})
+
+
+class EngineComparison:
+    """
+    Mixin of a TestCase comparing the engine named `engine` with the
+    tree-walking interpreter: results, and errors with the node they are
+    reported at.
+    """
+    engine = 'tree'
+    # Whether the compared programs are parsed with lazy function bodies
+    lazy_functions = False
+
+    error_sources = [
+        "x = 1\ny = x + z",
+        "x = 1\ny = z - x",
+        "y = 2 * z",
+        "y = -z",
+        "def f(a):\n    return a / 0\nb = f(1) + 2",
+        "a = [1, 2]\nb = a[5]",
+        "a = \"ab\"\na[0] = 1",
+        "c = 1\nc()",
+        "g(1)",
+        "s = \"a\" * 1.5",
+        "a = \"x\"\nb = 1\nc = not (a < b)",
+        # A return outside of a function is an error of the return statement
+        "x = 1\nreturn x + 1",
+        "for i = 0; i < 3; i = i + 1:\n    if i == 1:\n        return i",
+    ]
+
+    def interpreter(self, engine: str) -> Interpreter:
+        return Interpreter(engine=engine)
+
+    def evaluate(self, source: str, engine: str):
+        """The interpreter that evaluated a program and the result, or the error it raised."""
+        interpreter = self.interpreter(engine)
+        program = Parser(Lexer().tokenize(source), lazy_functions=self.lazy_functions).parse()
+        try:
+            return interpreter, interpreter.evaluate(program)
+        except Exception as e:
+            return interpreter, e
+
+    def assertSameResult(self, source: str):
+        tree, tree_result = self.evaluate(source, 'tree')
+        other, other_result = self.evaluate(source, self.engine)
+        if not isinstance(tree_result, Exception):
+            self.assertEqual(tree_result, other_result)
+            return
+        self.assertIs(type(tree_result), type(other_result))
+        self.assertEqual(str(tree_result), str(other_result))
+        # The same node of the source (the repr of an unparsed lazy body would parse it)
+        self.assertIs(type(tree.last_node), type(other.last_node))
+        self.assertEqual(tree.last_node.token, other.last_node.token)
+        self.assertEqual(tree.last_node.token.pos, other.last_node.token.pos)
+
+    def test_errors_are_reported_at_the_same_node(self):
+        for source in self.error_sources:
+            with self.subTest(source=source):
+                self.assertSameResult(source)
+
+    def test_program_value(self):
+        self.assertEqual(6, self.evaluate("a = [1, 2, 3]\na[0] + a[1] + a[2]", self.engine)[1])
+        self.assertIsNone(self.evaluate("a = 1", self.engine)[1])
+        # A conditional has the value of the branch it takes
+        sources = [
+            "if 1:\n    2",
+            "if 0:\n    2",
+            "x = 0\nif x:\n    2\nelif x + 1:\n    y = 3\n    y * 2\nelse:\n    4",
+            "x = 0\nif x:\n    2\nelse:\n    if x + 1:\n        5",
+            "x = 1\nif x:\n    2\n    x = 3",
+        ]
+        for source in sources:
+            with self.subTest(source=source):
+                self.assertSameResult(source)
+
+    def test_variables_assigned_after_a_function(self):
+        # An outer scope that assigns a name after a function is defined does not hold it during earlier calls
+        sources = [
+            "def fact(n):\n    if n <= 1:\n        return 1\n    return fact(n - 1) * n\nr = fact(5)\nn = 3\nr",
+            "def f(k):\n    i = k\n    return i\nr = f(3)\ni = 0\nr",
+            "def f(k):\n    i = k\n    return i\ni = 0\nr = f(3)\n[r, i]",
+            "def outer():\n    def inner():\n        a = 5\n    inner()\n    b = a\n    a = 1\nouter()",
+            "x = 0\nif x:\n    y = 1\ndef f():\n    y = 2\n    return y\n[f(), y]",
+            "for i = 0; i < 2; i = i + 1:\n    def f(k):\n        j = k\n        return j\n    r = f(i)\n    j = 7\n[r, j]",
+        ]
+        for source in sources:
+            with self.subTest(source=source):
+                self.assertSameResult(source)
@@ -0,0 +1,78 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from culebra.arena import FlatProgram
+from culebra.interpreter.flat_interpreter import FlatInterpreter
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+from test.interpreter.engine_suite import interpreter_suite, turing_completeness_suite
+
+
+class ImageInterpreter(FlatInterpreter):
+    """Evaluates parsed programs through a serialized image, to run the tree-walking interpreter tests."""
+
+    def evaluate(self, program):
+        return super().evaluate(FlatProgram.from_buffer(FlatProgram.from_program(program).to_bytes()))
+
+
+TestFlatInterpreter = interpreter_suite(ImageInterpreter)
+TestFlatTuringCompleteness = turing_completeness_suite(ImageInterpreter)
+
+
+class TestFlatProgram(TestCase):
+    source = """
+def f(a, b):
+    if a > b:
+        return [a, -b, 1.5]
+    elif not a:
+        return "x\\ty"
+    else:
+        return true
+for i = 0; i < 2; i = i + 1:
+    x = f(i, 1)
+    x[0] = 1
+"""
+
+    def test_round_trip(self):
+        program = Parser(Lexer().tokenize(self.source)).parse()
+        flat = FlatProgram.from_program(program)
+        self.assertEqual(repr(program), repr(flat.to_program()))
+        self.assertEqual(program.pretty(), FlatProgram.from_buffer(flat.to_bytes()).to_program().pretty())
+
+    def test_load_maps_image(self):
+        program = Parser(Lexer().tokenize(self.source)).parse()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "program.image"
+            FlatProgram.from_program(program).dump(path)
+            loaded = FlatProgram.load(path)
+            self.assertIsInstance(loaded.operands, memoryview)
+            self.assertEqual(repr(program), repr(loaded.to_program()))
+            self.assertEqual([(float, 1.5), (str, "x\ty"), (bool, True)],
+                             [(type(value), value) for value in loaded.literals if value in ["x\ty", 1.5] or value is True])
+
+    def test_deep_program(self):
+        depth = 5000
+        program = Parser(Lexer().tokenize("x = " + "-(" * depth + "1" + ")" * depth)).parse()
+        flat = FlatProgram.from_program(program)
+        self.assertEqual(depth + 4, len(flat))
+
+    def test_error_position(self):
+        source = "x = [1, 2]\ny = x[len(x) + 4]"
+        flat = FlatProgram.from_program(Parser(Lexer().tokenize(source)).parse())
+        interpreter = FlatInterpreter()
+        with self.assertRaises(IndexError):
+            interpreter.evaluate(flat)
+        self.assertEqual(source.index("[len"), interpreter.last_token.pos)
+
+    def test_return_outside_of_a_function(self):
+        source = "x = 1\nreturn x"
+        flat = FlatProgram.from_program(Parser(Lexer().tokenize(source)).parse())
+        interpreter = FlatInterpreter()
+        with self.assertRaisesRegex(Exception, "'return' outside of a function"):
+            interpreter.evaluate(flat)
+        self.assertEqual(source.index("return"), interpreter.last_token.pos)
+
+    def test_rejects_other_images(self):
+        with self.assertRaises(ValueError):
+            FlatProgram.from_buffer(b"\0" * 64)
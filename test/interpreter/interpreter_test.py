@@ -1,8 +1,10 @@
 from unittest import TestCase
 
+from culebra import ast
 from culebra.interpreter.interpreter import Interpreter
 from culebra.lexer import Lexer
 from culebra.parser import Parser
+from culebra.token import Token, TokenType
 
 
 class TestParser(TestCase):
@@ -382,4 +384,39 @@ result = fn()
 
         # Expected ack(1,2) = ack(0, ack(1,0)) then ack(1,1) = ack(0, ack(1,0)) = ack(0,2) = 3, 
         # so ack(1,2) = ack(0,3)=4
-        self.assertEqual(10, interpreter.root_environment.get('result'))
\ No newline at end of file
+        self.assertEqual(10, interpreter.root_environment.get('result'))
+
+
+class TestDispatch(TestCase):
+    def test_node_subclasses_use_base_evaluator(self):
+        class Doubled(ast.Integer):
+            pass
+
+        interpreter = Interpreter()
+        self.assertEqual(42, interpreter.eval_node(Doubled(Token(TokenType.NUMBER, "42", 0), 42),
+                                                   interpreter.root_environment))
+        self.assertIn(Doubled, interpreter.evaluators)
+
+    def test_new_node_classes(self):
+        class Answer(ast.Expression):
+            def __repr__(self):
+                return "Answer()"
+
+            @property
+            def children(self):
+                return []
+
+        class AnswerInterpreter(Interpreter):
+            node_evaluators = {**Interpreter.node_evaluators, Answer: 'evaluate_answer'}
+
+            def evaluate_answer(self, node, environment):
+                return 42
+
+        program = Parser(Lexer().tokenize("x = 1")).parse()
+        program.statements[0].value = Answer(Token(TokenType.NUMBER, "", 4))
+        interpreter = AnswerInterpreter()
+        interpreter.evaluate(program)
+        self.assertEqual(42, interpreter.root_environment.get('x'))
+
+        with self.assertRaises(TypeError):
+            Interpreter().evaluate(program)
@@ -0,0 +1,20 @@
+from unittest import skip
+
+from culebra.parser import Parser
+from test.interpreter.engine_suite import interpreter_suite, turing_completeness_suite
+
+
+class LazyParser(Parser):
+    """Parses function bodies when they are called, to run the interpreter tests."""
+
+    def __init__(self, sequence):
+        super().__init__(sequence, lazy_functions=True)
+
+
+class TestLazyInterpreter(interpreter_suite(parser=LazyParser)):
+    @skip("The body has a syntax error (`continue`), a lazy body raises it when called")
+    def test_nested_blocks_inside_function(self):
+        pass
+
+
+TestLazyTuringCompleteness = turing_completeness_suite(parser=LazyParser)
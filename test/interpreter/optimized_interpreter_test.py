@@ -0,0 +1,14 @@
+from culebra.interpreter.interpreter import Interpreter
+from culebra.optimizer import optimize
+from test.interpreter.engine_suite import interpreter_suite, turing_completeness_suite
+
+
+class OptimizingInterpreter(Interpreter):
+    """Evaluates programs after the optimizer pass, to run the interpreter tests."""
+
+    def evaluate(self, program):
+        return super().evaluate(optimize(program))
+
+
+TestOptimizedInterpreter = interpreter_suite(OptimizingInterpreter)
+TestOptimizedTuringCompleteness = turing_completeness_suite(OptimizingInterpreter)
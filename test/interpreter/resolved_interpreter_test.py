@@ -0,0 +1,32 @@
+from unittest import TestCase
+
+from culebra.interpreter.interpreter import Interpreter
+from culebra.interpreter.resolved_interpreter import ResolvedInterpreter
+from test.interpreter.engine_suite import EngineComparison, interpreter_suite, turing_completeness_suite
+
+TestResolvedInterpreter = interpreter_suite(ResolvedInterpreter)
+TestResolvedTuringCompleteness = turing_completeness_suite(ResolvedInterpreter)
+
+
+class TestResolvedScoping(EngineComparison, TestCase):
+    engine = 'resolved'
+    lazy_functions = True
+
+    def interpreter(self, engine: str) -> Interpreter:
+        return ResolvedInterpreter() if engine == 'resolved' else Interpreter(engine=engine)
+
+    def test_same_results_as_the_tree_walker(self):
+        sources = [
+            # A parameter named like a global variable assigns it
+            "n = 10\ndef f(n):\n    return n\nf(3)\nn",
+            "def fib(n):\n    if n < 2:\n        return n\n    return fib(n - 1) + fib(n - 2)\nn = 1\nfib(6)",
+            "def outer():\n    a = 1\n    def inner():\n        a = a + 1\n    inner()\n    inner()\n    return a\nouter()",
+            "def make(k):\n    def add(x):\n        return x + k\n    return add\nadd2 = make(2)\nadd3 = make(3)\nadd2(1) * add3(1)",
+            "x = 1\ndef outer():\n    def inner():\n        x = 5\n    inner()\nouter()\nx",
+            "def f():\n    local = 2\n    return local\nf()\nlocal",
+            "def f():\n    return missing\nf()",
+            "def f():\n    return 1 +\nf()",
+        ]
+        for source in sources:
+            with self.subTest(source=source):
+                self.assertSameResult(source)
@@ -0,0 +1,75 @@
+import math
+from unittest import TestCase
+
+from culebra.interpreter.interpreter import Interpreter
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+from culebra.transpiler import Untranslatable, transpile
+from test.interpreter.engine_suite import EngineComparison, engine_interpreter, interpreter_suite, turing_completeness_suite
+
+TestPythonInterpreter = interpreter_suite(engine_interpreter('python'))
+TestPythonTuringCompleteness = turing_completeness_suite(engine_interpreter('python'))
+
+
+class TestPython(EngineComparison, TestCase):
+    engine = 'python'
+
+    def test_scoping(self):
+        sources = [
+            # A parameter named like a global variable assigns it
+            "n = 10\ndef f(n):\n    return n\nf(3)\nn",
+            "def fib(n):\n    if n < 2:\n        return n\n    return fib(n - 1) + fib(n - 2)\nn = 1\nfib(6)",
+            # Nested functions assign the variables of the functions around them
+            "def outer():\n    a = 1\n    def inner():\n        a = a + 1\n    inner()\n    inner()\n    return a\nouter()",
+            "x = 1\ndef outer():\n    def inner():\n        x = 5\n    inner()\nouter()\nx",
+            "def f():\n    local = 2\n    return local\nf()",
+            # Both operands of and/or are evaluated
+            "calls = 0\ndef g():\n    calls = calls + 1\n    return true\nr = true or g()\ncalls",
+        ]
+        for source in sources:
+            with self.subTest(source=source):
+                self.assertSameResult(source)
+
+    def test_arguments_are_bound_as_in_the_interpreter(self):
+        # Missing arguments leave their parameters unassigned, extra ones are ignored
+        self.assertEqual(1, self.evaluate("def f(a, b):\n    return 1\nf(1)", 'python')[1])
+        self.assertEqual(1, self.evaluate("def f(a):\n    return a\nf(1, 2, 3)", 'python')[1])
+        self.assertEqual(2, self.evaluate("a = 2\ndef f(a):\n    return a\nf()\na", 'python')[1])
+        source = "def f(a, b):\n    return b\nf(1)"
+        tree, tree_error = self.evaluate(source, 'tree')
+        python, python_error = self.evaluate(source, 'python')
+        self.assertIs(NameError, type(python_error))
+        self.assertEqual("Undefined variable 'b'", str(python_error))
+        self.assertEqual(tree.last_node.pos, python.last_node.pos)
+
+    def test_non_finite_floats(self):
+        overflow = "1" + "0" * 400 + ".0"
+        self.assertEqual(math.inf, self.evaluate(f"x = {overflow}\nx", 'python')[1])
+        self.assertEqual([-math.inf, 2.0], self.evaluate(f"[-{overflow}, 2.0]", 'python')[1])
+
+    def test_variables_are_kept_between_programs(self):
+        interpreter = Interpreter(engine='python')
+        interpreter.evaluate(Parser(Lexer().tokenize("def add(a):\n    return a + total\ntotal = 1")).parse())
+        self.assertEqual(1, interpreter.root_environment.get('total'))
+        self.assertEqual(3, interpreter.evaluate(Parser(Lexer().tokenize("total = 2\nadd(1)")).parse()))
+
+    def test_position_map(self):
+        program = Parser(Lexer().tokenize("a = [1, 2]\nb = a[0] + c")).parse()
+        translation = transpile(program)
+        self.assertEqual("v_a = [1, 2]\nv_b = (_bracket(v_a, 0) + v_c)\n", translation.source)
+        line = translation.source.splitlines()[1]
+        self.assertIs(program.statements[1], translation.node_at(2, 0, len(line)))
+        self.assertIs(program.statements[1].value, translation.node_at(2, line.index("_bracket"), len(line) - 1))
+        self.assertIs(program.statements[1].value.left, translation.node_at(2, line.index("_bracket"), line.index(" +")))
+        self.assertIs(program.statements[1].value.right, translation.node_at(2, line.index("v_c"), line.index("v_c") + 3))
+
+    def test_variables_assigned_after_a_function_are_not_translated(self):
+        # Python would make `n` global in every call, the interpreter only once the program assigns it
+        program = Parser(Lexer().tokenize("def fact(n):\n    return n\nr = fact(5)\nn = 3")).parse()
+        self.assertRaises(Untranslatable, transpile, program)
+        self.assertIn("global v_n", transpile(program, ['n']).source)
+
+    def test_deep_nesting_runs_on_the_tree_walker(self):
+        depth = 30
+        source = "".join("    " * i + f"while {i} > x:\n" for i in range(depth)) + "    " * depth + "x = 1\nx = 0\nx"
+        self.assertEqual(0, self.evaluate("x = 0\n" + source, 'python')[1])
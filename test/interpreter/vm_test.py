@@ -0,0 +1,22 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from culebra.interpreter.interpreter import Interpreter
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+from test.interpreter.engine_suite import EngineComparison, engine_interpreter, interpreter_suite, turing_completeness_suite
+
+TestVMInterpreter = interpreter_suite(engine_interpreter('vm'))
+TestVMTuringCompleteness = turing_completeness_suite(engine_interpreter('vm'))
+
+
+class TestVM(EngineComparison, TestCase):
+    engine = 'vm'
+
+    def test_deep_recursion(self):
+        source = "def depth(n):\n    if n == 0:\n        return 0\n    return depth(n - 1) + 1\ndepth(5000)"
+        interpreter = Interpreter(engine='vm')
+        with patch('sys.getrecursionlimit', return_value=10000):
+            self.assertEqual(5000, interpreter.evaluate(Parser(Lexer().tokenize(source)).parse()))
+        with self.assertRaises(RecursionError):
+            Interpreter(engine='vm').evaluate(Parser(Lexer().tokenize(source)).parse())
@@ -1,9 +1,63 @@
+import io
+import mmap
+import random
+import tempfile
+import time
 import unittest.mock
+from pathlib import Path
 from typing import List
 from unittest import TestCase
-from culebra.lexer import Lexer
+from culebra.lexer import Lexer, TokenRegex, UnicodeWhitespace, decode_literal, process_escape_sequences, scan_token
 from culebra.token import Token, TokenType
 
+EXAMPLES_DIR = Path(__file__).parent.parent / "examples"
+
+
+def reference_tokenize(text: str) -> List[Token]:
+    """Tokenizes by trying every `TokenRegex` pattern in order, one token at a time."""
+    text = text.strip()
+    indent_stack = [0]
+    tokens = []
+    i = 0
+    while i < len(text):
+        if text[i] == '\n':
+            tokens.append(Token(TokenType.NEWLINE, '\n', i))
+            indent = 0
+            i += 1
+            while text.startswith('\t', i) or text.startswith('    ', i):
+                indent += 1
+                i += 1 if text[i] == '\t' else 4
+            if indent > indent_stack[-1]:
+                tokens.append(Token(TokenType.INDENT, indent, i))
+                indent_stack.append(indent)
+            while indent < indent_stack[-1]:
+                indent_stack.pop()
+                tokens.append(Token(TokenType.DEDENT, None, i))
+            continue
+
+        for token_type, regex in TokenRegex.items():
+            match = regex.match(text, i)
+            if match:
+                if token_type not in [TokenType.WHITESPACE, TokenType.LINE_COMMENT]:
+                    tokens.append(Token(token_type, match.group(0), i))
+                i = match.end()
+                break
+        else:
+            tokens.append(Token(TokenType.ILLEGAL_CHARACTER, text[i], i))
+            i += 1
+
+    if not tokens or tokens[-1].type != TokenType.NEWLINE:
+        tokens.append(Token(TokenType.NEWLINE, '\n', i))
+    while len(indent_stack) > 1:
+        indent_stack.pop()
+        tokens.append(Token(TokenType.DEDENT, None, i))
+    tokens.append(Token(TokenType.EOF, "", i))
+    return tokens
+
+
+def token_tuples(tokens: List[Token]) -> list:
+    return [(token.type, token.literal, token.pos) for token in tokens]
+
 class TestLexer(TestCase):
     def test_illegal_character(self):
         code = "$@?"
@@ -659,3 +713,232 @@ x4
         lexer = Lexer()
         tokens = lexer.tokenize(source)
         self.assertIn(Token(TokenType.ILLEGAL_CHARACTER, '"', unittest.mock.ANY), tokens)
+
+    def test_matches_ordered_token_regex_table(self):
+        sources = [path.read_text() for path in sorted(EXAMPLES_DIR.glob("*.culebra"))]
+        sources += [
+            "iffy if(x) def(y) true) true, else: not_a notx",
+            "7abc 1.5 1. 12 \"a\\\"b\" \"\"\"x\ny\"\"\" \"open",
+            "a == b = c != d ! e <= f < g >= h > i # comment\n$ ? é",
+        ]
+        lexer = Lexer()
+        for source in sources:
+            self.assertEqual(token_tuples(reference_tokenize(source)), token_tuples(lexer.tokenize(source)))
+
+    def test_tokenize_scales_linearly(self):
+        block = (EXAMPLES_DIR / "brainfuck.culebra").read_text() + "\n"
+        lexer = Lexer()
+
+        def best_time(source: str) -> float:
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                lexer.tokenize(source)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        small = best_time(block * 20)
+        large = best_time(block * 160)
+        # 8x the input: linear time stays close to 8x, quadratic time would be ~64x.
+        self.assertLess(large / small, 20)
+
+    def test_iter_tokens_from_file_chunks(self):
+        sources = [path.read_text() for path in sorted(EXAMPLES_DIR.glob("*.culebra"))]
+        sources += [
+            "\n\n   x1\n    x2\n        x3\n\n  \n",
+            'a = """spans\nmany\n  lines""" + "x\\"y" == 12.5\n\tb',
+            "if x:\n\tfor_y = 1 # trailing comment   \n\n",
+        ]
+        lexer = Lexer()
+        for source in sources:
+            expected = token_tuples(lexer.tokenize(source))
+            for chunk_size in [1, 2, 3, 7, 4096]:
+                tokens = lexer.iter_tokens(io.StringIO(source), chunk_size=chunk_size)
+                self.assertEqual(expected, token_tuples(list(tokens)))
+
+    def test_iter_tokens_is_lazy(self):
+        class CountingReader(io.StringIO):
+            reads = 0
+
+            def read(self, size=-1):
+                self.reads += 1
+                return super().read(size)
+
+        reader = CountingReader("x = 1\n" * 1000)
+        tokens = Lexer().iter_tokens(reader, chunk_size=16)
+        self.assertEqual(Token(TokenType.IDENTIFIER, "x", 0), next(tokens))
+        self.assertEqual(1, reader.reads)
+
+    def test_tokenize_compact(self):
+        sources = [path.read_text() for path in sorted(EXAMPLES_DIR.glob("*.culebra"))]
+        sources += ["\n\n   x1\n    x2\n        x3\n\n  \n", "", "$ if"]
+        lexer = Lexer()
+        for source in sources:
+            buffer = lexer.tokenize_compact(source)
+            self.assertEqual(token_tuples(lexer.tokenize(source)), token_tuples(list(buffer)))
+
+    def test_tokens_have_no_instance_dict(self):
+        self.assertFalse(hasattr(Token(TokenType.IDENTIFIER, "x", 0), "__dict__"))
+
+    def test_scan_token_matches_token_regex_order(self):
+        snippets = [
+            "if x", "if", "if(", "iffy", "else:", "else(", "elif ", "while\t", "for_", "break\n", "continue",
+            "return1", "not(", "def(", "def x", "true,", "true)", "false:", "and ", "or\n", "orange",
+            "==", "=", "!=", "!", "<=", "<", ">=", ">", "(", ")", "{", "}", "[", "]", ",", ";", ":", "+", "-", "*", "/",
+            "12", "12.5", "12.", "12abc", "1_", '"a\\"b"', '"""a\n"b"""', '""', '"open', "# note\nx",
+            "  \t x", "\u00a0x", "\x1cx", "$", "?", "é", "\\",
+        ]
+        for snippet in snippets:
+            expected = None
+            for token_type, regex in TokenRegex.items():
+                match = regex.match(snippet)
+                if match:
+                    expected = (token_type, match.end())
+                    break
+            self.assertEqual(expected, scan_token(snippet, 0), snippet)
+
+    def test_tokenize_bytes(self):
+        sources = [path.read_text() for path in sorted(EXAMPLES_DIR.glob("*.culebra"))]
+        sources += [
+            "\n\n   x1\n    x2\n        x3\n\n  \n", "", "$ if",
+            'é = "héllo wörld" + """ünïcode\n😀"""\u00a0\u3000 # ç\nprint(é)\u2003\n',
+        ]
+        lexer = Lexer()
+        for source in sources:
+            buffer = lexer.tokenize_bytes(source.encode())
+            tokens = [Token(token.type, token.literal, buffer.char_position(token.pos)) for token in buffer]
+            self.assertEqual(token_tuples(lexer.tokenize(source)), token_tuples(tokens))
+
+    def test_tokenize_bytes_positions_are_byte_offsets(self):
+        buffer = Lexer().tokenize_bytes('"é" + x'.encode())
+        self.assertEqual([0, 5, 7], [token.pos for token in list(buffer)[:3]])
+        self.assertEqual("é", buffer[0].literal[1:-1])
+
+    def test_tokenize_bytes_line_endings(self):
+        source = 'if x:\n    y = """a\nb"""\nelse:\n\tz = 2\n'
+        expected = [(token.type, token.literal) for token in Lexer().tokenize(source)]
+        for newline in ["\r\n", "\r"]:
+            buffer = Lexer().tokenize_bytes(source.replace("\n", newline).encode())
+            self.assertEqual(expected, [(token.type, token.literal) for token in buffer])
+
+    def test_tokenize_bytes_from_mmap(self):
+        source = (EXAMPLES_DIR / "brainfuck.culebra").read_text()
+        with tempfile.TemporaryFile() as f:
+            f.write(source.encode())
+            f.flush()
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = Lexer().tokenize_bytes(data)
+        self.assertEqual(token_tuples(Lexer().tokenize(source)), token_tuples(list(buffer)))
+
+    def test_unicode_whitespace_matches_isspace(self):
+        expected = "".join(chr(code) for code in range(0x110000) if chr(code).isspace())
+        self.assertEqual(expected, UnicodeWhitespace)
+
+    def test_relex_matches_tokenize(self):
+        pieces = [
+            "if", "else", "while", "def", "true", "x", "foo_1", "12", "3.5", "7abc", '"s"', '"a\\"b"', '"""m\nl"""',
+            '"""', '"', "\\", "(", ")", "[", "]", ",", ":", "=", "==", "+", "-", "!=", "<=", " ", "  ", "\t",
+            "\n", "\n    ", "\n\t", "\n        ", "# c", "$", "é", "\u00a0",
+        ]
+        rng = random.Random(2024)
+        sources = [path.read_text() for path in sorted(EXAMPLES_DIR.glob("*.culebra"))]
+        sources += ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 40))) for _ in range(200)]
+        lexer = Lexer()
+        for source in sources:
+            for _ in range(5):
+                try:
+                    tokens = lexer.tokenize(source)
+                except IndentationError:
+                    break
+                edit_start = rng.randint(0, len(source))
+                edit_end = rng.randint(edit_start, min(len(source), edit_start + 20))
+                new_text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 4)))
+                edited = source[:edit_start] + new_text + source[edit_end:]
+                try:
+                    expected = token_tuples(lexer.tokenize(edited))
+                except IndentationError:
+                    with self.assertRaises(IndentationError):
+                        lexer.relex(tokens, source, edit_start, edit_end, new_text)
+                    continue
+                relexed = lexer.relex(tokens, source, edit_start, edit_end, new_text)
+                self.assertEqual(expected, token_tuples(relexed), (source, edit_start, edit_end, new_text))
+                source = edited
+
+    def test_relex_cost_is_proportional_to_the_edit(self):
+        block = "\n".join(path.read_text().strip() for path in sorted(EXAMPLES_DIR.glob("*.culebra"))) + "\n"
+        source = block * 40
+        lexer = Lexer()
+        tokens = lexer.tokenize(source)
+        edit_start = source.index("while", len(source) // 2)
+
+        start = time.perf_counter()
+        lexer.tokenize(source)
+        full = time.perf_counter() - start
+        start = time.perf_counter()
+        lexer.relex(tokens, source, edit_start, edit_start + len("while"), "while")
+        relexed = time.perf_counter() - start
+        self.assertLess(relexed * 5, full)
+
+    def test_relex_cost_does_not_grow_with_the_file(self):
+        block = "\n".join(path.read_text().strip() for path in sorted(EXAMPLES_DIR.glob("*.culebra"))) + "\n"
+
+        def relex_time(source):
+            lexer = Lexer()
+            tokens = lexer.tokenize(source)
+            edit_start = source.index("while", len(source) // 2)
+            longer = source[:edit_start] + "whiles" + source[edit_start + len("while"):]
+            # The first edit that moves the tokens after it gives them a shared Shift
+            lexer.relex(tokens, source, edit_start, edit_start + len("while"), "whiles")
+            best = float('inf')
+            for _ in range(20):
+                start = time.perf_counter()
+                lexer.relex(tokens, longer, edit_start, edit_start + len("whiles"), "while")
+                lexer.relex(tokens, source, edit_start, edit_start + len("while"), "whiles")
+                best = min(best, time.perf_counter() - start)
+            self.assertEqual(token_tuples(lexer.tokenize(longer)), token_tuples(tokens))
+            return best
+
+        self.assertLess(relex_time(block * 64), relex_time(block * 4) * 3)
+
+    def test_literal_values(self):
+        tokens = Lexer().tokenize('x = [12, 3.5, true, false, "a\\tb", """c\\"d"""]')
+        values = [(token.type, token.value) for token in tokens if token.value is not None]
+        self.assertEqual([
+            (TokenType.NUMBER, 12),
+            (TokenType.FLOAT, 3.5),
+            (TokenType.BOOLEAN, True),
+            (TokenType.BOOLEAN, False),
+            (TokenType.STRING, "a\tb"),
+            (TokenType.STRING, 'c"d'),
+        ], values)
+
+    def test_literal_values_not_decoded(self):
+        source = 'x = [12, 3.5, true, "a\\tb"]'
+        tokens = Lexer(decode_literals=False).tokenize(source)
+        self.assertTrue(all(token.value is None for token in tokens))
+        decoded = Lexer().tokenize(source)
+        self.assertEqual(token_tuples(decoded), token_tuples(tokens))
+        literals = [token for token in decoded if token.value is not None]
+        self.assertEqual([token.value for token in literals],
+                         [decode_literal(Token(token.type, token.literal, token.pos)) for token in literals])
+
+    def test_process_escape_sequences(self):
+        escapes = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\", "b": "\b", "f": "\f"}
+
+        def reference(s):
+            result = []
+            i = 0
+            while i < len(s):
+                if s[i] == "\\" and i + 1 < len(s):
+                    result.append(escapes.get(s[i + 1], s[i:i + 2]))
+                    i += 2
+                else:
+                    result.append(s[i])
+                    i += 1
+            return "".join(result)
+
+        rng = random.Random(9)
+        samples = ["", "plain", "\\", "a\\", "\\\\n", "\\q\\n\\\n"]
+        samples += ["".join(rng.choice('\\ntrbf"qx\n ') for _ in range(rng.randint(0, 30))) for _ in range(500)]
+        for sample in samples:
+            self.assertEqual(reference(sample), process_escape_sequences(sample), sample)
@@ -0,0 +1,78 @@
+import operator
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from culebra.arena import FlatProgram
+from culebra.ast import ConstantArray, MultiplicationOperation
+from culebra.interpreter.flat_interpreter import FlatInterpreter
+from culebra.interpreter.interpreter import Interpreter
+from culebra.lexer import Lexer
+from culebra.optimizer import MAX_FOLDED_STRING, optimize
+from culebra.parser import Parser
+
+
+def parse(source):
+    return Parser(Lexer().tokenize(source)).parse()
+
+
+class TestOptimizer(TestCase):
+    def test_folds_constant_expressions(self):
+        source = 'a = 60 * 60 * 24\nb = "a" + "b"\nc = not true\nd = -(1.5 * 2)\ne = x + 1 * 2\nf = 1 < 2 and 3 > 4\n'
+        program = optimize(parse(source))
+        self.assertEqual([
+            "Assignment(Identifier(a), Integer(86400))",
+            "Assignment(Identifier(b), String(ab))",
+            "Assignment(Identifier(c), Bool(False))",
+            "Assignment(Identifier(d), Float(-3.0))",
+            "Assignment(Identifier(e), PlusOperation(Identifier(x), Integer(2)))",
+            "Assignment(Identifier(f), Bool(False))",
+        ], [repr(statement) for statement in program.statements])
+        self.assertEqual(source.index("* 24"), program.statements[0].value.pos)
+
+    def test_keeps_operations_that_raise(self):
+        source = "x = 1\ny = 1 / 0"
+        program = optimize(parse(source))
+        self.assertEqual("Assignment(Identifier(y), DivisionOperation(Integer(1), Integer(0)))",
+                         repr(program.statements[1]))
+        interpreter = Interpreter()
+        with self.assertRaises(ZeroDivisionError):
+            interpreter.evaluate(program)
+        self.assertEqual(source.index("/"), interpreter.last_node.pos)
+
+    def test_long_strings_are_not_evaluated(self):
+        multiply = Mock(wraps=operator.mul)
+        with patch.dict('culebra.optimizer.BinaryOperations', {MultiplicationOperation: multiply}):
+            program = optimize(parse(f'a = "ab" * {MAX_FOLDED_STRING}\nb = 1000000000000 * "ab"\nc = ("a" + "b") * 3'))
+        self.assertEqual([
+            f"Assignment(Identifier(a), MultiplicationOperation(String(ab), Integer({MAX_FOLDED_STRING})))",
+            "Assignment(Identifier(b), MultiplicationOperation(Integer(1000000000000), String(ab)))",
+            "Assignment(Identifier(c), String(ababab))",
+        ], [repr(statement) for statement in program.statements])
+        multiply.assert_called_once_with("ab", 3)
+
+    def test_constant_arrays_are_copied(self):
+        program = optimize(parse("def f():\n    return [0, 0, 1 + 1]\na = f()\nb = f()\na[0] = 5\nc = [[0], [x]]"))
+        self.assertIsInstance(program.statements[0].body.statements[0].value, ConstantArray)
+        self.assertEqual("Array([ConstantArray([Integer(0)]), Array([Identifier(x)])])",
+                         repr(program.statements[-1].value))
+
+        interpreter = Interpreter()
+        interpreter.evaluate(program.__class__(program.statements[:-1]))
+        self.assertEqual([5, 0, 2], interpreter.root_environment.get('a'))
+        self.assertEqual([0, 0, 2], interpreter.root_environment.get('b'))
+
+        flat = FlatProgram.from_program(program)
+        self.assertEqual(repr(program).replace("ConstantArray", "Array"), repr(flat.to_program()))
+
+    def test_pools_literals(self):
+        program = optimize(parse('a = "some text"\nb = "some text"\nc = 2.5\nd = 2.5\ne = -0.0\nf = 0.0'))
+        a, b, c, d, e, f = [statement.value.value for statement in program.statements]
+        self.assertIs(a, b)
+        self.assertIs(c, d)
+        self.assertEqual("-0.0", repr(e))
+        self.assertEqual("0.0", repr(f))
+
+    def test_deep_program(self):
+        depth = 5000
+        program = optimize(parse("x = " + "-(" * depth + "1" + ")" * depth))
+        self.assertEqual("Assignment(Identifier(x), Integer(1))", repr(program.statements[0]))
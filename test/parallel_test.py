@@ -0,0 +1,42 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from culebra import parallel
+from culebra.lexer import Lexer
+from culebra.parallel import ParallelParser, chunk_boundaries
+from culebra.parser import Parser, positioned_nodes
+
+
+def positions(program):
+    return [(type(node).__name__, node.pos) for statement in program.statements
+            for node in positioned_nodes(statement)]
+
+
+class TestParallelParser(TestCase):
+    source = '\n  x = 1\nif x:\n    y = "a\nb"\nelif x > 1:\n    y = 2\nelse:\n    y = 3\n# c\ndef f(a):\n    return a\n' * 10
+
+    def setUp(self):
+        patcher = patch.object(parallel, "MIN_PARALLEL_SIZE", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chunk_boundaries(self):
+        text = 'x = """\ny = 1"""\n# z\nif x:\n    y\nelse:\n    z\nw = 1'
+        self.assertEqual([0, text.index("if"), text.index("w =")], chunk_boundaries(text, len(text)))
+
+    def test_matches_parser(self):
+        expected = Parser(Lexer().tokenize(self.source)).parse()
+        parser = ParallelParser(self.source, workers=2)
+        program = parser.parse()
+        self.assertFalse(parser.has_error)
+        self.assertEqual(repr(expected), repr(program))
+        self.assertEqual(positions(expected), positions(program))
+
+    def test_errors_are_reported_as_by_parser(self):
+        source = self.source + "x = (\n1)\n" + self.source
+        expected = Parser(Lexer().tokenize(source))
+        expected.parse()
+        parser = ParallelParser(source, workers=2)
+        parser.parse()
+        self.assertEqual(str(expected.last_error), str(parser.last_error))
+        self.assertEqual(expected.last_token, parser.last_token)
@@ -1,9 +1,12 @@
+import io
+import random
 import unittest.mock
+from pathlib import Path
 from typing import cast
 from unittest import TestCase, skip
-from culebra.parser import Parser
+from culebra.parser import IncrementalParser, Parser, positioned_nodes
 from culebra.lexer import Lexer
-from culebra.ast import Program, Assignment, Identifier, LiteralValue
+from culebra.ast import Program, Assignment, Identifier, LazyBlock, LiteralValue
 from culebra.token import TokenType, Token
 
 
@@ -449,3 +452,158 @@ tape = [0,0,0,0]
             program = parser.parse()
             self.assertEqual(False, parser.has_error)
             self.assertEqual(expected, repr(program.statements[0]))
+
+    def test_parse_token_stream(self):
+        source = """
+def fn(a):
+    if a > 2:
+        return a * fn(a - 1)
+    return a
+values = [fn(4), -2 + -2]
+values[0] = 1
+print(values)
+"""
+        expected = repr(Parser(Lexer().tokenize(source)).parse())
+        parser = Parser(Lexer().iter_tokens(io.StringIO(source), chunk_size=8))
+        program = parser.parse()
+        self.assertEqual(False, parser.has_error)
+        self.assertEqual(expected, repr(program))
+
+    def test_parse_token_stream_error(self):
+        parser = Parser(Lexer().iter_tokens(io.StringIO("x = 1\ny = 2 * (1+2")))
+        parser.parse()
+        self.assertEqual('Expected RPAREN, got NEWLINE instead in position 18', str(parser.last_error))
+
+    def test_parse_token_buffer(self):
+        source = (Path(__file__).parent.parent / "examples" / "brainfuck.culebra").read_text()
+        expected = repr(Parser(Lexer().tokenize(source)).parse())
+        parser = Parser(Lexer().tokenize_compact(source))
+        program = parser.parse()
+        self.assertEqual(False, parser.has_error)
+        self.assertEqual(expected, repr(program))
+
+    def test_parse_deeply_nested_parentheses(self):
+        depth = 5000
+        parser = Parser(Lexer().tokenize("x = " + "(" * depth + "1 + 2" + ")" * depth))
+        program = parser.parse()
+        self.assertEqual(False, parser.has_error)
+        self.assertEqual("Assignment(Identifier(x), PlusOperation(Integer(1), Integer(2)))", repr(program.statements[0]))
+
+    def test_parse_deeply_nested_prefix_operators(self):
+        depth = 5000
+        parser = Parser(Lexer().tokenize("-(" * depth + "x" + ")" * depth))
+        program = parser.parse()
+        self.assertEqual(False, parser.has_error)
+        node = program.statements[0]
+        for _ in range(depth):
+            self.assertEqual(TokenType.MINUS, node.token.type)
+            node = node.value
+        self.assertEqual("Identifier(x)", repr(node))
+
+    def test_parse_long_operator_chain(self):
+        parser = Parser(Lexer().tokenize(" + ".join(["1"] * 20000)))
+        program = parser.parse()
+        self.assertEqual(False, parser.has_error)
+        node = program.statements[0]
+        for _ in range(19999):
+            node = node.left
+        self.assertEqual("Integer(1)", repr(node))
+
+    def test_parse_unclosed_parentheses(self):
+        parser = Parser(Lexer().tokenize("x = ((1 + 2)"))
+        parser.parse()
+        self.assertEqual(True, parser.has_error)
+        self.assertEqual("Expected RPAREN, got NEWLINE instead in position 12", str(parser.last_error))
+
+    def test_nodes_keep_token_type_and_position(self):
+        source = "if a >= 1:\n    f(a, [2])\nelse:\n    b[0] = not true"
+        tokens = Lexer().tokenize(source)
+        program = Parser(tokens).parse()
+
+        def walk(node):
+            yield node
+            for child in node.children:
+                if child is not None:
+                    yield from walk(child)
+
+        nodes = list(walk(program.statements[0]))
+        self.assertTrue(all(not hasattr(node, "__dict__") for node in nodes))
+        positions = {token.pos: token for token in tokens}
+        for node in nodes:
+            if hasattr(node, "pos"):
+                self.assertEqual(positions[node.pos].type, node.token.type)
+                self.assertEqual(node.pos, node.token.pos)
+
+    def test_incremental_reparse_matches_parse(self):
+        def outcome(parse):
+            try:
+                program = parse()
+            except Exception as e:
+                return type(e), str(e)
+            nodes = positioned_nodes(program)
+            return len(program.statements), [(type(node), node.pos, node.token_literal()) for node in nodes]
+
+        pieces = ["x = 1\n", "def g(a):\n    return a\n", "if x:\n    y = 2\nelse:\n    y = 3\n", "else:\n    z = 1\n",
+                  "elif y:\n    q = 4\n", "    ", "\n", "print(x)\n", "while x < 3:\n    x = x + 1\n", "1", "+", "(",
+                  ")", "#c", "y", ":", '"s"', '"""']
+        rng = random.Random(14)
+        examples = [path.read_text() for path in sorted((Path(__file__).parent.parent / "examples").glob("*.culebra"))]
+        for _ in range(80):
+            source = rng.choice(examples) * rng.randint(1, 3)
+            incremental = IncrementalParser(source)
+            for _ in range(5):
+                line_starts = [0] + [i + 1 for i, char in enumerate(source) if char == "\n"]
+                edit_start = rng.choice(line_starts) if rng.random() < 0.6 else rng.randint(0, len(source))
+                edit_end = rng.randint(edit_start, min(len(source), edit_start + 30))
+                new_text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 2)))
+                source = source[:edit_start] + new_text + source[edit_end:]
+                expected = outcome(lambda: Parser(Lexer().tokenize(source)).parse())
+                self.assertEqual(expected, outcome(lambda: incremental.edit(edit_start, edit_end, new_text)),
+                                 (source, edit_start, edit_end, new_text))
+
+    def test_incremental_reparse_reuses_statements(self):
+        source = "".join(f"def f{i}(x):\n    return x + {i}\n\n" for i in range(100))
+        incremental = IncrementalParser(source)
+        previous = list(incremental.program.statements)
+        edit_start = source.index("x + 50")
+        program = incremental.edit(edit_start, edit_start + 1, "(x * 2)")
+
+        reused = [statement is old for statement, old in zip(program.statements, previous)]
+        self.assertEqual([True] * 49 + [False, False] + [True] * 49, reused)
+        self.assertEqual("FunctionDefinition(Identifier(f50), [Identifier(x)], "
+                         "[ReturnStatement(PlusOperation(MultiplicationOperation(Identifier(x), Integer(2)), "
+                         "Integer(50)))])", repr(program.statements[50]))
+        self.assertEqual(incremental.source.index("def f99"), program.statements[99].pos)
+
+    def test_identifier_led_statements(self):
+        source = "a[0][1] = f(x)\na[0][1]\nf(x)[0]\nb = a\n"
+        program = Parser(Lexer().tokenize(source)).parse()
+        self.assertEqual([
+            "Assignment(BracketAccess(BracketAccess(Identifier(a), Integer(0)), Integer(1)), "
+            "FunctionCall(Identifier(f), [Identifier(x)]))",
+            # An expression has a single bracket access, the second one is an array
+            "BracketAccess(Identifier(a), Integer(0))",
+            "Array([Integer(1)])",
+            "FunctionCall(Identifier(f), [Identifier(x)])",
+            "Array([Integer(0)])",
+            "Assignment(Identifier(b), Identifier(a))",
+        ], [repr(statement) for statement in program.statements])
+
+    def test_lazy_function_bodies(self):
+        source = "def f(x):\n    if x:\n        return [x]\n    return x\n\ndef g():\n    return 1 +\n\ny = f(1)\n"
+        eager = Parser(Lexer().tokenize(source)).parse()
+        parser = Parser(Lexer().tokenize(source), lazy_functions=True)
+        program = parser.parse()
+
+        self.assertFalse(parser.has_error)
+        f, g = program.statements[0].body, program.statements[1].body
+        self.assertIsInstance(f, LazyBlock)
+        self.assertFalse(f.is_parsed)
+        self.assertEqual(repr(eager.statements[0]), repr(program.statements[0]))
+        self.assertTrue(f.is_parsed)
+        self.assertEqual(repr(eager.statements[2]), repr(program.statements[2]))
+
+        # The syntax error of a body is raised when it is used
+        with self.assertRaises(SyntaxError):
+            g.statements
+        self.assertEqual(source.index("+\n") + 1, g.token.pos)
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from culebra import ast
+from culebra.lexer import Lexer
+from culebra.parser import Parser
+from culebra.interpreter.resolved_interpreter import ResolvedInterpreter
+from culebra.resolver import resolve
+
+
+def parse(source, lazy_functions=False):
+    return Parser(Lexer().tokenize(source), lazy_functions=lazy_functions).parse()
+
+
+def locations(node):
+    return {(identifier.value, identifier.pos): (identifier.depth, identifier.slot, identifier.chain)
+            for identifier in ast.walk(node) if type(identifier) is ast.Identifier}
+
+
+class TestResolver(TestCase):
+    def test_slots(self):
+        source = ("x = 1\n"
+                  "def counter():\n"
+                  "    count = 0\n"
+                  "    def inc(step):\n"
+                  "        count = count + step\n"
+                  "        return x\n"
+                  "    inc(1)\n"
+                  "    return count\n")
+        program = resolve(parse(source))
+        counter = program.statements[1]
+        inc = counter.body.statements[1]
+        self.assertEqual({'count': 1, 'inc': 2}, counter.scope.slots)
+        self.assertEqual({'count': 1, 'step': 2}, inc.scope.slots)
+        # inc assigns count when it runs before counter does, counter's after
+        count_chain = ((0, 1), (1, 1))
+        self.assertEqual({
+            ('x', source.index("x")): (None, None, None),
+            ('counter', source.index("counter")): (None, None, None),
+            ('count', source.index("count = 0")): (0, 1, None),
+            ('inc', source.index("inc(step)")): (0, 2, None),
+            ('step', source.index("step)")): (0, 2, None),
+            ('count', source.index("count = count")): (None, None, count_chain),
+            ('count', source.index("count + step")): (None, None, count_chain),
+            ('step', source.index("step\n")): (0, 2, None),
+            ('x', source.index("x\n")): (None, None, None),
+            ('inc', source.index("inc(1)")): (0, 2, None),
+            ('count', source.index("count\n")): (0, 1, None),
+        }, locations(program))
+
+    def test_outer_variables(self):
+        # A parameter named like a global, a name of the builtins
+        program = resolve(parse("n = 1\ndef f(n, m):\n    len = m\n    return n"), ["len"])
+        f = program.statements[1]
+        self.assertEqual({'len': 1, 'm': 2, 'n': 3}, f.scope.slots)
+        self.assertEqual([(None, None, ((0, 3), (1, None))), (0, 2, None)],
+                         [(a.depth, a.slot, a.chain) for a in f.arguments])
+
+    def test_names_assigned_later_by_the_program(self):
+        # The program assigns n and i after the calls: the parameter and the local stay in the frames
+        source = "def fact(n):\n    if n <= 1:\n        return 1\n    return fact(n - 1) * n\nr = fact(5)\nn = 3\nr"
+        program = resolve(parse(source))
+        fact = program.statements[0]
+        self.assertEqual(((0, fact.scope.slots['n']), (1, None)), fact.arguments[0].chain)
+        self.assertEqual(120, ResolvedInterpreter().evaluate(program))
+
+        program = resolve(parse("def f(k):\n    i = k\n    return i\nr = f(3)\ni = 0\nr"))
+        f = program.statements[0]
+        self.assertEqual(((0, f.scope.slots['i']), (1, None)), f.body.statements[0].identifier.chain)
+        self.assertEqual(3, ResolvedInterpreter().evaluate(program))
+
+    def test_lazy_bodies_are_resolved_on_first_call(self):
+        program = resolve(parse("def f(a):\n    return a\n", lazy_functions=True))
+        f = program.statements[0]
+        self.assertFalse(f.body.is_parsed)
+        self.assertFalse(f.scope.resolved)